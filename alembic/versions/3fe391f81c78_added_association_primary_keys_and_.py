@@ -0,0 +1,44 @@
+"""Added association primary keys and reverse indexes
+
+Revision ID: 3fe391f81c78
+Revises: 0a306df196fe
+Create Date: 2026-10-19 19:58:12.481306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3fe391f81c78'
+down_revision: Union[str, None] = '0a306df196fe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, staff column) of every association table
+ASSOCIATION_TABLES = (
+    ('patient_caretaker_association_table', 'caretaker_id'),
+    ('patient_doctor_association_table', 'doctor_id'),
+)
+
+
+def upgrade() -> None:
+    for table, column in ASSOCIATION_TABLES:
+        # Keep the first row of every pair, nothing stopped the same pair being added twice
+        op.execute(
+            f'DELETE FROM {table} WHERE rowid NOT IN '
+            f'(SELECT MIN(rowid) FROM {table} GROUP BY patient_id, {column})'
+        )
+        # SQLite can not add a primary key in place, the table is copied over
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.create_primary_key(f'pk_{table}', ['patient_id', column])
+        op.create_index(f'ix_{table}_{column}_patient_id', table, [column, 'patient_id'], unique=False)
+
+
+def downgrade() -> None:
+    for table, column in ASSOCIATION_TABLES:
+        op.drop_index(f'ix_{table}_{column}_patient_id', table_name=table)
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.drop_constraint(f'pk_{table}', type_='primary')
@@ -0,0 +1,79 @@
+"""Added user search index
+
+Revision ID: 5af94627c401
+Revises: 3fe391f81c78
+Create Date: 2026-10-19 20:21:40.118524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5af94627c401'
+down_revision: Union[str, None] = '3fe391f81c78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _searchable_phone(phone: str) -> str:
+    """The phone as typed followed by its digits alone, so either form finds it"""
+    digits = phone
+    for separator in (' ', '-', '(', ')', '+', '.'):
+        digits = f"replace({digits}, '{separator}', '')"
+    return f"coalesce({phone} || ' ' || {digits}, '')"
+
+
+def upgrade() -> None:
+    # rowid is the user id, the other tables are kept in sync by the triggers below
+    op.execute(
+        "CREATE VIRTUAL TABLE user_search USING fts5("
+        "name, email, phone, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    op.execute(
+        "INSERT INTO user_search (rowid, name, email, phone) "
+        f"SELECT users.id, users.name, users.email, {_searchable_phone('user_additional_details.phone')} "
+        "FROM users LEFT OUTER JOIN user_additional_details "
+        "ON user_additional_details.user_id = users.id"
+    )
+    op.execute(
+        "CREATE TRIGGER user_search_users_insert AFTER INSERT ON users BEGIN "
+        "INSERT INTO user_search (rowid, name, email, phone) "
+        "VALUES (new.id, new.name, new.email, ''); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_search_users_update AFTER UPDATE OF name, email ON users BEGIN "
+        "UPDATE user_search SET name = new.name, email = new.email WHERE rowid = new.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_search_users_delete AFTER DELETE ON users BEGIN "
+        "DELETE FROM user_search WHERE rowid = old.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_search_details_insert AFTER INSERT ON user_additional_details BEGIN "
+        f"UPDATE user_search SET phone = {_searchable_phone('new.phone')} WHERE rowid = new.user_id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_search_details_update AFTER UPDATE OF phone ON user_additional_details BEGIN "
+        f"UPDATE user_search SET phone = {_searchable_phone('new.phone')} WHERE rowid = new.user_id; "
+        "END"
+    )
+
+
+def downgrade() -> None:
+    for trigger in (
+        'user_search_details_update',
+        'user_search_details_insert',
+        'user_search_users_delete',
+        'user_search_users_update',
+        'user_search_users_insert',
+    ):
+        op.execute(f'DROP TRIGGER {trigger}')
+    op.execute('DROP TABLE user_search')
@@ -0,0 +1,133 @@
+import os
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+
+def use_temporary_database() -> str:
+    """Point the app at a fresh temporary SQLite file, call before importing any app module"""
+    path = os.path.join(tempfile.mkdtemp(prefix="health-mon-bench-"), "bench.db")
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "1440")
+    return path
+
+
+def migrate_database() -> None:
+    """Create the schema of the configured database through the alembic migrations"""
+    from alembic import command
+    from alembic.config import Config
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    alembic_config = Config(os.path.join(root, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(root, "alembic"))
+    command.upgrade(alembic_config, "head")
+
+
+def get_emails(connection, user_ids: list[int]) -> list[str]:
+    """Emails of the given users, in the same order"""
+    from sqlalchemy import select
+
+    from sqlite import models
+
+    emails = dict(
+        connection.execute(
+            select(models.UserModel.id, models.UserModel.email).where(
+                models.UserModel.id.in_(user_ids)
+            )
+        ).all()
+    )
+    return [emails[x] for x in user_ids]
+
+
+def insert_patient_histories(
+    connection,
+    patient_ids: list[int],
+    count: int,
+    days: int = 30,
+    chunk_size: int = 100_000,
+) -> None:
+    """Bulk insert plausible readings through Core, spread over the last days
+
+    Readings are dealt round robin over the patients, oldest first.
+    """
+    from sqlite import models
+
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    step = timedelta(days=days) / max(count, 1)
+    table = models.PatientHistoryModel.__table__
+    for start in range(0, count, chunk_size):
+        connection.execute(
+            table.insert(),
+            [
+                {
+                    "patient_id": patient_ids[i % len(patient_ids)],
+                    "spo2_reading": round(rng.uniform(93.0, 99.5), 1),
+                    "systolic_reading": rng.randint(100, 150),
+                    "diastolic_reading": rng.randint(60, 95),
+                    "temp_reading": round(rng.uniform(36.1, 38.2), 1),
+                    "heartbeat_reading": float(rng.randint(55, 110)),
+                    "created_at": now - step * (count - i),
+                }
+                for i in range(start, min(start + chunk_size, count))
+            ],
+        )
+
+
+def insert_ward(
+    connection, doctors: int, patients_per_doctor: int, password_hash: str
+) -> dict[str, list[int]]:
+    """Bulk insert doctors and caretakers, each pair looking after its own patients"""
+    from sqlite import models
+    from sqlite.enums import CombinedRoleEnum
+    from sqlite.seed import insert_users
+
+    rng = random.Random(0)
+    doctor_ids = insert_users(
+        connection, CombinedRoleEnum.DOCTOR, doctors, password_hash, rng
+    )
+    caretaker_ids = insert_users(
+        connection, CombinedRoleEnum.CARETAKER, doctors, password_hash, rng
+    )
+    patient_ids = insert_users(
+        connection,
+        CombinedRoleEnum.PATIENT,
+        doctors * patients_per_doctor,
+        password_hash,
+        rng,
+    )
+    connection.execute(
+        models.patient_doctor_association_table.insert(),
+        [
+            {"patient_id": x, "doctor_id": doctor_ids[i // patients_per_doctor]}
+            for i, x in enumerate(patient_ids)
+        ],
+    )
+    connection.execute(
+        models.patient_caretaker_association_table.insert(),
+        [
+            {"patient_id": x, "caretaker_id": caretaker_ids[i // patients_per_doctor]}
+            for i, x in enumerate(patient_ids)
+        ],
+    )
+    return {"doctor": doctor_ids, "caretaker": caretaker_ids, "patient": patient_ids}
+
+
+def summarize_latencies(latencies: list[float]) -> dict:
+    """Summarize request latencies given in seconds, in milliseconds"""
+    if not latencies:
+        return {"count": 0}
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "count": count,
+        "mean_ms": sum(latencies) / count * 1000,
+        "p50_ms": latencies[int(count * 0.50)] * 1000,
+        "p95_ms": latencies[min(int(count * 0.95), count - 1)] * 1000,
+        "p99_ms": latencies[min(int(count * 0.99), count - 1)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "stdev_ms": statistics.pstdev(latencies) * 1000,
+    }
@@ -0,0 +1,223 @@
+"""Measure latency and throughput of the hot endpoints against synthetic datasets
+
+Every dataset (readings x patients per doctor) is seeded into a fresh temporary SQLite
+file and benchmarked in its own process, in-process against the ASGI app through
+TestClient. Results are written as JSON, so runs of two commits can be diffed.
+
+Run with: python -m benchmarks.endpoints --readings 1000,100000 --patients-per-doctor 10,1000
+Full matrix: python -m benchmarks.endpoints --readings 1000,100000,10000000
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import (
+    use_temporary_database,
+    migrate_database,
+    get_emails,
+    insert_ward,
+    insert_patient_histories,
+    summarize_latencies,
+)
+
+PASSWORD = "benchmark"
+
+
+def seed(readings: int, patients_per_doctor: int, doctors: int) -> dict:
+    from sqlite.database import engine
+    from sqlite.enums import CombinedRoleEnum
+    from sqlite.seed import insert_users
+    from utils.password import get_password_hash
+
+    password_hash = get_password_hash(PASSWORD)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=OFF")
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        (admin_id,) = insert_users(
+            connection, CombinedRoleEnum.ADMIN, 1, password_hash, random.Random(0)
+        )
+        ward = insert_ward(connection, doctors, patients_per_doctor, password_hash)
+        insert_patient_histories(connection, ward["patient"], readings)
+        admin, doctor, patient = get_emails(
+            connection, [admin_id, ward["doctor"][0], ward["patient"][0]]
+        )
+    return {
+        "admin": admin,
+        "doctor": doctor,
+        "patient": patient,
+        "patient_id": ward["patient"][0],
+    }
+
+
+def measure(client, count: int, method: str, url: str, **kwargs) -> dict:
+    latencies = []
+    errors = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors += 1
+    total = sum(latencies)
+    return {
+        **summarize_latencies(latencies),
+        "errors": errors,
+        "requests_per_second": count / total,
+    }
+
+
+def run_dataset(args: argparse.Namespace) -> dict:
+    use_temporary_database()
+    migrate_database()
+
+    started = time.perf_counter()
+    users = seed(args.dataset_readings, args.dataset_patients_per_doctor, args.doctors)
+    seed_seconds = time.perf_counter() - started
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as client:
+
+        def login(email: str) -> dict:
+            token = client.post(
+                "/token", data={"username": email, "password": PASSWORD}
+            ).json()["access_token"]
+            return {"Authorization": f"Bearer {token}"}
+
+        admin, doctor, patient = (
+            login(users["admin"]),
+            login(users["doctor"]),
+            login(users["patient"]),
+        )
+        today = date.today()
+        reading = {
+            "spo2_reading": 97.5,
+            "systolic_reading": 120,
+            "diastolic_reading": 80,
+            "temp_reading": 36.8,
+            "heartbeat_reading": 72.0,
+        }
+        scenarios = {
+            "POST /token": (
+                args.token_requests,
+                "POST",
+                "/token",
+                {"data": {"username": users["patient"], "password": PASSWORD}},
+            ),
+            "POST /current/history": (
+                args.requests,
+                "POST",
+                "/current/history",
+                {"headers": patient, "json": reading},
+            ),
+            "GET /current/patients": (
+                args.requests,
+                "GET",
+                "/current/patients",
+                {"headers": doctor},
+            ),
+            "GET /patients": (args.requests, "GET", "/patients", {"headers": admin}),
+            "GET /current/patients/history/{user_id}/{start_date}/{end_date}": (
+                args.requests,
+                "GET",
+                f"/current/patients/history/{users['patient_id']}"
+                f"/{today - timedelta(days=7)}/{today}",
+                {"headers": doctor},
+            ),
+            "GET /stats": (args.requests, "GET", "/stats", {"headers": admin}),
+        }
+        results = {}
+        for name, (count, method, url, kwargs) in scenarios.items():
+            # One untimed request warms caches and lazily compiled statements
+            client.request(method, url, **kwargs)
+            results[name] = measure(client, count, method, url, **kwargs)
+
+    return {
+        "readings": args.dataset_readings,
+        "patients_per_doctor": args.dataset_patients_per_doctor,
+        "doctors": args.doctors,
+        "seed_seconds": seed_seconds,
+        "endpoints": results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readings", default="1000,100000")
+    parser.add_argument("--patients-per-doctor", default="10,1000")
+    parser.add_argument("--doctors", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--token-requests",
+        type=int,
+        default=10,
+        help="Kept low, every /token request spends a full bcrypt verification",
+    )
+    parser.add_argument("--output", default="benchmark-endpoints.json")
+    # Set on the child process that benchmarks a single dataset
+    parser.add_argument("--dataset-readings", type=int, help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--dataset-patients-per-doctor", type=int, help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.dataset_readings is not None:
+        print(json.dumps(run_dataset(args)))
+        return
+
+    datasets = []
+    for readings in map(int, args.readings.split(",")):
+        for patients_per_doctor in map(int, args.patients_per_doctor.split(",")):
+            print(
+                f"readings={readings} patients_per_doctor={patients_per_doctor}",
+                file=sys.stderr,
+            )
+            # A process per dataset, so caches and the engine start cold every time
+            child = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.endpoints",
+                    f"--doctors={args.doctors}",
+                    f"--requests={args.requests}",
+                    f"--token-requests={args.token_requests}",
+                    f"--dataset-readings={readings}",
+                    f"--dataset-patients-per-doctor={patients_per_doctor}",
+                ],
+                stdout=subprocess.PIPE,
+                text=True,
+                check=True,
+            )
+            datasets.append(json.loads(child.stdout.splitlines()[-1]))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "datasets": datasets,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Simulate a ward: patient monitors posting vitals while caretakers and doctors poll
+
+Seeds a temporary SQLite database, starts main:app with hypercorn as it is deployed, then
+drives it over HTTP from an asyncio client pool for the given duration. Reports sustained
+ingest throughput, read latency percentiles and error / timeout counts.
+
+Run with: python -m benchmarks.fleet --patients 200 --rate 1 --viewers 20 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import httpx
+
+from benchmarks.common import (
+    use_temporary_database,
+    migrate_database,
+    get_emails,
+    insert_ward,
+    summarize_latencies,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.timeouts = 0
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TimeoutException:
+            self.timeouts += 1
+            return
+        except httpx.TransportError:
+            self.errors += 1
+            return
+        self.latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            self.errors += 1
+
+    def report(self, seconds: float) -> dict:
+        return {
+            **summarize_latencies(self.latencies),
+            "per_second": len(self.latencies) / seconds,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
+
+
+def seed(args: argparse.Namespace) -> dict[str, list[str]]:
+    """Seed the ward, return access tokens per role
+
+    Tokens are minted with the app's secret, logging every simulated device in through
+    /token would spend a bcrypt verification each.
+    """
+    from secret import secret
+    from sqlite.database import engine
+    from utils.jwt_tokens import create_access_token
+
+    staff = max(1, math.ceil(args.viewers / 2))
+    with engine.begin() as connection:
+        ward = insert_ward(
+            connection,
+            doctors=staff,
+            patients_per_doctor=math.ceil(args.patients / staff),
+            password_hash="",
+        )
+        emails = {role: get_emails(connection, ids) for role, ids in ward.items()}
+
+    def tokens(role: str) -> list[str]:
+        return [
+            create_access_token(
+                data={"sub": x},
+                expires_delta=timedelta(days=1),
+                key=secret.SECRET_KEY,
+                algorithm=secret.ALGORITHM,
+            )
+            for x in emails[role]
+        ]
+
+    viewers = [
+        token for pair in zip(tokens("doctor"), tokens("caretaker")) for token in pair
+    ]
+    return {
+        "patient": tokens("patient")[: args.patients],
+        "viewer": viewers[: args.viewers],
+    }
+
+
+def start_app(args: argparse.Namespace) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "hypercorn",
+            "main:app",
+            "--bind",
+            f"127.0.0.1:{args.port}",
+            "--workers",
+            str(args.workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                await client.get("/openapi.json")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def every(interval: float, until: float, action) -> None:
+    """Run action on a fixed schedule, starting at a random offset within the interval
+
+    The schedule does not slide when the app is slow, so a saturated app shows up as
+    growing latency instead of a quietly lower offered load.
+    """
+    next_at = time.monotonic() + random.uniform(0, interval)
+    while next_at < until:
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        await action()
+        next_at += interval
+
+
+async def run(args: argparse.Namespace, tokens: dict[str, list[str]]) -> dict:
+    ingest = Recorder()
+    reads = Recorder()
+    limits = httpx.Limits(
+        max_connections=args.connections, max_keepalive_connections=args.connections
+    )
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}",
+        limits=limits,
+        timeout=args.timeout,
+    ) as client:
+
+        def monitor(token: str):
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def post_reading():
+                await ingest.request(
+                    client,
+                    "POST",
+                    "/current/history",
+                    headers=headers,
+                    json={
+                        "spo2_reading": round(random.uniform(93.0, 99.5), 1),
+                        "systolic_reading": random.randint(100, 150),
+                        "diastolic_reading": random.randint(60, 95),
+                        "temp_reading": round(random.uniform(36.1, 38.2), 1),
+                        "heartbeat_reading": float(random.randint(55, 110)),
+                    },
+                )
+
+            return post_reading
+
+        def dashboard(token: str):
+            headers = {"Authorization": f"Bearer {token}"}
+
+            async def poll():
+                await reads.request(client, "GET", "/current/patients", headers=headers)
+
+            return poll
+
+        started = time.monotonic()
+        until = started + args.duration
+        await asyncio.gather(
+            *(every(1 / args.rate, until, monitor(x)) for x in tokens["patient"]),
+            *(every(args.poll_interval, until, dashboard(x)) for x in tokens["viewer"]),
+        )
+        elapsed = time.monotonic() - started
+
+    return {
+        "patients": len(tokens["patient"]),
+        "readings_per_patient_per_second": args.rate,
+        "viewers": len(tokens["viewer"]),
+        "poll_interval_seconds": args.poll_interval,
+        "workers": args.workers,
+        "elapsed_seconds": elapsed,
+        "offered_ingest_per_second": len(tokens["patient"]) * args.rate,
+        "ingest": ingest.report(elapsed),
+        "reads": reads.report(elapsed),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument(
+        "--rate", type=float, default=1.0, help="Readings per patient per second"
+    )
+    parser.add_argument("--viewers", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    args.port = args.port or free_port()
+
+    use_temporary_database()
+    migrate_database()
+    tokens = seed(args)
+
+    app = start_app(args)
+    try:
+        asyncio.run(wait_until_ready(f"http://127.0.0.1:{args.port}"))
+        report = asyncio.run(run(args, tokens))
+    finally:
+        app.terminate()
+        app.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
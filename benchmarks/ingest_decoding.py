@@ -0,0 +1,90 @@
+"""Compare per reading parse cost of JSON through pydantic and the binary ingest format
+
+Run with: python -m benchmarks.ingest_decoding --batch 1000 --repeat 200
+"""
+
+import argparse
+import gzip
+import json
+import timeit
+
+from benchmarks.common import use_temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from sqlite.schemas import PatientHistoryCreateClass
+    from utils.ingest import (
+        READING_STRUCT,
+        decode_binary_readings,
+        decode_json_readings,
+        decompress_gzip,
+    )
+
+    readings = [
+        {
+            "spo2_reading": 97.5,
+            "systolic_reading": 110 + i % 30,
+            "diastolic_reading": 80,
+            "temp_reading": 36.75,
+            "heartbeat_reading": 60.0 + i % 40,
+        }
+        for i in range(args.batch)
+    ]
+    json_single = json.dumps(readings[0]).encode()
+    json_batch = json.dumps(readings).encode()
+    binary_batch = b"".join(READING_STRUCT.pack(*x.values()) for x in readings)
+    gzip_binary_batch = gzip.compress(binary_batch)
+
+    def per_reading_us(run, count: int) -> float:
+        return timeit.timeit(run, number=args.repeat) / args.repeat / count * 1e6
+
+    print(
+        json.dumps(
+            {
+                "batch": args.batch,
+                "bytes_per_reading": {
+                    "json": len(json_batch) / args.batch,
+                    "binary": READING_STRUCT.size,
+                    "binary_gzip": len(gzip_binary_batch) / args.batch,
+                },
+                "us_per_reading": {
+                    "json_single": per_reading_us(
+                        lambda: PatientHistoryCreateClass.model_validate_json(
+                            json_single
+                        ),
+                        1,
+                    ),
+                    "binary_single": per_reading_us(
+                        lambda: decode_binary_readings(
+                            binary_batch[: READING_STRUCT.size]
+                        ),
+                        1,
+                    ),
+                    "json_batch": per_reading_us(
+                        lambda: decode_json_readings(json_batch), args.batch
+                    ),
+                    "binary_batch": per_reading_us(
+                        lambda: decode_binary_readings(binary_batch), args.batch
+                    ),
+                    "binary_gzip_batch": per_reading_us(
+                        lambda: decode_binary_readings(
+                            decompress_gzip(gzip_binary_batch, max_size=1 << 20)
+                        ),
+                        args.batch,
+                    ),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare encode time of a Page[Patient] through FastAPI's default path and PydanticJSONResponse
+
+Run with: python -m benchmarks.json_encoding --patients 50 --repeat 200
+"""
+
+import argparse
+import asyncio
+import json
+import timeit
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temporary_database
+
+
+def build_page(patients: int, associated: int, histories: int):
+    from fastapi_pagination import Page
+
+    from sqlite.schemas import Patient, PatientHistory
+
+    now = datetime.utcnow()
+
+    def user(user_id: int, role: str) -> dict:
+        return {
+            "id": user_id,
+            "name": f"{role} {user_id}",
+            "email": f"{role}{user_id}@example.com",
+            "gender": "rather_not_say",
+            "user_role": role,
+            "additional_details": {"phone": None, "age": 40, "blood_group": "O+"},
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    items = [
+        Patient(
+            **user(i, "patient"),
+            caretakers=[user(10_000 + j, "caretaker") for j in range(associated)],
+            doctors=[user(20_000 + j, "doctor") for j in range(associated)],
+            history=[
+                PatientHistory(
+                    id=i * histories + j + 1,
+                    spo2_reading=97.5,
+                    systolic_reading=120,
+                    diastolic_reading=80,
+                    temp_reading=36.8,
+                    heartbeat_reading=72.0,
+                    created_at=now - timedelta(minutes=j),
+                )
+                for j in range(histories)
+            ],
+        )
+        for i in range(1, patients + 1)
+    ]
+    return Page[Patient](items=items, total=patients, page=1, size=patients, pages=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--associated", type=int, default=2)
+    parser.add_argument("--histories", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from fastapi_pagination import Page
+
+    from sqlite.schemas import Patient
+    from utils.responses import PydanticJSONResponse
+
+    page = build_page(args.patients, args.associated, args.histories)
+    field = create_response_field(name="Response", type_=Page[Patient])
+
+    async def default_path():
+        # What FastAPI does with the return value of a route that has a response_model
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    def fast_path():
+        return PydanticJSONResponse(page).body
+
+    loop = asyncio.new_event_loop()
+    assert json.loads(loop.run_until_complete(default_path())) == json.loads(
+        fast_path()
+    )
+
+    default = timeit.timeit(
+        lambda: loop.run_until_complete(default_path()), number=args.repeat
+    )
+    fast = timeit.timeit(fast_path, number=args.repeat)
+    print(
+        json.dumps(
+            {
+                "patients": args.patients,
+                "bytes": len(fast_path()),
+                "default_ms": default / args.repeat * 1000,
+                "pydantic_json_response_ms": fast / args.repeat * 1000,
+                "speedup": default / fast,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure patient action delivery throughput of the outbox workers
+
+Notifications are stored in the caretaker_notifications table, as in production, or
+kept in memory with --transport memory to measure the workers alone.
+
+Run with: python -m benchmarks.outbox_throughput --actions 10000 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from benchmarks.common import use_temporary_database, migrate_database
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from sqlite import models
+    from sqlite.database import engine
+    from sqlite.enums import CombinedRoleEnum, PatientActionEnum
+    from sqlite.seed import insert_users
+    from utils.notifications import (
+        DatabaseTransport,
+        InProcessTransport,
+        OutboxDispatcher,
+    )
+
+    with engine.begin() as connection:
+        rng = random.Random(0)
+        patient_ids = insert_users(
+            connection, CombinedRoleEnum.PATIENT, args.patients, "x", rng
+        )
+        caretaker_ids = insert_users(
+            connection, CombinedRoleEnum.CARETAKER, args.caretakers, "x", rng
+        )
+        connection.execute(
+            models.patient_caretaker_association_table.insert(),
+            [
+                {"patient_id": patient_id, "caretaker_id": caretaker_id}
+                for patient_id in patient_ids
+                for caretaker_id in random.sample(
+                    caretaker_ids, args.caretakers_per_patient
+                )
+            ],
+        )
+        connection.execute(
+            models.PatientActionOutboxModel.__table__.insert(),
+            [
+                {
+                    "patient_id": random.choice(patient_ids),
+                    "action": random.choice(list(PatientActionEnum)),
+                }
+                for _ in range(args.actions)
+            ],
+        )
+
+    dispatcher = OutboxDispatcher(
+        transport=(
+            InProcessTransport() if args.transport == "memory" else DatabaseTransport()
+        ),
+        workers=args.workers,
+        batch_size=args.batch_size,
+        poll_interval=0.05,
+    )
+    dispatcher.start()
+    while dispatcher.delivered_count + dispatcher.failed_count < args.actions:
+        await asyncio.sleep(0.01)
+    stats = dispatcher.stats()
+    await dispatcher.stop()
+
+    stats["notifications_per_second"] = (
+        stats["notifications"] / stats["elapsed_seconds"]
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--actions", type=int, default=10000)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--caretakers", type=int, default=50)
+    parser.add_argument("--caretakers-per-patient", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument(
+        "--transport", choices=("database", "memory"), default="database"
+    )
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Check the number of SQL queries of the hot endpoints against their budgets
+
+List endpoints are requested with two page sizes over the same data, a count that grows
+with the page size is an N+1 and fails the run, whatever the budget. Exits non-zero when
+an endpoint runs more queries than its budget too, listing the statements it ran.
+
+Run with: python -m benchmarks.query_counts
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+from benchmarks.common import (
+    use_temporary_database,
+    migrate_database,
+    get_emails,
+    insert_ward,
+    insert_patient_histories,
+)
+
+PASSWORD = "benchmark"
+SMALL_PAGE, LARGE_PAGE = 5, 20
+
+# Queries of a warm request, at any page size
+BUDGETS = {
+    "GET /users": 3,
+    "GET /caretakers": 4,
+    "GET /doctors": 4,
+    "GET /patients": 5,
+    "GET /current/patients": 7,
+    "GET /patients/{user_id}": 5,
+    "GET /current/patients/{user_id}": 7,
+    "GET /current/history": 2,
+    "POST /current/history": 4,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.parse_args()
+
+    use_temporary_database()
+    # Captures see every thread, the outbox workers' polls would be counted too
+    os.environ["OUTBOX_WORKERS"] = "0"
+    migrate_database()
+
+    from fastapi.testclient import TestClient
+
+    from main import app
+    from sqlite.database import engine
+    from sqlite.enums import CombinedRoleEnum
+    from sqlite.seed import insert_users
+    from utils.password import get_password_hash
+    from utils.query_stats import assert_max_queries
+
+    password_hash = get_password_hash(PASSWORD)
+    with engine.begin() as connection:
+        (admin_id,) = insert_users(
+            connection, CombinedRoleEnum.ADMIN, 1, password_hash, random.Random(0)
+        )
+        # Enough caretakers and doctors to fill a page, and a doctor with a page of patients
+        insert_ward(connection, LARGE_PAGE, 1, password_hash)
+        ward = insert_ward(connection, 1, LARGE_PAGE, password_hash)
+        insert_patient_histories(connection, ward["patient"], 20 * LARGE_PAGE)
+        patient_id = ward["patient"][0]
+        emails = get_emails(connection, [admin_id, ward["doctor"][0], patient_id])
+
+    with TestClient(app) as client:
+
+        def login(email: str) -> dict:
+            token = client.post(
+                "/token", data={"username": email, "password": PASSWORD}
+            ).json()["access_token"]
+            return {"Authorization": f"Bearer {token}"}
+
+        admin, doctor, patient = (login(x) for x in emails)
+
+        failures = []
+
+        def count(name: str, method: str, url: str, **kwargs) -> int:
+            # Warm up first, caches would otherwise make the first call look worse
+            client.request(method, url, **kwargs)
+            try:
+                with assert_max_queries(BUDGETS[name]) as stats:
+                    response = client.request(method, url, **kwargs)
+            except AssertionError as e:
+                failures.append(f"{method} {url}: {e}")
+            assert response.status_code == 200, (url, response.text)
+            return stats.count
+
+        lists = {
+            "GET /users": ("/users", admin),
+            "GET /caretakers": ("/caretakers", admin),
+            "GET /doctors": ("/doctors", admin),
+            "GET /patients": ("/patients", admin),
+            "GET /current/patients": ("/current/patients", doctor),
+        }
+        results = {}
+        for name, (url, headers) in lists.items():
+            small = count(name, "GET", f"{url}?size={SMALL_PAGE}", headers=headers)
+            large = count(name, "GET", f"{url}?size={LARGE_PAGE}", headers=headers)
+            results[name] = {
+                "queries": large,
+                f"queries_at_page_size_{SMALL_PAGE}": small,
+                "grows_with_page_size": large > small,
+            }
+            if large > small:
+                failures.append(
+                    f"{name}: {small} queries at page size {SMALL_PAGE}, {large} at "
+                    f"{LARGE_PAGE}, queries are run per item"
+                )
+        reading = {
+            "spo2_reading": 97.5,
+            "systolic_reading": 120,
+            "diastolic_reading": 80,
+            "temp_reading": 36.8,
+            "heartbeat_reading": 72.0,
+        }
+        singles = {
+            "GET /patients/{user_id}": ("GET", f"/patients/{patient_id}", admin, None),
+            "GET /current/patients/{user_id}": (
+                "GET",
+                f"/current/patients/{patient_id}",
+                doctor,
+                None,
+            ),
+            "GET /current/history": ("GET", "/current/history", patient, None),
+            "POST /current/history": ("POST", "/current/history", patient, reading),
+        }
+        for name, (method, url, headers, body) in singles.items():
+            results[name] = {
+                "queries": count(name, method, url, headers=headers, json=body)
+            }
+
+    for name, result in results.items():
+        result["budget"] = BUDGETS[name]
+        result["over_budget"] = result["queries"] > result["budget"]
+    print(json.dumps(results, indent=2))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Check the CRUD functions that use the association tables never scan them
+
+Runs every function that reads or writes patient_caretaker_association_table or
+patient_doctor_association_table against a seeded ward, and asks SQLite for the plan of
+each statement it sent. A plan that SCANs an association table, instead of SEARCHing it
+through its primary key or reverse index, is a lookup that grows with every association
+in the database. Exits non-zero when there is one, so a regression fails the run.
+
+Run with: python -m benchmarks.query_plans
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from benchmarks.common import (
+    use_temporary_database,
+    migrate_database,
+    insert_ward,
+)
+
+ASSOCIATION_TABLES = (
+    "patient_caretaker_association_table",
+    "patient_doctor_association_table",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients-per-doctor", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+
+    from sqlalchemy import event
+
+    from sqlite import models
+    from sqlite.database import SessionLocal, engine
+    from sqlite.enums import CombinedRoleEnum, UserRoleEnum
+    from sqlite.seed import insert_users
+    import sqlite.crud.associations as associations
+    import sqlite.crud.caretakers.detailed as caretakers_detailed
+    import sqlite.crud.caretakers.non_detailed as caretakers
+    import sqlite.crud.doctors.detailed as doctors_detailed
+    import sqlite.crud.doctors.non_detailed as doctors
+    import sqlite.crud.patients.detailed as patients_detailed
+    import sqlite.crud.users as users
+    import sqlite.crud.versions as versions
+
+    with engine.begin() as connection:
+        insert_users(connection, CombinedRoleEnum.ADMIN, 1, "unused", random.Random(0))
+        ward = insert_ward(connection, args.doctors, args.patients_per_doctor, "unused")
+    patient_id, caretaker_id, doctor_id = (
+        ward["patient"][0],
+        ward["caretaker"][0],
+        ward["doctor"][0],
+    )
+
+    def user(db, user_id):
+        return db.get(models.UserModel, user_id)
+
+    # Functions that write go last, the rows they remove are the ones others look up
+    checks = {
+        "users.get_detailed_user": lambda db: users.get_detailed_user(
+            db_user=user(db, patient_id), db=db
+        ),
+        "patients.get_all_patients_with_caretakers_and_doctors": lambda db: (
+            patients_detailed.get_all_patients_with_caretakers_and_doctors(db=db)
+            .limit(50)
+            .all()
+        ),
+        "patients.get_all_patients_without_caretakers_and_doctors_for_a_particular_user[caretaker]": lambda db: (
+            patients_detailed.get_all_patients_without_caretakers_and_doctors_for_a_particular_user(
+                user_id=caretaker_id, user_role=UserRoleEnum.CARETAKER, db=db
+            )
+            .limit(50)
+            .all()
+        ),
+        "patients.get_all_patients_without_caretakers_and_doctors_for_a_particular_user[doctor]": lambda db: (
+            patients_detailed.get_all_patients_without_caretakers_and_doctors_for_a_particular_user(
+                user_id=doctor_id, user_role=UserRoleEnum.DOCTOR, db=db
+            )
+            .limit(50)
+            .all()
+        ),
+        "patients.get_patient_with_caretakers_and_doctors_by_id": lambda db: (
+            patients_detailed.get_patient_with_caretakers_and_doctors_by_id(
+                user_id=patient_id, db=db
+            )
+        ),
+        "caretakers.get_all_caretakers_with_patients": lambda db: (
+            caretakers_detailed.get_all_caretakers_with_patients(db=db).limit(50).all()
+        ),
+        "caretakers.get_all_caretakers_with_patients_for_a_particular_user": lambda db: (
+            caretakers_detailed.get_all_caretakers_with_patients_for_a_particular_user(
+                user_id=caretaker_id, db=db
+            ).all()
+        ),
+        "caretakers.get_caretaker_with_patients_by_id": lambda db: (
+            caretakers_detailed.get_caretaker_with_patients_by_id(
+                user_id=caretaker_id, db=db
+            )
+        ),
+        "caretakers.get_all_caretaker_ids_for_a_particular_patient": lambda db: (
+            caretakers.get_all_caretaker_ids_for_a_particular_patient(
+                user_id=patient_id, db=db
+            )
+        ),
+        "doctors.get_all_doctors_with_patients": lambda db: (
+            doctors_detailed.get_all_doctors_with_patients(db=db).limit(50).all()
+        ),
+        "doctors.get_all_doctors_with_patients_for_a_particular_user": lambda db: (
+            doctors_detailed.get_all_doctors_with_patients_for_a_particular_user(
+                user_id=doctor_id, db=db
+            ).all()
+        ),
+        "doctors.get_doctor_with_patients_by_id": lambda db: (
+            doctors_detailed.get_doctor_with_patients_by_id(user_id=doctor_id, db=db)
+        ),
+        "doctors.get_all_doctor_ids_for_a_particular_patient": lambda db: (
+            doctors.get_all_doctor_ids_for_a_particular_patient(
+                user_id=patient_id, db=db
+            )
+        ),
+        "versions.get_patient_version[caretaker]": lambda db: (
+            versions.get_patient_version(
+                user_id=patient_id,
+                accessible_by_user_id=caretaker_id,
+                accessible_by_user_role=UserRoleEnum.CARETAKER,
+                db=db,
+            )
+        ),
+        "versions.get_patient_version[doctor]": lambda db: (
+            versions.get_patient_version(
+                user_id=patient_id,
+                accessible_by_user_id=doctor_id,
+                accessible_by_user_role=UserRoleEnum.DOCTOR,
+                db=db,
+            )
+        ),
+        "caretakers.get_all_caretaker_ids_for_list_of_patients": lambda db: (
+            caretakers.get_all_caretaker_ids_for_list_of_patients(
+                patient_ids=ward["patient"][:50], db=db
+            )
+        ),
+        "doctors.get_all_doctor_ids_for_list_of_patients": lambda db: (
+            doctors.get_all_doctor_ids_for_list_of_patients(
+                patient_ids=ward["patient"][:50], db=db
+            )
+        ),
+        "associations.get_caretaker_associated_with_patient": lambda db: (
+            associations.get_caretaker_associated_with_patient(
+                db_caretaker=user(db, caretaker_id),
+                db_patient=user(db, patient_id),
+                db=db,
+            )
+        ),
+        "associations.get_doctor_associated_with_patient": lambda db: (
+            associations.get_doctor_associated_with_patient(
+                db_doctor=user(db, doctor_id), db_patient=user(db, patient_id), db=db
+            )
+        ),
+        "versions.bump_association_version_for_patients_of_user": lambda db: (
+            versions.bump_association_version_for_patients_of_user(
+                user_id=caretaker_id, db=db
+            )
+        ),
+        "associations.try_disassociate_patient_from_caretaker": lambda db: (
+            associations.try_disassociate_patient_from_caretaker(
+                db_patient=user(db, patient_id),
+                db_caretaker=user(db, caretaker_id),
+                db=db,
+            )
+        ),
+        "associations.try_disassociate_patient_from_doctor": lambda db: (
+            associations.try_disassociate_patient_from_doctor(
+                db_patient=user(db, patient_id), db_doctor=user(db, doctor_id), db=db
+            )
+        ),
+        "associations.try_disassociate_patients_from_caretakers": lambda db: (
+            associations.try_disassociate_patients_from_caretakers(
+                pairs=list(zip(ward["patient"][1:50], [caretaker_id] * 49)), db=db
+            )
+        ),
+        "associations.try_disassociate_patients_from_doctors": lambda db: (
+            associations.try_disassociate_patients_from_doctors(
+                pairs=list(zip(ward["patient"][1:50], [doctor_id] * 49)), db=db
+            )
+        ),
+    }
+
+    statements: list[tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("EXPLAIN") or executemany:
+            return
+        if any(x in statement for x in ASSOCIATION_TABLES):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    results = {}
+    failed = False
+    for name, check in checks.items():
+        statements.clear()
+        with SessionLocal() as db:
+            check(db)
+            db.rollback()
+        if not statements:
+            raise AssertionError(f"{name} did not touch an association table")
+        plans = []
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                plans.append(
+                    [
+                        row[3]
+                        for row in connection.exec_driver_sql(
+                            f"EXPLAIN QUERY PLAN {statement}", parameters
+                        )
+                    ]
+                )
+        scans = [
+            line
+            for plan in plans
+            for line in plan
+            if line.startswith("SCAN") and any(x in line for x in ASSOCIATION_TABLES)
+        ]
+        failed |= bool(scans)
+        results[name] = {"plans": plans, "association_table_scans": scans}
+    event.remove(engine, "before_cursor_execute", record)
+
+    print(json.dumps(results, indent=2))
+    print(
+        json.dumps(
+            {name: len(x["association_table_scans"]) for name, x in results.items()},
+            indent=2,
+        ),
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
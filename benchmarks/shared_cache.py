@@ -0,0 +1,145 @@
+"""Compare reads of recent readings from the process local and the shared cache
+
+Times a hit on a warm patient, and a hit right after a new reading was appended, which
+makes the shared cache decode the slot again, for RecentReadingsCache and for
+SharedRecentReadingsCache. Also times a cross-process round trip: a reading appended in
+one process until another process serves it.
+
+Run with: python -m benchmarks.shared_cache --patients 1000 --reads 100000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlite.schemas import PatientHistory
+
+from utils.recent_readings import RecentReadingsCache
+from utils.shared_readings import SharedRecentReadingsCache
+
+CAPACITY = 10
+
+
+def reading(id: int) -> PatientHistory:
+    return PatientHistory.model_construct(
+        spo2_reading=97.0,
+        systolic_reading=120,
+        diastolic_reading=80,
+        temp_reading=36.8,
+        heartbeat_reading=72.0,
+        id=id,
+        created_at=datetime.utcnow(),
+    )
+
+
+def time_reads(cache, patients: int, reads: int, append_every: int | None) -> dict:
+    for patient_id in range(1, patients + 1):
+        cache.get(patient_id, lambda limit: [reading(i) for i in range(limit, 0, -1)])
+    ids = [random.randint(1, patients) for _ in range(reads)]
+    next_id = CAPACITY + 1
+    start = time.perf_counter()
+    for i, patient_id in enumerate(ids):
+        if append_every and i % append_every == 0:
+            cache.append(patient_id, reading(next_id))
+            next_id += 1
+        cache.get(patient_id, lambda limit: [])
+    elapsed = time.perf_counter() - start
+    return {"reads": reads, "mean_us": elapsed / reads * 1e6}
+
+
+def follower(path: str, patients: int, appended_id, ready, appended, seen) -> None:
+    cache = SharedRecentReadingsCache(
+        path=path, capacity=CAPACITY, max_patients=patients
+    )
+    ready.set()
+    while True:
+        appended.wait()
+        appended.clear()
+        target = appended_id.value
+        if target < 0:
+            return
+        while cache.get(1, lambda limit: [])[0].id != target:
+            pass
+        seen.set()
+
+
+def time_cross_process(path: str, patients: int, rounds: int) -> dict:
+    cache = SharedRecentReadingsCache(
+        path=path, capacity=CAPACITY, max_patients=patients
+    )
+    cache.get(1, lambda limit: [reading(1)])
+    appended_id = multiprocessing.Value("q", 0)
+    ready, appended, seen = (multiprocessing.Event() for _ in range(3))
+    process = multiprocessing.Process(
+        target=follower, args=(path, patients, appended_id, ready, appended, seen)
+    )
+    process.start()
+    ready.wait()
+    latencies = []
+    for i in range(rounds):
+        appended_id.value = i + 2
+        seen.clear()
+        start = time.perf_counter()
+        cache.append(1, reading(i + 2))
+        appended.set()
+        seen.wait()
+        latencies.append(time.perf_counter() - start)
+    appended_id.value = -1
+    appended.set()
+    process.join()
+    latencies.sort()
+    return {
+        "rounds": rounds,
+        "p50_us": latencies[len(latencies) // 2] * 1e6,
+        "max_us": latencies[-1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--append-every", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="health-mon-bench-")
+    report = {}
+    for name, create in (
+        (
+            "process_local",
+            lambda: RecentReadingsCache(capacity=CAPACITY, max_patients=args.patients),
+        ),
+        (
+            "shared",
+            lambda: SharedRecentReadingsCache(
+                path=tempfile.mktemp(dir=directory),
+                capacity=CAPACITY,
+                max_patients=args.patients,
+            ),
+        ),
+    ):
+        report[name] = {
+            "warm_hit": time_reads(create(), args.patients, args.reads, None),
+            "hit_after_append": time_reads(
+                create(), args.patients, args.reads, args.append_every
+            ),
+        }
+    report["shared"]["cross_process_append_to_read"] = time_cross_process(
+        os.path.join(directory, "cross_process"), args.patients, args.rounds
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Measure how long a worker takes to boot, from process start to serving requests
+
+Every run starts a fresh interpreter, so nothing is cached in memory between runs. Each
+boot is split into importing main, the lifespan startup and the first requests. The first
+request to a hot route and the first request to a lazily loaded admin route are timed
+separately. With --hypercorn, the time from spawning hypercorn to the first response is
+measured as well, that is the figure that matters when workers are scaled up.
+
+Run with: python -m benchmarks.startup --runs 10 --hypercorn
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import use_temporary_database, migrate_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter, prints the phases in seconds as JSON
+PHASES = """
+import json, time
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    started = time.perf_counter()
+    client.get("/current/history")
+    first_request = time.perf_counter()
+    client.get("/users")
+    first_admin_request = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "lifespan_seconds": started - imported,
+    "first_request_seconds": first_request - started,
+    "first_admin_request_seconds": first_admin_request - first_request,
+}))
+"""
+
+
+def measure_phases() -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PHASES],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    total = time.perf_counter() - started
+    # Interpreter startup and shutdown are whatever the phases leave out
+    return {**json.loads(output.splitlines()[-1]), "process_seconds": total}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_hypercorn(workers: int, timeout: float = 60.0) -> float:
+    """Seconds from spawning hypercorn to its first response"""
+    port = free_port()
+    started = time.perf_counter()
+    app = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "hypercorn",
+            "main:app",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    try:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/current/history", timeout=1.0)
+                return time.perf_counter() - started
+            except httpx.TransportError:
+                if time.perf_counter() - started > timeout:
+                    raise
+                time.sleep(0.005)
+    finally:
+        app.terminate()
+        app.wait()
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "median_ms": statistics.median(values) * 1000,
+        "min_ms": min(values) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--hypercorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+
+    runs = [measure_phases() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "phases": {key: summarize([x[key] for x in runs]) for key in runs[0]},
+    }
+    if args.hypercorn:
+        report["hypercorn_ready"] = summarize(
+            [measure_hypercorn(args.workers) for _ in range(args.runs)]
+        )
+        report["hypercorn_workers"] = args.workers
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
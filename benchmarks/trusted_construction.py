@@ -0,0 +1,152 @@
+"""Compare CPU time of building and rendering a Page[Patient] from ORM rows
+
+The validated path is what routes did before: Patient(**row.__dict__, ...), followed by
+FastAPI validating the return value against the response_model once more. The trusted
+path builds the same page with utils.trusted_models and renders it with
+PydanticJSONResponse.
+
+Run with: python -m benchmarks.trusted_construction --patients 50 --repeat 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temporary_database
+
+
+def build_rows(patients: int, associated: int, histories: int):
+    from sqlite import models
+    from sqlite.enums import CombinedRoleEnum, GenderEnum, PatientBloodGroupEnum
+
+    now = datetime.utcnow()
+
+    def user(user_id: int, role: str) -> models.UserModel:
+        return models.UserModel(
+            id=user_id,
+            name=f"{role} {user_id}",
+            email=f"{role}{user_id}@example.com",
+            password="",
+            gender=GenderEnum.RATHER_NOT_SAY,
+            user_role=CombinedRoleEnum(role),
+            created_at=now,
+            updated_at=now,
+            additional_details=models.UserAdditionalDetailsModel(
+                user_id=user_id,
+                phone=None,
+                age=40,
+                blood_group=PatientBloodGroupEnum.O_POSITIVE,
+            ),
+        )
+
+    caretakers = [user(10_000 + j, "caretaker") for j in range(associated)]
+    doctors = [user(20_000 + j, "doctor") for j in range(associated)]
+    return [
+        (
+            user(i, "patient"),
+            caretakers,
+            doctors,
+            [
+                models.PatientHistoryModel(
+                    id=i * histories + j + 1,
+                    patient_id=i,
+                    spo2_reading=97.5,
+                    systolic_reading=120,
+                    diastolic_reading=80,
+                    temp_reading=36.8,
+                    heartbeat_reading=72.0,
+                    created_at=now - timedelta(minutes=j),
+                )
+                for j in range(histories)
+            ],
+        )
+        for i in range(1, patients + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--associated", type=int, default=2)
+    parser.add_argument("--histories", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temporary_database()
+
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from fastapi_pagination import Page
+
+    from sqlite.schemas import Patient, PatientHistory
+    from utils.responses import PydanticJSONResponse
+    from utils.trusted_models import construct_patient, construct_patient_history
+
+    rows = build_rows(args.patients, args.associated, args.histories)
+    field = create_response_field(name="Response", type_=Page[Patient])
+
+    def page_of(items):
+        return Page[Patient](
+            items=items, total=len(items), page=1, size=len(items), pages=1
+        )
+
+    async def validated_path():
+        page = page_of(
+            [
+                Patient(
+                    **patient.__dict__,
+                    caretakers=caretakers,
+                    doctors=doctors,
+                    history=[PatientHistory.model_validate(x) for x in history],
+                )
+                for patient, caretakers, doctors, history in rows
+            ]
+        )
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    def trusted_path():
+        page = page_of(
+            [
+                construct_patient(
+                    db_patient=patient,
+                    db_caretakers=caretakers,
+                    db_doctors=doctors,
+                    history=[construct_patient_history(x) for x in history],
+                )
+                for patient, caretakers, doctors, history in rows
+            ]
+        )
+        return PydanticJSONResponse(page).body
+
+    loop = asyncio.new_event_loop()
+    assert json.loads(loop.run_until_complete(validated_path())) == json.loads(
+        trusted_path()
+    )
+
+    def cpu_time(run) -> float:
+        start = time.process_time()
+        for _ in range(args.repeat):
+            run()
+        return (time.process_time() - start) / args.repeat * 1000
+
+    validated = cpu_time(lambda: loop.run_until_complete(validated_path()))
+    trusted = cpu_time(trusted_path)
+    print(
+        json.dumps(
+            {
+                "patients": args.patients,
+                "validated_cpu_ms": validated,
+                "trusted_cpu_ms": trusted,
+                "speedup": validated / trusted,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
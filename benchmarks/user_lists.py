@@ -0,0 +1,162 @@
+"""Time filtered and sorted pages of the admin user lists
+
+Seeds patients, caretakers and doctors spread over two years of created_at, then times
+paginating a page and its total, as GET /users, /patients, /caretakers and /doctors do,
+for each combination of filters and sort order below, along with the query plans of the
+total and the page. Pass --without-indexes to drop the indexes serving the lists first.
+
+Run with: python -m benchmarks.user_lists --users 100000 --repeat 20
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temporary_database, migrate_database
+from benchmarks.common import summarize_latencies
+
+PAGE_SIZE = 50
+LIST_INDEXES = (
+    "ix_users_user_role_name",
+    "ix_users_user_role_gender",
+    "ix_users_user_role_created_at",
+    "ix_users_created_at",
+    "ix_user_additional_details_blood_group_user_id",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--without-indexes", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+
+    from fastapi_pagination import Params
+    from fastapi_pagination.ext.sqlalchemy import paginate
+    from sqlalchemy import event, text
+
+    from sqlite.database import SessionLocal, engine
+    from sqlite.enums import CombinedRoleEnum
+    from sqlite.schemas import UserListFilterClass, UserListWithRoleFilterClass
+    from sqlite.seed import insert_users
+    from sqlite.crud.users import get_all_users
+    from sqlite.crud.patients.detailed import (
+        get_all_patients_with_caretakers_and_doctors,
+    )
+    from sqlite.crud.caretakers.detailed import get_all_caretakers_with_patients
+    from sqlite.crud.doctors.detailed import get_all_doctors_with_patients
+
+    with engine.begin() as connection:
+        rng = random.Random(0)
+        insert_users(connection, CombinedRoleEnum.DOCTOR, args.users // 100, "", rng)
+        insert_users(connection, CombinedRoleEnum.CARETAKER, args.users // 20, "", rng)
+        insert_users(connection, CombinedRoleEnum.PATIENT, args.users, "", rng)
+        connection.execute(
+            text(
+                "UPDATE users SET created_at = strftime('%Y-%m-%d %H:%M:%f000', "
+                "created_at, '-' || (id * 7919 % 730) || ' days')"
+            )
+        )
+        if args.without_indexes:
+            for index in LIST_INDEXES:
+                connection.execute(text(f"DROP INDEX {index}"))
+    last_month = datetime.utcnow() - timedelta(days=30)
+
+    cases = {
+        "users": (get_all_users, UserListWithRoleFilterClass()),
+        "users?user_role=patient&sort_by=created_at&sort_order=desc": (
+            get_all_users,
+            UserListWithRoleFilterClass(
+                user_role="patient", sort_by="created_at", sort_order="desc"
+            ),
+        ),
+        "users?user_role=doctor": (
+            get_all_users,
+            UserListWithRoleFilterClass(user_role="doctor"),
+        ),
+        "users?created_after=<last month>": (
+            get_all_users,
+            UserListWithRoleFilterClass(created_after=last_month),
+        ),
+        "patients": (get_all_patients_with_caretakers_and_doctors, None),
+        "patients?sort_by=name": (
+            get_all_patients_with_caretakers_and_doctors,
+            UserListFilterClass(sort_by="name"),
+        ),
+        "patients?sort_by=created_at&sort_order=desc": (
+            get_all_patients_with_caretakers_and_doctors,
+            UserListFilterClass(sort_by="created_at", sort_order="desc"),
+        ),
+        "patients?created_after=<last month>&sort_by=created_at": (
+            get_all_patients_with_caretakers_and_doctors,
+            UserListFilterClass(created_after=last_month, sort_by="created_at"),
+        ),
+        "patients?blood_group=O-": (
+            get_all_patients_with_caretakers_and_doctors,
+            UserListFilterClass(blood_group="O-"),
+        ),
+        "patients?gender=female": (
+            get_all_patients_with_caretakers_and_doctors,
+            UserListFilterClass(gender="female"),
+        ),
+        "caretakers?sort_by=name": (
+            get_all_caretakers_with_patients,
+            UserListFilterClass(sort_by="name"),
+        ),
+        "doctors?sort_by=created_at&sort_order=desc": (
+            get_all_doctors_with_patients,
+            UserListFilterClass(sort_by="created_at", sort_order="desc"),
+        ),
+    }
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, executemany: (
+            statements.append((statement, parameters))
+        ),
+    )
+
+    report = {"users": args.users, "without_indexes": args.without_indexes}
+    with SessionLocal() as db:
+        for name, (get_all, filters) in cases.items():
+            latencies = []
+            for _ in range(args.repeat):
+                statements.clear()
+                start = time.perf_counter()
+                page = paginate(get_all(db=db, filters=filters), Params(size=PAGE_SIZE))
+                latencies.append(time.perf_counter() - start)
+                db.expunge_all()
+            # The total, then the page
+            with engine.connect() as connection:
+                plans = [
+                    [
+                        row[3]
+                        for row in connection.exec_driver_sql(
+                            f"EXPLAIN QUERY PLAN {statement}", parameters
+                        )
+                    ]
+                    for statement, parameters in list(statements)
+                ]
+            report[name] = {
+                "total": page.total,
+                "plans": plans,
+                **summarize_latencies(latencies),
+            }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare user search through the FTS5 index with LIKE scans over users
+
+Seeds users with realistic names, emails and phones, then times paginating a page of
+results and their total, as GET /users/search does, for crud.search_users and for the
+equivalent LIKE '%...%' filter over name, email and phone. Also times seeding, which
+pays for the triggers keeping the index in sync.
+
+Run with: python -m benchmarks.user_search --users 100000 --repeat 50
+"""
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import use_temporary_database, migrate_database
+from benchmarks.common import summarize_latencies
+
+PAGE_SIZE = 50
+# A rare and a common name, a name and part of a surname, a phone prefix, an email
+SEARCHES = ("zainab", "ali", "sara kh", "+1555000012", "omar.malik.4")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+
+    from fastapi_pagination import Params
+    from fastapi_pagination.ext.sqlalchemy import paginate
+    from sqlalchemy import or_
+
+    from sqlite import models
+    from sqlite.database import SessionLocal, engine
+    from sqlite.enums import CombinedRoleEnum
+    from sqlite.seed import insert_users
+    import sqlite.crud.users as crud
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        rng = random.Random(0)
+        insert_users(connection, CombinedRoleEnum.DOCTOR, args.users // 100, "", rng)
+        insert_users(connection, CombinedRoleEnum.PATIENT, args.users, "", rng)
+    report = {"users": args.users, "seed_seconds": time.perf_counter() - started}
+
+    def like(search: str, db):
+        words = search.split()
+        return (
+            db.query(models.UserModel)
+            .outerjoin(models.UserModel.additional_details)
+            .filter(
+                *(
+                    or_(
+                        models.UserModel.name.like(f"%{word}%"),
+                        models.UserModel.email.like(f"%{word}%"),
+                        models.UserAdditionalDetailsModel.phone.like(f"%{word}%"),
+                    )
+                    for word in words
+                )
+            )
+            .order_by(models.UserModel.id)
+        )
+
+    def fts(search: str, db):
+        return crud.search_users(search=search, db=db)
+
+    def fts_patients(search: str, db):
+        return crud.search_users(
+            search=search, user_role=CombinedRoleEnum.PATIENT, db=db
+        )
+
+    for name, query in (("fts", fts), ("fts_patients", fts_patients), ("like", like)):
+        report[name] = {}
+        with SessionLocal() as db:
+            for search in SEARCHES:
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    total = paginate(query(search, db), Params(size=PAGE_SIZE)).total
+                    latencies.append(time.perf_counter() - start)
+                    db.expunge_all()
+                report[name][search] = {
+                    "total": total,
+                    **summarize_latencies(latencies),
+                }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Compare ingest and read throughput across worker counts, with and without the history writer
+
+For every combination of HISTORY_WRITER mode and worker count, starts main:app with
+hypercorn on the same seeded database and drives it closed loop: ingest clients post
+readings back to back while dashboard clients poll their patients. With direct writes
+every worker competes for the SQLite write lock, with the socket writer one worker per
+node writes for all of them.
+
+Run with: python -m benchmarks.writer_scaling --workers 1,2,4 --duration 15
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import use_temporary_database, migrate_database
+from benchmarks.common import summarize_latencies
+from benchmarks.fleet import free_port, seed, start_app, wait_until_ready
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TimeoutException:
+            self.statuses["timeout"] += 1
+            return
+        except httpx.TransportError:
+            self.statuses["transport error"] += 1
+            return
+        self.statuses[str(response.status_code)] += 1
+        if response.status_code == 200:
+            self.latencies.append(time.perf_counter() - start)
+
+    def report(self, seconds: float) -> dict:
+        return {
+            **summarize_latencies(self.latencies),
+            "per_second": len(self.latencies) / seconds,
+            "statuses": dict(self.statuses),
+        }
+
+
+def reading() -> dict:
+    return {
+        "spo2_reading": round(random.uniform(93.0, 99.5), 1),
+        "systolic_reading": random.randint(100, 150),
+        "diastolic_reading": random.randint(60, 95),
+        "temp_reading": round(random.uniform(36.1, 38.2), 1),
+        "heartbeat_reading": float(random.randint(55, 110)),
+    }
+
+
+async def run(args: argparse.Namespace, tokens: dict[str, list[str]]) -> dict:
+    ingest = Recorder()
+    reads = Recorder()
+    connections = args.ingest_clients + args.viewers
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}",
+        limits=httpx.Limits(
+            max_connections=connections, max_keepalive_connections=connections
+        ),
+        timeout=args.timeout,
+    ) as client:
+
+        async def monitor(until: float):
+            while time.monotonic() < until:
+                headers = {
+                    "Authorization": f"Bearer {random.choice(tokens['patient'])}"
+                }
+                if args.batch == 1:
+                    await ingest.request(
+                        client,
+                        "POST",
+                        "/current/history",
+                        headers=headers,
+                        json=reading(),
+                    )
+                else:
+                    await ingest.request(
+                        client,
+                        "POST",
+                        "/current/history/batch",
+                        headers=headers,
+                        json=[reading() for _ in range(args.batch)],
+                    )
+
+        async def dashboard(token: str, until: float):
+            headers = {"Authorization": f"Bearer {token}"}
+            while time.monotonic() < until:
+                await reads.request(client, "GET", "/current/patients", headers=headers)
+
+        started = time.monotonic()
+        until = started + args.duration
+        await asyncio.gather(
+            *(monitor(until) for _ in range(args.ingest_clients)),
+            *(dashboard(x, until) for x in tokens["viewer"]),
+        )
+        elapsed = time.monotonic() - started
+
+    return {
+        "history_writer": args.history_writer,
+        "workers": args.workers,
+        "elapsed_seconds": elapsed,
+        "readings_per_request": args.batch,
+        "ingest": ingest.report(elapsed),
+        "reads": reads.report(elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default="1,2,4", help="Comma separated counts")
+    parser.add_argument("--modes", default="direct,socket", help="HISTORY_WRITER modes")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--viewers", type=int, default=16)
+    parser.add_argument("--ingest-clients", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=1, help="Readings per request")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    use_temporary_database()
+    migrate_database()
+    tokens = seed(args)
+
+    results = []
+    for mode in args.modes.split(","):
+        for workers in [int(x) for x in args.workers.split(",")]:
+            os.environ["HISTORY_WRITER"] = mode
+            run_args = argparse.Namespace(
+                **vars(args), history_writer=mode, port=free_port()
+            )
+            run_args.workers = workers
+            app = start_app(run_args)
+            try:
+                asyncio.run(wait_until_ready(f"http://127.0.0.1:{run_args.port}"))
+                result = asyncio.run(run(run_args, tokens))
+            finally:
+                app.terminate()
+                app.wait()
+            print(json.dumps(result, indent=2), flush=True)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    print(
+        json.dumps(
+            [
+                {
+                    "history_writer": x["history_writer"],
+                    "workers": x["workers"],
+                    "ingest_per_second": round(x["ingest"]["per_second"], 1),
+                    "ingest_p99_ms": round(x["ingest"].get("p99_ms", 0.0), 1),
+                    "ingest_statuses": x["ingest"]["statuses"],
+                    "reads_per_second": round(x["reads"]["per_second"], 1),
+                    "reads_p99_ms": round(x["reads"].get("p99_ms", 0.0), 1),
+                }
+                for x in results
+            ],
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
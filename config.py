@@ -0,0 +1,157 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables into memory
+load_dotenv()
+
+
+class Config:
+    DEBUG: bool
+    SQLALCHEMY_DATABASE_URL: str
+    DATABASE_STARTUP: str
+    OUTBOX_WORKERS: int
+    OUTBOX_BATCH_SIZE: int
+    OUTBOX_MAX_ATTEMPTS: int
+    OUTBOX_POLL_INTERVAL_SECONDS: float
+    RECENT_READINGS_PER_PATIENT: int
+    RECENT_READINGS_MAX_PATIENTS: int
+    SHARED_CACHE: bool
+    SHARED_CACHE_DIRECTORY: str
+    PASSWORD_HASH_WORKERS: int
+    USER_IMPORT_MAX_ROWS: int
+    USER_IMPORT_CHUNK_SIZE: int
+    ASSOCIATION_MAX_BATCH_SIZE: int
+    INGEST_MAX_BATCH_SIZE: int
+    INGEST_MAX_BODY_BYTES: int
+    HISTORY_WRITER: str
+    HISTORY_WRITER_SOCKET: str
+    HISTORY_WRITER_MAX_BATCH_SIZE: int
+    HISTORY_WRITER_TIMEOUT_SECONDS: float
+    SLOW_QUERY_THRESHOLD_MS: float
+    SLOW_QUERY_LOG_SIZE: int
+    TRACING_EXPORTER: str
+    TRACING_FILE: str
+    TRACING_MAX_TRACES: int
+    EVENT_LOOP_MONITOR_INTERVAL_SECONDS: float
+    EVENT_LOOP_BLOCKING_CAPTURE: bool
+    EVENT_LOOP_BLOCKING_THRESHOLD_MS: float
+    PROFILER_MAX_PROFILES: int
+    PROFILER_SAMPLE_INTERVAL_MS: float
+
+    def __init__(
+        self,
+        debug: bool | str,
+        sqlalchemy_database_url: str,
+        database_startup: str,
+        outbox_workers: int | str,
+        outbox_batch_size: int | str,
+        outbox_max_attempts: int | str,
+        outbox_poll_interval_seconds: float | str,
+        recent_readings_per_patient: int | str,
+        recent_readings_max_patients: int | str,
+        shared_cache: bool | str,
+        shared_cache_directory: str,
+        password_hash_workers: int | str,
+        user_import_max_rows: int | str,
+        user_import_chunk_size: int | str,
+        association_max_batch_size: int | str,
+        ingest_max_batch_size: int | str,
+        ingest_max_body_bytes: int | str,
+        history_writer: str,
+        history_writer_socket: str,
+        history_writer_max_batch_size: int | str,
+        history_writer_timeout_seconds: float | str,
+        slow_query_threshold_ms: float | str,
+        slow_query_log_size: int | str,
+        tracing_exporter: str,
+        tracing_file: str,
+        tracing_max_traces: int | str,
+        event_loop_monitor_interval_seconds: float | str,
+        event_loop_blocking_capture: bool | str,
+        event_loop_blocking_threshold_ms: float | str,
+        profiler_max_profiles: int | str,
+        profiler_sample_interval_ms: float | str,
+    ) -> None:
+        self.DEBUG = str(debug).lower() in ("1", "true", "yes")
+        self.SQLALCHEMY_DATABASE_URL = sqlalchemy_database_url
+        self.DATABASE_STARTUP = database_startup.lower()
+        self.OUTBOX_WORKERS = int(outbox_workers)
+        self.OUTBOX_BATCH_SIZE = int(outbox_batch_size)
+        self.OUTBOX_MAX_ATTEMPTS = int(outbox_max_attempts)
+        self.OUTBOX_POLL_INTERVAL_SECONDS = float(outbox_poll_interval_seconds)
+        self.RECENT_READINGS_PER_PATIENT = int(recent_readings_per_patient)
+        self.RECENT_READINGS_MAX_PATIENTS = int(recent_readings_max_patients)
+        self.SHARED_CACHE = str(shared_cache).lower() in ("1", "true", "yes")
+        self.SHARED_CACHE_DIRECTORY = shared_cache_directory
+        self.PASSWORD_HASH_WORKERS = int(password_hash_workers) or os.cpu_count() or 1
+        self.USER_IMPORT_MAX_ROWS = int(user_import_max_rows)
+        self.USER_IMPORT_CHUNK_SIZE = int(user_import_chunk_size)
+        self.ASSOCIATION_MAX_BATCH_SIZE = int(association_max_batch_size)
+        self.INGEST_MAX_BATCH_SIZE = int(ingest_max_batch_size)
+        self.INGEST_MAX_BODY_BYTES = int(ingest_max_body_bytes)
+        self.HISTORY_WRITER = history_writer.lower()
+        self.HISTORY_WRITER_SOCKET = history_writer_socket
+        self.HISTORY_WRITER_MAX_BATCH_SIZE = int(history_writer_max_batch_size)
+        self.HISTORY_WRITER_TIMEOUT_SECONDS = float(history_writer_timeout_seconds)
+        self.SLOW_QUERY_THRESHOLD_MS = float(slow_query_threshold_ms)
+        self.SLOW_QUERY_LOG_SIZE = int(slow_query_log_size)
+        self.TRACING_EXPORTER = tracing_exporter.lower()
+        self.TRACING_FILE = tracing_file
+        self.TRACING_MAX_TRACES = int(tracing_max_traces)
+        self.EVENT_LOOP_MONITOR_INTERVAL_SECONDS = float(
+            event_loop_monitor_interval_seconds
+        )
+        self.EVENT_LOOP_BLOCKING_CAPTURE = str(event_loop_blocking_capture).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        self.EVENT_LOOP_BLOCKING_THRESHOLD_MS = float(event_loop_blocking_threshold_ms)
+        self.PROFILER_MAX_PROFILES = int(profiler_max_profiles)
+        self.PROFILER_SAMPLE_INTERVAL_MS = float(profiler_sample_interval_ms)
+
+
+config = Config(
+    debug=os.getenv("DEBUG", False),
+    sqlalchemy_database_url=os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///sqlite.db"),
+    # check, upgrade or off
+    database_startup=os.getenv("DATABASE_STARTUP", "check"),
+    outbox_workers=os.getenv("OUTBOX_WORKERS", 2),
+    outbox_batch_size=os.getenv("OUTBOX_BATCH_SIZE", 100),
+    outbox_max_attempts=os.getenv("OUTBOX_MAX_ATTEMPTS", 5),
+    outbox_poll_interval_seconds=os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", 1.0),
+    recent_readings_per_patient=os.getenv("RECENT_READINGS_PER_PATIENT", 10),
+    recent_readings_max_patients=os.getenv("RECENT_READINGS_MAX_PATIENTS", 10000),
+    # Share recent readings and cache invalidations between the workers of a node
+    shared_cache=os.getenv("SHARED_CACHE", False),
+    # Empty for the database path with .cache appended
+    shared_cache_directory=os.getenv("SHARED_CACHE_DIRECTORY", ""),
+    # 0 for one per CPU
+    password_hash_workers=os.getenv("PASSWORD_HASH_WORKERS", 0),
+    user_import_max_rows=os.getenv("USER_IMPORT_MAX_ROWS", 10000),
+    user_import_chunk_size=os.getenv("USER_IMPORT_CHUNK_SIZE", 500),
+    association_max_batch_size=os.getenv("ASSOCIATION_MAX_BATCH_SIZE", 1000),
+    ingest_max_batch_size=os.getenv("INGEST_MAX_BATCH_SIZE", 1000),
+    ingest_max_body_bytes=os.getenv("INGEST_MAX_BODY_BYTES", 1048576),
+    # direct or socket, socket funnels history writes of every worker through one writer
+    history_writer=os.getenv("HISTORY_WRITER", "direct"),
+    # Empty for the database path with .writer.sock appended
+    history_writer_socket=os.getenv("HISTORY_WRITER_SOCKET", ""),
+    history_writer_max_batch_size=os.getenv("HISTORY_WRITER_MAX_BATCH_SIZE", 1000),
+    history_writer_timeout_seconds=os.getenv("HISTORY_WRITER_TIMEOUT_SECONDS", 5.0),
+    slow_query_threshold_ms=os.getenv("SLOW_QUERY_THRESHOLD_MS", 100.0),
+    slow_query_log_size=os.getenv("SLOW_QUERY_LOG_SIZE", 100),
+    # none, memory or file
+    tracing_exporter=os.getenv("TRACING_EXPORTER", "none"),
+    tracing_file=os.getenv("TRACING_FILE", "traces.jsonl"),
+    tracing_max_traces=os.getenv("TRACING_MAX_TRACES", 100),
+    event_loop_monitor_interval_seconds=os.getenv(
+        "EVENT_LOOP_MONITOR_INTERVAL_SECONDS", 0.25
+    ),
+    event_loop_blocking_capture=os.getenv("EVENT_LOOP_BLOCKING_CAPTURE", False),
+    event_loop_blocking_threshold_ms=os.getenv(
+        "EVENT_LOOP_BLOCKING_THRESHOLD_MS", 100.0
+    ),
+    profiler_max_profiles=os.getenv("PROFILER_MAX_PROFILES", 20),
+    profiler_sample_interval_ms=os.getenv("PROFILER_SAMPLE_INTERVAL_MS", 1.0),
+)
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -6,16 +9,7 @@ from fastapi_pagination import add_pagination
 # Auth
 from routers import jwt_tokens
 
-# Admin level routes
-from routers.admin import (
-    admins,
-    associations,
-    caretakers,
-    doctors,
-    patients,
-    users,
-    stats,
-)
+# Admin level routes are included lazily, see ADMIN_ROUTERS
 
 # Current user level routes - Non admin
 ## Current - Patient user level routes
@@ -27,11 +21,25 @@ from routers.current.patients import (
 ## Current - Caretaker and doctor user level routes
 from routers.current.caretaker_and_doctor import (
     patients as current_caretaker_and_doctor_patients,
+    vital_rules as current_doctor_vital_rules,
+    notifications as current_caretaker_notifications,
 )
 
 # Common user level routes
 from routers.common import me as common_me
 
+from sqlite.startup import prepare_database
+
+from utils.lazy_routes import include_lazy_router, use_openapi_with_lazy_routes
+from utils.metrics import MetricsMiddleware
+from utils.query_stats import QueryStatsMiddleware
+from utils.tracing import TracingMiddleware
+from utils.loop_monitor import EventLoopMonitorMiddleware, event_loop_monitor
+from utils.profiler import ProfilerMiddleware
+from utils.notifications import outbox_dispatcher
+from utils.history_writer import history_writer
+from utils.invalidation import invalidation_bus
+
 tags_metadata = [
     # Auth
     {
@@ -39,6 +47,8 @@ tags_metadata = [
         "description": "Create JWT based access tokens that use SHA256 enterprise level security.",
     },
     # Admin level routes
+    ## Metrics, slow queries, traces, event loop, profiles and memory are kept in memory by
+    ## every worker, their responses name the worker in the X-Worker-Pid header
     {
         "name": "admin - users",
         "description": "Create, read, update and manage all users - Admin level routes.",
@@ -67,6 +77,34 @@ tags_metadata = [
         "name": "admin - stats",
         "description": "Get stats for the dashboard - Admin level routes.",
     },
+    {
+        "name": "admin - metrics",
+        "description": "Read service metrics in Prometheus text format, of the worker that answers - Admin level routes.",
+    },
+    {
+        "name": "admin - slow queries",
+        "description": "Read recent slow SQL queries with their query plans, of the worker that answers - Admin level routes.",
+    },
+    {
+        "name": "admin - traces",
+        "description": "Read recent request traces in OTLP/JSON format, of the worker that answers - Admin level routes.",
+    },
+    {
+        "name": "admin - event loop",
+        "description": "Read stacks captured while the event loop of the worker that answers was blocked - Admin level routes.",
+    },
+    {
+        "name": "admin - profiles",
+        "description": "List and download profiles of single requests, kept by the worker that answers - Admin level routes.",
+    },
+    {
+        "name": "admin - memory",
+        "description": "Trace allocations, diff snapshots and count live objects, of the worker that answers - Admin level routes.",
+    },
+    {
+        "name": "admin - vital rules",
+        "description": "Create, read, update and manage patient vital alert thresholds - Admin level routes.",
+    },
     # Current level routes - Non admin
     ## Current - Patient user level routes
     {
@@ -82,50 +120,112 @@ tags_metadata = [
         "name": "caretaker and doctor - patients",
         "description": "Read and fetch all patients for current user - Caretaker and doctor level routes.",
     },
+    ## Current - Caretaker user level routes
+    {
+        "name": "caretaker - notifications",
+        "description": "Read patient action notifications for current user - Caretaker level routes.",
+    },
+    ## Current - Doctor user level routes
+    {
+        "name": "doctor - vital rules",
+        "description": "Manage vital alert thresholds for current user's patients - Doctor level routes.",
+    },
     # Common user level routes
     {
         "name": "common - me",
         "description": "Manage current user - Common user level routes.",
     },
 ]
+
+
+# Prefix and module of every admin level router. Admin routes are rarely hit, so they are
+# imported on the first request under their prefix instead of on every worker boot
+ADMIN_ROUTERS = [
+    ("/users", "routers.admin.users"),
+    ("/associations", "routers.admin.associations"),
+    ("/admins", "routers.admin.admins"),
+    ("/caretakers", "routers.admin.caretakers"),
+    ("/doctors", "routers.admin.doctors"),
+    ("/patients", "routers.admin.patients"),
+    ("/stats", "routers.admin.stats"),
+    ("/metrics", "routers.admin.metrics"),
+    ("/slow-queries", "routers.admin.slow_queries"),
+    ("/traces", "routers.admin.traces"),
+    ("/event-loop", "routers.admin.event_loop"),
+    ("/profiles", "routers.admin.profiles"),
+    ("/memory", "routers.admin.memory"),
+    ("/vital-rules", "routers.admin.vital_rules"),
+]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Check or migrate the schema and warm the connection pool, before serving
+    await asyncio.to_thread(prepare_database)
+    # Lead or follow the single history writer of the node, when enabled
+    history_writer.start()
+    # Drop cache entries other workers of the node invalidated, when shared
+    invalidation_bus.start()
+    # Deliver patient actions from the outbox in the background
+    outbox_dispatcher.start()
+    # Export event loop lag, and capture what blocks the loop when enabled
+    event_loop_monitor.start()
+    yield
+    await event_loop_monitor.stop()
+    await outbox_dispatcher.stop()
+    await history_writer.stop()
+    invalidation_bus.stop()
+
+
 origins = [
     "*",
 ]
 
-app = FastAPI(
-    title="IoT Health Tracking System",
-    description="Python FastAPI IoT based Health Tracking System for Immobilized Patients.",
-    version="1.0.0",
-    openapi_tags=tags_metadata,
-    redoc_url=None,
-    swagger_ui_parameters={"defaultModelsExpandDepth": -1},
-)
 
-# Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="IoT Health Tracking System",
+        description="Python FastAPI IoT based Health Tracking System for Immobilized Patients.",
+        version="1.0.0",
+        openapi_tags=tags_metadata,
+        redoc_url=None,
+        swagger_ui_parameters={"defaultModelsExpandDepth": -1},
+        lifespan=lifespan,
+    )
+
+    # Middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Innermost of ours, so the other middleware is left out of profiles
+    app.add_middleware(ProfilerMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(EventLoopMonitorMiddleware)
+
+    app.include_router(jwt_tokens.router)
+    # Admin level routes
+    for prefix, module in ADMIN_ROUTERS:
+        include_lazy_router(app, prefix=prefix, module=module)
+    # Current user level routes - Non admin
+    ## Current - Patient user level routes
+    app.include_router(current_patient_actions.router)
+    app.include_router(current_patient_history.router)
+    ## Current - Caretaker and doctor user level routes
+    app.include_router(current_caretaker_and_doctor_patients.router)
+    app.include_router(current_doctor_vital_rules.router)
+    app.include_router(current_caretaker_notifications.router)
+    # Common user level routes
+    app.include_router(common_me.router)
+
+    add_pagination(app)  # add pagination to your app
+    use_openapi_with_lazy_routes(app)
+    return app
 
-app.include_router(jwt_tokens.router)
-# Admin level routes
-app.include_router(users.router)
-app.include_router(associations.router)
-app.include_router(admins.router)
-app.include_router(caretakers.router)
-app.include_router(doctors.router)
-app.include_router(patients.router)
-app.include_router(stats.router)
-# Current user level routes - Non admin
-## Current - Patient user level routes
-app.include_router(current_patient_actions.router)
-app.include_router(current_patient_history.router)
-## Current - Caretaker and doctor user level routes
-app.include_router(current_caretaker_and_doctor_patients.router)
-# Common user level routes
-app.include_router(common_me.router)
 
-add_pagination(app)  # add pagination to your app
+app = create_app()
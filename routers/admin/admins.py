@@ -11,7 +11,7 @@ import sqlite.crud.admins as crud
 from sqlite.schemas import User
 
 from utils.auth import user_should_be_admin
-from utils.responses import common_responses
+from utils.responses import common_responses, PydanticJSONResponse
 
 router = APIRouter(
     prefix="/admins",
@@ -29,7 +29,8 @@ router = APIRouter(
     response_model=Page[User],
 )
 async def get_all_admins(db: Session = Depends(get_db)):
-    return paginate(crud.get_all_admins(db=db))
+    page = paginate(crud.get_all_admins(db=db))
+    return PydanticJSONResponse(page)
 
 
 @router.get(
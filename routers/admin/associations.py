@@ -1,14 +1,24 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, status
+
+from config import config
 
 from sqlite.database import get_db
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 import sqlite.crud.associations as associations
 from sqlite.crud.caretakers.non_detailed import get_caretaker_by_id
 from sqlite.crud.doctors.non_detailed import get_doctor_by_id
 from sqlite.crud.patients.non_detailed import get_patient_by_id
+from sqlite.crud.users import get_user_ids_with_role
+from sqlite.enums import UserRoleEnum
 
-from sqlite.schemas import CommonResponseClass
+from sqlite.schemas import (
+    BulkAssociationResponseClass,
+    CaretakerAssociationClass,
+    CommonResponseClass,
+    DoctorAssociationClass,
+)
 
 from utils.auth import user_should_be_admin
 from utils.responses import common_responses
@@ -24,6 +34,45 @@ router = APIRouter(
 )
 
 
+def _check_bulk_associations(
+    pairs: list[tuple[int, int]], user_role: UserRoleEnum, db: Session
+):
+    """Check every pair is a patient and a user of user_role, with a query per role"""
+    if not pairs:
+        raise HTTPException(status_code=400, detail="No associations were sent")
+    if len(pairs) > config.ASSOCIATION_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {config.ASSOCIATION_MAX_BATCH_SIZE} associations can be sent at once",
+        )
+    for role, ids in (
+        (UserRoleEnum.PATIENT, {patient_id for patient_id, _ in pairs}),
+        (user_role, {user_id for _, user_id in pairs}),
+    ):
+        missing = ids - get_user_ids_with_role(
+            user_ids=list(ids), user_role=role, db=db
+        )
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"{role.value.capitalize()}s not found: "
+                + ", ".join(str(x) for x in sorted(missing)),
+            )
+
+
+def _bulk_conflict(error: IntegrityError):
+    """A user deleted since the pairs were checked broke a foreign key"""
+    return HTTPException(status_code=409, detail=f"Failed to associate: {error.orig}")
+
+
+def _bulk_response(detail: str, pairs: list, changed_count: int):
+    return {
+        "detail": detail,
+        "changed_count": changed_count,
+        "unchanged_count": len(pairs) - changed_count,
+    }
+
+
 @router.post(
     "/caretaker",
     summary="Associate a patient with a caretaker",
@@ -124,3 +173,87 @@ def disassociate_doctor(patient_id: int, doctor_id: int, db: Session = Depends(g
         return {"detail": "Disassociated successfully"}
     else:
         return {"detail": "Failed to disassocaite"}
+
+
+@router.post(
+    "/caretaker/bulk",
+    summary="Associate many patients with caretakers",
+    description=(
+        "Every patient and caretaker is checked up front, if any is missing nothing is "
+        "associated. Pairs that are already associated are left as they are. A patient "
+        "or caretaker deleted meanwhile fails the request with 409."
+    ),
+    response_model=BulkAssociationResponseClass,
+    responses={409: {"model": CommonResponseClass}},
+)
+def associate_caretakers(
+    associations_to_add: list[CaretakerAssociationClass], db: Session = Depends(get_db)
+):
+    pairs = [(x.patient_id, x.caretaker_id) for x in associations_to_add]
+    _check_bulk_associations(pairs=pairs, user_role=UserRoleEnum.CARETAKER, db=db)
+    try:
+        associated_count = associations.try_associate_patients_to_caretakers(
+            pairs=pairs, db=db
+        )
+    except IntegrityError as e:
+        raise _bulk_conflict(e)
+    return _bulk_response("Associated successfully", pairs, associated_count)
+
+
+@router.post(
+    "/disassociate/caretaker/bulk",
+    summary="Disassociate many patients from caretakers",
+    response_model=BulkAssociationResponseClass,
+)
+def disassociate_caretakers(
+    associations_to_remove: list[CaretakerAssociationClass],
+    db: Session = Depends(get_db),
+):
+    pairs = [(x.patient_id, x.caretaker_id) for x in associations_to_remove]
+    _check_bulk_associations(pairs=pairs, user_role=UserRoleEnum.CARETAKER, db=db)
+    disassociated_count = associations.try_disassociate_patients_from_caretakers(
+        pairs=pairs, db=db
+    )
+    return _bulk_response("Disassociated successfully", pairs, disassociated_count)
+
+
+@router.post(
+    "/doctor/bulk",
+    summary="Associate many patients with doctors",
+    description=(
+        "Every patient and doctor is checked up front, if any is missing nothing is "
+        "associated. Pairs that are already associated are left as they are. A patient "
+        "or doctor deleted meanwhile fails the request with 409."
+    ),
+    response_model=BulkAssociationResponseClass,
+    responses={409: {"model": CommonResponseClass}},
+)
+def associate_doctors(
+    associations_to_add: list[DoctorAssociationClass], db: Session = Depends(get_db)
+):
+    pairs = [(x.patient_id, x.doctor_id) for x in associations_to_add]
+    _check_bulk_associations(pairs=pairs, user_role=UserRoleEnum.DOCTOR, db=db)
+    try:
+        associated_count = associations.try_associate_patients_to_doctors(
+            pairs=pairs, db=db
+        )
+    except IntegrityError as e:
+        raise _bulk_conflict(e)
+    return _bulk_response("Associated successfully", pairs, associated_count)
+
+
+@router.post(
+    "/disassociate/doctor/bulk",
+    summary="Disassociate many patients from doctors",
+    response_model=BulkAssociationResponseClass,
+)
+def disassociate_doctors(
+    associations_to_remove: list[DoctorAssociationClass],
+    db: Session = Depends(get_db),
+):
+    pairs = [(x.patient_id, x.doctor_id) for x in associations_to_remove]
+    _check_bulk_associations(pairs=pairs, user_role=UserRoleEnum.DOCTOR, db=db)
+    disassociated_count = associations.try_disassociate_patients_from_doctors(
+        pairs=pairs, db=db
+    )
+    return _bulk_response("Disassociated successfully", pairs, disassociated_count)
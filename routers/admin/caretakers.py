@@ -12,10 +12,12 @@ from sqlite.crud.caretakers.detailed import (
 )
 from sqlite.crud.patients.non_detailed import get_all_patients_by_list_of_ids
 
-from sqlite.schemas import CaretakerOrDoctor
+from sqlite.schemas import CaretakerOrDoctor, UserListFilterClass
 
 from utils.auth import user_should_be_admin
-from utils.responses import common_responses
+from utils.list import pick_by_ids, split_list_of_ids
+from utils.responses import common_responses, PydanticJSONResponse
+from utils.trusted_models import construct_caretaker_or_doctor
 
 router = APIRouter(
     prefix="/caretakers",
@@ -27,25 +29,34 @@ router = APIRouter(
 )
 
 
+def _construct_caretakers(items: list, db: Session) -> list[CaretakerOrDoctor]:
+    """Build a page of caretakers, loading their patients all at once"""
+    items = [i for i in items if i[0]]
+    patient_ids = [split_list_of_ids(i[1]) for i in items]
+    db_patients = get_all_patients_by_list_of_ids(
+        patient_ids=list({x for ids in patient_ids for x in ids}), db=db
+    ).all()
+    return [
+        construct_caretaker_or_doctor(
+            db_user=i[0], db_patients=pick_by_ids(db_patients, ids)
+        )
+        for i, ids in zip(items, patient_ids)
+    ]
+
+
 @router.get(
     "",
     summary="Get a list of all caretakers (detailed)",
     response_model=Page[CaretakerOrDoctor],
 )
-async def get_all_detailed_caretakers(db: Session = Depends(get_db)):
-    return paginate(
-        get_all_caretakers_with_patients(db=db),
-        transformer=lambda items: [
-            CaretakerOrDoctor(
-                **i[0].__dict__,
-                patients=get_all_patients_by_list_of_ids(
-                    patient_ids=i[1].split(",") if i[1] else [], db=db
-                )
-            )
-            for i in items
-            if i[0]
-        ],
+async def get_all_detailed_caretakers(
+    filters: UserListFilterClass = Depends(), db: Session = Depends(get_db)
+):
+    page = paginate(
+        get_all_caretakers_with_patients(db=db, filters=filters),
+        transformer=lambda items: _construct_caretakers(items=items, db=db),
     )
+    return PydanticJSONResponse(page)
 
 
 @router.get(
@@ -57,9 +68,11 @@ async def get_detailed_caretaker_by_id(user_id: int, db: Session = Depends(get_d
     result = get_caretaker_with_patients_by_id(user_id=user_id, db=db)
     if result[0] is None:
         raise HTTPException(status_code=404, detail="Caretaker not found")
-    return CaretakerOrDoctor(
-        **result[0].__dict__,
-        patients=get_all_patients_by_list_of_ids(
-            patient_ids=result[1].split(",") if result[1] else [], db=db
+    return PydanticJSONResponse(
+        construct_caretaker_or_doctor(
+            db_user=result[0],
+            db_patients=get_all_patients_by_list_of_ids(
+                patient_ids=result[1].split(",") if result[1] else [], db=db
+            ),
         )
     )
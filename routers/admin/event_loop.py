@@ -0,0 +1,26 @@
+from fastapi import Depends, APIRouter
+
+from sqlite.schemas import EventLoopBlock
+
+from utils.auth import user_should_be_admin
+from utils.loop_monitor import event_loop_monitor
+from utils.responses import common_responses, label_worker
+
+router = APIRouter(
+    prefix="/event-loop",
+    tags=["admin - event loop"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "/blocks",
+    summary="Get the stacks captured while the event loop was blocked",
+    response_model=list[EventLoopBlock],
+)
+async def get_event_loop_blocks():
+    return event_loop_monitor.blocks()
@@ -0,0 +1,123 @@
+import tracemalloc
+from typing import Literal
+
+from fastapi import Depends, HTTPException, APIRouter, Query
+
+from sqlite.schemas import (
+    CommonResponseClass,
+    MemoryAllocation,
+    MemorySnapshot,
+    MemoryStatus,
+)
+
+from utils.auth import user_should_be_admin
+from utils.memory import (
+    diff_allocations,
+    memory_status,
+    snapshot_store,
+    top_allocations,
+)
+from utils.responses import common_responses, label_worker
+
+router = APIRouter(
+    prefix="/memory",
+    tags=["admin - memory"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+# Routes walking the heap are plain def, so they run in the threadpool off the event loop
+
+
+@router.get(
+    "",
+    summary="Get memory usage, live model instances and sessions of this worker",
+    response_model=MemoryStatus,
+)
+def get_memory_status():
+    return memory_status()
+
+
+@router.post(
+    "/tracemalloc/start",
+    summary="Start tracing allocations",
+    response_model=CommonResponseClass,
+)
+async def start_tracemalloc(frames: int = Query(default=1, ge=1, le=100)):
+    if tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="Tracemalloc is already tracing")
+    tracemalloc.start(frames)
+    return {"detail": "Started successfully"}
+
+
+@router.post(
+    "/tracemalloc/stop",
+    summary="Stop tracing allocations, snapshots taken so far are kept",
+    response_model=CommonResponseClass,
+)
+async def stop_tracemalloc():
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="Tracemalloc is not tracing")
+    tracemalloc.stop()
+    return {"detail": "Stopped successfully"}
+
+
+@router.post(
+    "/snapshots",
+    summary="Take a snapshot of the traced allocations",
+    response_model=MemorySnapshot,
+)
+def take_snapshot():
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="Tracemalloc is not tracing")
+    return snapshot_store.take()
+
+
+@router.delete(
+    "/snapshots",
+    summary="Delete every snapshot",
+    response_model=CommonResponseClass,
+)
+async def delete_snapshots():
+    snapshot_store.clear()
+    return {"detail": "Deleted successfully"}
+
+
+def get_snapshot_or_404(snapshot_id: int):
+    entry = snapshot_store.get(snapshot_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return entry["snapshot"]
+
+
+@router.get(
+    "/snapshots/{snapshot_id}",
+    summary="Get the largest allocations of a snapshot",
+    response_model=list[MemoryAllocation],
+)
+def get_snapshot_allocations(
+    snapshot_id: int,
+    group_by: Literal["lineno", "filename"] = "lineno",
+    limit: int = Query(default=25, ge=1, le=1000),
+):
+    snapshot = get_snapshot_or_404(snapshot_id)
+    return top_allocations(snapshot, group_by=group_by, limit=limit)
+
+
+@router.get(
+    "/snapshots/{snapshot_id}/diff/{other_snapshot_id}",
+    summary="Get the allocations that grew the most from a snapshot to another",
+    response_model=list[MemoryAllocation],
+)
+def diff_snapshots(
+    snapshot_id: int,
+    other_snapshot_id: int,
+    group_by: Literal["lineno", "filename"] = "lineno",
+    limit: int = Query(default=25, ge=1, le=1000),
+):
+    old = get_snapshot_or_404(snapshot_id)
+    new = get_snapshot_or_404(other_snapshot_id)
+    return diff_allocations(old, new, group_by=group_by, limit=limit)
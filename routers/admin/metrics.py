@@ -0,0 +1,29 @@
+from fastapi import Depends, APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.auth import user_should_be_admin
+from utils.metrics import registry
+from utils.responses import common_responses, label_worker, worker_headers
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["admin - metrics"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get service metrics of the worker that answers, in Prometheus text format",
+    response_class=PlainTextResponse,
+)
+async def get_metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+        headers=worker_headers(),
+    )
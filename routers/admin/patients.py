@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Request
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -13,14 +13,19 @@ from sqlite.crud.patients.detailed import (
 from sqlite.crud.caretakers.non_detailed import get_all_caretakers_by_list_of_ids
 from sqlite.crud.doctors.non_detailed import get_all_doctors_by_list_of_ids
 
+from sqlite.crud.versions import get_patient_version
 from sqlite.crud.patient_history import (
-    get_last_10_patient_histories_for_particular_user,
+    get_recent_patient_histories_for_particular_user,
 )
 
-from sqlite.schemas import Patient
+from sqlite.schemas import Patient, UserListFilterClass
 
 from utils.auth import user_should_be_admin
-from utils.responses import common_responses
+from utils.conditional import get_patient_resource_version
+from utils.list import pick_by_ids, split_list_of_ids
+from utils.responses import common_responses, PydanticJSONResponse
+from utils.tracing import set_request_attributes
+from utils.trusted_models import construct_patient
 
 router = APIRouter(
     prefix="/patients",
@@ -32,31 +37,44 @@ router = APIRouter(
 )
 
 
+def _construct_patients(items: list, db: Session) -> list[Patient]:
+    """Build a page of patients, loading their caretakers and doctors all at once"""
+    items = [i for i in items if i[0]]
+    caretaker_ids = [split_list_of_ids(i[1]) for i in items]
+    doctor_ids = [split_list_of_ids(i[2]) for i in items]
+    db_caretakers = get_all_caretakers_by_list_of_ids(
+        caretaker_ids=list({x for ids in caretaker_ids for x in ids}), db=db
+    ).all()
+    db_doctors = get_all_doctors_by_list_of_ids(
+        doctor_ids=list({x for ids in doctor_ids for x in ids}), db=db
+    ).all()
+    return [
+        construct_patient(
+            db_patient=i[0],
+            db_caretakers=pick_by_ids(db_caretakers, i_caretaker_ids),
+            db_doctors=pick_by_ids(db_doctors, i_doctor_ids),
+            history=get_recent_patient_histories_for_particular_user(
+                user_id=i[0].id, db=db
+            ),
+        )
+        for i, i_caretaker_ids, i_doctor_ids in zip(items, caretaker_ids, doctor_ids)
+    ]
+
+
 @router.get(
     "",
     summary="Get a list of all patients (detailed)",
     response_model=Page[Patient],
 )
-async def get_all_detailed_patients(db: Session = Depends(get_db)):
-    return paginate(
-        get_all_patients_with_caretakers_and_doctors(db=db),
-        transformer=lambda items: [
-            Patient(
-                **i[0].__dict__,
-                caretakers=get_all_caretakers_by_list_of_ids(
-                    caretaker_ids=i[1].split(",") if i[1] else [], db=db
-                ),
-                doctors=get_all_doctors_by_list_of_ids(
-                    doctor_ids=i[2].split(",") if i[2] else [], db=db
-                ),
-                history=get_last_10_patient_histories_for_particular_user(
-                    user_id=i[0].id, db=db
-                )
-            )
-            for i in items
-            if i[0]
-        ],
+async def get_all_detailed_patients(
+    filters: UserListFilterClass = Depends(), db: Session = Depends(get_db)
+):
+    page = paginate(
+        get_all_patients_with_caretakers_and_doctors(db=db, filters=filters),
+        transformer=lambda items: _construct_patients(items=items, db=db),
     )
+    set_request_attributes(patient_count=len(page.items))
+    return PydanticJSONResponse(page)
 
 
 @router.get(
@@ -64,19 +82,33 @@ async def get_all_detailed_patients(db: Session = Depends(get_db)):
     summary="Get a single patient (detailed) by id",
     response_model=Patient,
 )
-async def get_detailed_patient_by_id(user_id: int, db: Session = Depends(get_db)):
+async def get_detailed_patient_by_id(
+    user_id: int, request: Request, db: Session = Depends(get_db)
+):
+    version = get_patient_version(user_id=user_id, db=db)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    # Answer unchanged polls before loading or serializing anything
+    resource_version = get_patient_resource_version(version)
+    not_modified = resource_version.not_modified_response(request)
+    if not_modified:
+        return not_modified
     result = get_patient_with_caretakers_and_doctors_by_id(user_id=user_id, db=db)
     if result[0] is None:
         raise HTTPException(status_code=404, detail="Patient not found")
-    return Patient(
-        **result[0].__dict__,
-        caretakers=get_all_caretakers_by_list_of_ids(
-            caretaker_ids=result[1].split(",") if result[1] else [], db=db
-        ),
-        doctors=get_all_doctors_by_list_of_ids(
-            doctor_ids=result[2].split(",") if result[2] else [], db=db
-        ),
-        history=get_last_10_patient_histories_for_particular_user(
-            user_id=result[0].id, db=db
+    response = PydanticJSONResponse(
+        construct_patient(
+            db_patient=result[0],
+            db_caretakers=get_all_caretakers_by_list_of_ids(
+                caretaker_ids=result[1].split(",") if result[1] else [], db=db
+            ),
+            db_doctors=get_all_doctors_by_list_of_ids(
+                doctor_ids=result[2].split(",") if result[2] else [], db=db
+            ),
+            history=get_recent_patient_histories_for_particular_user(
+                user_id=result[0].id, db=db
+            ),
         )
     )
+    resource_version.set_headers(response)
+    return response
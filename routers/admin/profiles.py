@@ -0,0 +1,46 @@
+from fastapi import Depends, HTTPException, APIRouter, Response
+
+from sqlite.schemas import Profile
+
+from utils.auth import user_should_be_admin
+from utils.profiler import FORMATS, profile_store
+from utils.responses import common_responses, label_worker, worker_headers
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["admin - profiles"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get a list of stored request profiles, most recent first",
+    response_model=list[Profile],
+)
+async def get_all_profiles():
+    return profile_store.list()
+
+
+@router.get(
+    "/{profile_id}",
+    summary="Download a stored profile, pstats for cprofile and collapsed stacks for sample",
+    response_class=Response,
+)
+async def download_profile(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type, extension = FORMATS[profile["mode"]]
+    return Response(
+        content=profile["data"],
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.{extension}"',
+            **worker_headers(),
+        },
+    )
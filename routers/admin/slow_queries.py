@@ -0,0 +1,36 @@
+from fastapi import Depends, APIRouter
+
+from sqlite.schemas import CommonResponseClass, SlowQuery
+
+from utils.auth import user_should_be_admin
+from utils.responses import common_responses, label_worker
+from utils.slow_queries import slow_query_log
+
+router = APIRouter(
+    prefix="/slow-queries",
+    tags=["admin - slow queries"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get the most recent slow queries with their query plans",
+    response_model=list[SlowQuery],
+)
+async def get_slow_queries():
+    return slow_query_log.entries()
+
+
+@router.delete(
+    "",
+    summary="Clear the recorded slow queries",
+    response_model=CommonResponseClass,
+)
+async def clear_slow_queries():
+    slow_query_log.clear()
+    return {"detail": "Cleared successfully"}
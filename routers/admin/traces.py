@@ -0,0 +1,23 @@
+from fastapi import Depends, APIRouter, Query
+
+from utils.auth import user_should_be_admin
+from utils.responses import common_responses, label_worker
+import utils.tracing as tracing
+
+router = APIRouter(
+    prefix="/traces",
+    tags=["admin - traces"],
+    dependencies=[
+        Depends(user_should_be_admin),
+        Depends(label_worker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get the most recent request traces in OTLP/JSON format",
+)
+async def get_traces(limit: int = Query(default=20, ge=1, le=1000)):
+    return tracing.to_otlp_json(tracing.exporter.traces()[:limit])
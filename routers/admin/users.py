@@ -1,4 +1,5 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -7,19 +8,29 @@ from sqlite.database import get_db
 from sqlalchemy.orm import Session
 
 import sqlite.crud.users as crud
+from sqlite.enums import CombinedRoleEnum
 
 from sqlite.schemas import (
     User,
     UserCreateClass,
     UserUpdateClass,
     UserPasswordUpdateClass,
+    UserImportClass,
+    UserImportReport,
+    UserListWithRoleFilterClass,
     CommonResponseClass,
 )
 
 from utils.common import are_object_to_edit_and_other_object_same
 
 from utils.auth import user_should_be_admin
-from utils.responses import common_responses
+from utils.responses import common_responses, PydanticJSONResponse
+from utils.user_import import (
+    CSV_MEDIA_TYPE,
+    UserImportError,
+    import_users as import_users_rows,
+    read_users,
+)
 
 router = APIRouter(
     prefix="/users",
@@ -36,8 +47,77 @@ router = APIRouter(
     summary="Get all users",
     response_model=Page[User],
 )
-async def get_users(db: Session = Depends(get_db)):
-    return paginate(crud.get_all_users(db=db))
+async def get_users(
+    filters: UserListWithRoleFilterClass = Depends(), db: Session = Depends(get_db)
+):
+    page = paginate(crud.get_all_users(db=db, filters=filters))
+    return PydanticJSONResponse(page)
+
+
+@router.get(
+    "/search",
+    summary="Search users by name, email or phone",
+    description=(
+        "Every word of q should match the start of a word of the name, email or phone "
+        "of a user, so a partly typed name or number is enough. Best matches come first, "
+        "names weigh more than emails and phones."
+    ),
+    response_model=Page[User],
+)
+def search_users(
+    q: str = Query(min_length=1, max_length=200, pattern=r"\w"),
+    user_role: CombinedRoleEnum | None = None,
+    db: Session = Depends(get_db),
+):
+    page = paginate(crud.search_users(search=q, user_role=user_role, db=db))
+    return PydanticJSONResponse(page)
+
+
+@router.post(
+    "/import",
+    summary="Create many users from a CSV or JSON file",
+    description=(
+        f"Accepts a JSON array of users, or CSV with Content-Type: {CSV_MEDIA_TYPE} and "
+        "a header row with name, email, gender, password and user_role columns, and "
+        "optionally phone, age and blood_group. Every user is created or reported on "
+        "its own, the report has a row for each of them in the order they were sent."
+    ),
+    response_model=UserImportReport,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        # Its nested models and enums are in the components already
+                        "items": {
+                            key: value
+                            for key, value in UserImportClass.model_json_schema(
+                                ref_template="#/components/schemas/{model}"
+                            ).items()
+                            if key != "$defs"
+                        },
+                    }
+                },
+                CSV_MEDIA_TYPE: {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def import_users(request: Request, db: Session = Depends(get_db)):
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type not in ("", "application/json", CSV_MEDIA_TYPE):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type should be application/json or {CSV_MEDIA_TYPE}",
+        )
+    try:
+        users = read_users(await request.body(), media_type=media_type)
+    except UserImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Hashing passwords and inserting thousands of rows would hold up the event loop
+    return await run_in_threadpool(import_users_rows, users=users, db=db)
 
 
 @router.get(
@@ -0,0 +1,97 @@
+from fastapi import Depends, HTTPException, APIRouter
+
+from sqlite.database import get_db
+from sqlalchemy.orm import Session
+
+import sqlite.crud.vital_rules as crud
+from sqlite.crud.patients.non_detailed import get_patient_by_id
+
+from sqlite.schemas import (
+    VitalRule,
+    VitalRuleCreateClass,
+    VitalRuleUpdateClass,
+    CommonResponseClass,
+    User,
+)
+
+from utils.auth import user_should_be_admin, get_current_user
+from utils.responses import common_responses
+
+router = APIRouter(
+    prefix="/vital-rules",
+    tags=["admin - vital rules"],
+    dependencies=[
+        Depends(user_should_be_admin),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get all vital rules for a patient",
+    response_model=list[VitalRule],
+)
+async def get_all_vital_rules_for_patient(
+    patient_id: int, db: Session = Depends(get_db)
+):
+    db_patient = get_patient_by_id(user_id=patient_id, db=db)
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return crud.get_all_vital_rules_for_particular_patient(
+        patient_id=db_patient.id, db=db
+    )
+
+
+@router.get(
+    "/{rule_id}",
+    summary="Get a single vital rule by id",
+    response_model=VitalRule,
+)
+async def get_vital_rule_by_id(rule_id: int, db: Session = Depends(get_db)):
+    db_rule = crud.get_vital_rule_by_id(rule_id=rule_id, db=db)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Vital rule not found")
+    return db_rule
+
+
+@router.post(
+    "",
+    summary="Create a new vital rule for a patient",
+    response_model=VitalRule,
+)
+async def create_vital_rule(
+    rule: VitalRuleCreateClass,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_patient = get_patient_by_id(user_id=rule.patient_id, db=db)
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return crud.create_vital_rule(rule=rule, db_creator=current_user, db=db)
+
+
+@router.put(
+    "/{rule_id}",
+    summary="Update an existing vital rule",
+    response_model=VitalRule,
+)
+async def update_vital_rule(
+    rule_id: int, rule: VitalRuleUpdateClass, db: Session = Depends(get_db)
+):
+    db_rule = crud.get_vital_rule_by_id(rule_id=rule_id, db=db)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Vital rule not found")
+    return crud.update_vital_rule(rule=rule, db_rule=db_rule, db=db)
+
+
+@router.delete(
+    "/{rule_id}",
+    summary="Delete an existing vital rule",
+    response_model=CommonResponseClass,
+)
+async def delete_vital_rule(rule_id: int, db: Session = Depends(get_db)):
+    db_rule = crud.get_vital_rule_by_id(rule_id=rule_id, db=db)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Vital rule not found")
+    return crud.delete_vital_rule(db_rule=db_rule, db=db)
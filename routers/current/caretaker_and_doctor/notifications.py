@@ -0,0 +1,40 @@
+from fastapi import Depends, APIRouter
+
+from fastapi_pagination import Page
+from fastapi_pagination.ext.sqlalchemy import paginate
+
+from sqlite.database import get_db
+from sqlalchemy.orm import Session
+
+import sqlite.crud.patient_actions as crud
+
+from sqlite.schemas import PatientActionNotification, User
+
+from utils.auth import user_should_be_caretaker, get_current_user
+from utils.responses import common_responses, PydanticJSONResponse
+
+router = APIRouter(
+    prefix="/current/notifications",
+    tags=["caretaker - notifications"],
+    dependencies=[
+        Depends(user_should_be_caretaker),
+    ],
+    responses=common_responses(),
+)
+
+
+@router.get(
+    "",
+    summary="Get patient action notifications of current user, newest first",
+    response_model=Page[PatientActionNotification],
+)
+def get_notifications(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    page = paginate(
+        crud.get_all_notifications_for_a_particular_caretaker(
+            caretaker_id=current_user.id, db=db
+        )
+    )
+    return PydanticJSONResponse(page)
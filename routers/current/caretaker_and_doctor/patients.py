@@ -1,6 +1,6 @@
 from datetime import datetime, date
 
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Request
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -18,14 +18,17 @@ from sqlite.crud.patients.detailed import (
 from sqlite.crud.caretakers.non_detailed import (
     get_all_caretakers_by_list_of_ids,
     get_all_caretaker_ids_for_a_particular_patient,
+    get_all_caretaker_ids_for_list_of_patients,
 )
 from sqlite.crud.doctors.non_detailed import (
     get_all_doctors_by_list_of_ids,
     get_all_doctor_ids_for_a_particular_patient,
+    get_all_doctor_ids_for_list_of_patients,
 )
 
+from sqlite.crud.versions import get_patient_version
 from sqlite.crud.patient_history import (
-    get_last_10_patient_histories_for_particular_user,
+    get_recent_patient_histories_for_particular_user,
     get_patient_histories_based_on_date_range_for_particular_user,
 )
 
@@ -33,8 +36,11 @@ from sqlite.schemas import Patient, PatientHistory, User
 from sqlite.enums import UserRoleEnum
 
 from utils.auth import user_should_not_be_admin, get_current_user
-from utils.responses import common_responses
-from utils.list import return_list_of_ids
+from utils.conditional import get_patient_resource_version
+from utils.responses import common_responses, PydanticJSONResponse
+from utils.list import pick_by_ids, return_list_of_ids
+from utils.tracing import set_request_attributes
+from utils.trusted_models import construct_patient
 
 router = APIRouter(
     prefix="/current",
@@ -59,6 +65,32 @@ async def validate_date_range(start_date: date, end_date: date):
         )
 
 
+def _construct_patients(items: list, db: Session) -> list[Patient]:
+    """Build a page of patients, loading their caretakers and doctors all at once"""
+    patient_ids = [i.id for i in items]
+    caretaker_ids = get_all_caretaker_ids_for_list_of_patients(
+        patient_ids=patient_ids, db=db
+    )
+    doctor_ids = get_all_doctor_ids_for_list_of_patients(patient_ids=patient_ids, db=db)
+    db_caretakers = get_all_caretakers_by_list_of_ids(
+        caretaker_ids=list({x for ids in caretaker_ids.values() for x in ids}), db=db
+    ).all()
+    db_doctors = get_all_doctors_by_list_of_ids(
+        doctor_ids=list({x for ids in doctor_ids.values() for x in ids}), db=db
+    ).all()
+    return [
+        construct_patient(
+            db_patient=i,
+            db_caretakers=pick_by_ids(db_caretakers, caretaker_ids[i.id]),
+            db_doctors=pick_by_ids(db_doctors, doctor_ids[i.id]),
+            history=get_recent_patient_histories_for_particular_user(
+                user_id=i.id, db=db
+            ),
+        )
+        for i in items
+    ]
+
+
 @router.get(
     "/patients",
     summary="Get a list of patients for current user's patients",
@@ -72,40 +104,14 @@ async def get_everyone_for_patients_of_current_user(
             status_code=403, detail="Patients can not access this route"
         )
 
-    return paginate(
+    page = paginate(
         get_all_patients_without_caretakers_and_doctors_for_a_particular_user(
             user_id=current_user.id, user_role=current_user.user_role, db=db
         ),
-        transformer=lambda items: [
-            Patient(
-                **i.__dict__,
-                caretakers=get_all_caretakers_by_list_of_ids(
-                    caretaker_ids=return_list_of_ids(
-                        get_all_caretaker_ids_for_a_particular_patient(
-                            user_id=i.id, db=db
-                        )
-                    ),
-                    db=db,
-                ),
-                doctors=get_all_doctors_by_list_of_ids(
-                    doctor_ids=return_list_of_ids(
-                        get_all_doctor_ids_for_a_particular_patient(user_id=i.id, db=db)
-                    ),
-                    db=db,
-                ),
-                # caretakers=get_all_caretakers_by_list_of_ids(
-                #     caretaker_ids=i[1].split(",") if i[1] else [], db=db
-                # ),
-                # doctors=get_all_doctors_by_list_of_ids(
-                #     doctor_ids=i[2].split(",") if i[2] else [], db=db
-                # ),
-                history=get_last_10_patient_histories_for_particular_user(
-                    user_id=i.id, db=db
-                )
-            )
-            for i in items
-        ],
+        transformer=lambda items: _construct_patients(items=items, db=db),
     )
+    set_request_attributes(patient_count=len(page.items))
+    return PydanticJSONResponse(page)
 
 
 @router.get(
@@ -115,6 +121,7 @@ async def get_everyone_for_patients_of_current_user(
 )
 async def get_patient_by_id_for_patients_of_current_user(
     user_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -123,34 +130,55 @@ async def get_patient_by_id_for_patients_of_current_user(
             status_code=403, detail="Patients can not access this route"
         )
 
+    version = get_patient_version(
+        user_id=user_id,
+        accessible_by_user_id=current_user.id,
+        accessible_by_user_role=current_user.user_role,
+        db=db,
+    )
+    if version is None:
+        raise HTTPException(
+            status_code=403,
+            detail="Either patient not found or you do not have access",
+        )
+    # Answer unchanged polls before loading or serializing anything
+    resource_version = get_patient_resource_version(version)
+    not_modified = resource_version.not_modified_response(request)
+    if not_modified:
+        return not_modified
+
     result = get_all_patients_without_caretakers_and_doctors_for_a_particular_user(
         user_id=current_user.id, user_role=current_user.user_role, db=db
     )
 
     for item in result:
         if item.id == user_id:
-            return Patient(
-                **item.__dict__,
-                caretakers=get_all_caretakers_by_list_of_ids(
-                    caretaker_ids=return_list_of_ids(
-                        get_all_caretaker_ids_for_a_particular_patient(
-                            user_id=item.id, db=db
-                        )
+            response = PydanticJSONResponse(
+                construct_patient(
+                    db_patient=item,
+                    db_caretakers=get_all_caretakers_by_list_of_ids(
+                        caretaker_ids=return_list_of_ids(
+                            get_all_caretaker_ids_for_a_particular_patient(
+                                user_id=item.id, db=db
+                            )
+                        ),
+                        db=db,
+                    ),
+                    db_doctors=get_all_doctors_by_list_of_ids(
+                        doctor_ids=return_list_of_ids(
+                            get_all_doctor_ids_for_a_particular_patient(
+                                user_id=item.id, db=db
+                            )
+                        ),
+                        db=db,
                     ),
-                    db=db,
-                ),
-                doctors=get_all_doctors_by_list_of_ids(
-                    doctor_ids=return_list_of_ids(
-                        get_all_doctor_ids_for_a_particular_patient(
-                            user_id=item.id, db=db
-                        )
+                    history=get_recent_patient_histories_for_particular_user(
+                        user_id=item.id, db=db
                     ),
-                    db=db,
-                ),
-                history=get_last_10_patient_histories_for_particular_user(
-                    user_id=item.id, db=db
                 )
             )
+            resource_version.set_headers(response)
+            return response
 
     raise HTTPException(
         status_code=403, detail="Either patient not found or you do not have access"
@@ -183,11 +211,12 @@ async def get_patient_history_for_date_range_by_id_for_patients_of_current_user(
 
     for item in result:
         if item.id == user_id:
-            return paginate(
+            page = paginate(
                 get_patient_histories_based_on_date_range_for_particular_user(
                     user_id=user_id, start_date=start_date, end_date=end_date, db=db
                 )
             )
+            return PydanticJSONResponse(page)
 
     raise HTTPException(
         status_code=403, detail="Either patient not found or you do not have access"
@@ -0,0 +1,119 @@
+from fastapi import Depends, HTTPException, APIRouter
+
+from sqlite.database import get_db
+from sqlalchemy.orm import Session
+
+import sqlite.crud.vital_rules as crud
+from sqlite.crud.associations import get_doctor_associated_with_patient
+from sqlite.crud.patients.non_detailed import get_patient_by_id
+
+from sqlite.schemas import (
+    VitalRule,
+    VitalRuleCreateClass,
+    VitalRuleUpdateClass,
+    CommonResponseClass,
+    User,
+)
+
+from utils.auth import user_should_be_doctor, get_current_user
+from utils.responses import common_responses
+
+router = APIRouter(
+    prefix="/current/vital-rules",
+    tags=["doctor - vital rules"],
+    dependencies=[
+        Depends(user_should_be_doctor),
+    ],
+    responses=common_responses(),
+)
+
+
+async def validate_patient_of_current_user(
+    patient_id: int, current_user: User, db: Session
+):
+    db_patient = get_patient_by_id(user_id=patient_id, db=db)
+    if db_patient is None or not get_doctor_associated_with_patient(
+        db_doctor=current_user, db_patient=db_patient, db=db
+    ):
+        raise HTTPException(
+            status_code=403,
+            detail="Either patient not found or you do not have access",
+        )
+    return db_patient
+
+
+async def get_vital_rule_of_current_user(rule_id: int, current_user: User, db: Session):
+    db_rule = crud.get_vital_rule_by_id(rule_id=rule_id, db=db)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Vital rule not found")
+    await validate_patient_of_current_user(
+        patient_id=db_rule.patient_id, current_user=current_user, db=db
+    )
+    return db_rule
+
+
+@router.get(
+    "",
+    summary="Get all vital rules for one of current user's patients",
+    response_model=list[VitalRule],
+)
+async def get_all_vital_rules_for_patient_of_current_user(
+    patient_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_patient = await validate_patient_of_current_user(
+        patient_id=patient_id, current_user=current_user, db=db
+    )
+    return crud.get_all_vital_rules_for_particular_patient(
+        patient_id=db_patient.id, db=db
+    )
+
+
+@router.post(
+    "",
+    summary="Create a new vital rule for one of current user's patients",
+    response_model=VitalRule,
+)
+async def create_vital_rule_for_patient_of_current_user(
+    rule: VitalRuleCreateClass,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    await validate_patient_of_current_user(
+        patient_id=rule.patient_id, current_user=current_user, db=db
+    )
+    return crud.create_vital_rule(rule=rule, db_creator=current_user, db=db)
+
+
+@router.put(
+    "/{rule_id}",
+    summary="Update a vital rule of one of current user's patients",
+    response_model=VitalRule,
+)
+async def update_vital_rule_for_patient_of_current_user(
+    rule_id: int,
+    rule: VitalRuleUpdateClass,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_rule = await get_vital_rule_of_current_user(
+        rule_id=rule_id, current_user=current_user, db=db
+    )
+    return crud.update_vital_rule(rule=rule, db_rule=db_rule, db=db)
+
+
+@router.delete(
+    "/{rule_id}",
+    summary="Delete a vital rule of one of current user's patients",
+    response_model=CommonResponseClass,
+)
+async def delete_vital_rule_for_patient_of_current_user(
+    rule_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    db_rule = await get_vital_rule_of_current_user(
+        rule_id=rule_id, current_user=current_user, db=db
+    )
+    return crud.delete_vital_rule(db_rule=db_rule, db=db)
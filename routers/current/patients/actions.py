@@ -3,12 +3,13 @@ from fastapi import Depends, HTTPException, APIRouter
 from sqlite.database import get_db
 from sqlalchemy.orm import Session
 
-# import sqlite.crud.patient_history as crud
+import sqlite.crud.patient_actions as crud
 
 from sqlite.schemas import PatientActionBaseClass, User
 
 from utils.auth import user_should_be_patient, get_current_user
 from utils.responses import common_responses
+from utils.notifications import outbox_dispatcher
 
 router = APIRouter(
     prefix="/current/actions",
@@ -30,7 +31,9 @@ async def call_patient_action(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    # return crud.create_patient_history(
-    #     patient_history=patient_history, db_patient=current_user, db=db
-    # )
+    # Only write to the outbox, caretakers are notified by the delivery workers
+    crud.create_patient_action(
+        patient_action=patient_action, db_patient=current_user, db=db
+    )
+    outbox_dispatcher.notify()
     return patient_action
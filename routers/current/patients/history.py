@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Request, Response
 
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -7,10 +7,28 @@ from sqlite.database import get_db
 from sqlalchemy.orm import Session
 
 import sqlite.crud.patient_history as crud
+from sqlite.crud.vital_rules import (
+    evaluate_vital_rules,
+    evaluate_vital_rules_for_readings,
+)
+from sqlite.crud.versions import get_patient_history_version
 
-from sqlite.schemas import PatientHistory, PatientHistoryCreateClass, User
+from sqlite.schemas import (
+    PatientHistory,
+    PatientHistoryCreateClass,
+    PatientHistoryWithAlerts,
+    User,
+)
 
 from utils.auth import user_should_be_patient, get_current_user
+from utils.conditional import ResourceVersion
+from utils.history_writer import history_writer, write_patient_histories
+from utils.ingest import (
+    BINARY_READINGS_MEDIA_TYPE,
+    FLOAT_DECIMALS,
+    GzipRoute,
+    decode_readings,
+)
 from utils.responses import common_responses
 
 router = APIRouter(
@@ -20,6 +38,8 @@ router = APIRouter(
         Depends(user_should_be_patient),
     ],
     responses=common_responses(),
+    # Monitors may gzip their request bodies
+    route_class=GzipRoute,
 )
 
 
@@ -29,10 +49,23 @@ router = APIRouter(
     response_model=list[PatientHistory],
 )
 async def get_latest_patient_history(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    return crud.get_last_10_patient_histories_for_particular_user(
+    latest = get_patient_history_version(user_id=current_user.id, db=db)
+    resource_version = ResourceVersion(
+        current_user.id,
+        latest.id if latest else 0,
+        last_modified=latest.created_at if latest else current_user.created_at,
+    )
+    # Answer unchanged polls before loading or serializing anything
+    not_modified = resource_version.not_modified_response(request)
+    if not_modified:
+        return not_modified
+    resource_version.set_headers(response)
+    return crud.get_recent_patient_histories_for_particular_user(
         user_id=current_user.id, db=db
     )
 
@@ -40,13 +73,74 @@ async def get_latest_patient_history(
 @router.post(
     "",
     summary="Create a new patient history",
-    response_model=PatientHistory,
+    response_model=PatientHistoryWithAlerts,
 )
 async def create_patient_history(
     patient_history: PatientHistoryCreateClass,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    return crud.create_patient_history(
+    if history_writer.enabled:
+        (patient_history,) = await write_patient_histories(
+            readings=[patient_history.model_dump()], db_patient=current_user, db=db
+        )
+        (alerts,) = evaluate_vital_rules_for_readings(
+            patient_id=current_user.id, readings=[patient_history], db=db
+        )
+        return PatientHistoryWithAlerts(**patient_history.__dict__, alerts=alerts)
+    db_patient_history = crud.create_patient_history(
         patient_history=patient_history, db_patient=current_user, db=db
     )
+    alerts = evaluate_vital_rules(db_patient_history=db_patient_history, db=db)
+    return PatientHistoryWithAlerts(**db_patient_history.__dict__, alerts=alerts)
+
+
+@router.post(
+    "/batch",
+    summary="Create a batch of patient histories",
+    description=(
+        "Accepts a JSON array of readings, or the compact binary format with "
+        f"Content-Type: {BINARY_READINGS_MEDIA_TYPE}, 16 bytes per reading: "
+        "little-endian float32 spo2_reading, uint16 systolic_reading, "
+        "uint16 diastolic_reading, float32 temp_reading, float32 heartbeat_reading. "
+        f"float32 readings are rounded to {FLOAT_DECIMALS} decimals, as monitors "
+        "measure them. "
+        "A single reading is a batch of one. Bodies may be sent with "
+        "Content-Encoding: gzip."
+    ),
+    response_model=list[PatientHistoryWithAlerts],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "$ref": "#/components/schemas/PatientHistoryCreateClass"
+                        },
+                    }
+                },
+                BINARY_READINGS_MEDIA_TYPE: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            },
+        }
+    },
+)
+async def create_patient_histories(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    readings = await decode_readings(request)
+    patient_histories = await write_patient_histories(
+        readings=readings, db_patient=current_user, db=db
+    )
+    alerts = evaluate_vital_rules_for_readings(
+        patient_id=current_user.id, readings=patient_histories, db=db
+    )
+    return [
+        PatientHistoryWithAlerts(**x.__dict__, alerts=y)
+        for x, y in zip(patient_histories, alerts)
+    ]
@@ -12,6 +12,7 @@ from sqlite.crud.password import authenticate_user
 
 from sqlite.schemas import Token
 from utils.jwt_tokens import create_access_token
+from utils.metrics import logins_total
 
 
 router = APIRouter(
@@ -28,11 +29,13 @@ async def login_for_access_token(
         email=form_data.username, password=form_data.password, db=db
     )
     if not user:
+        logins_total.inc(result="failure")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    logins_total.inc(result="success")
     access_token_expires = timedelta(minutes=secret.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email},
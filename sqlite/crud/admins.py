@@ -4,6 +4,8 @@ from sqlalchemy import and_
 from sqlite import models
 from sqlite.enums import CombinedRoleEnum
 
+from utils.tracing import traced
+
 
 def get_all_admins(db: Session):
     """Get all admins from the database"""
@@ -14,6 +16,7 @@ def get_all_admins(db: Session):
     )
 
 
+@traced
 def get_admin_by_id(user_id: int, db: Session):
     """Get a single admin by id from the database"""
     return (
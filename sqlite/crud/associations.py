@@ -1,9 +1,14 @@
-from sqlalchemy import and_, delete
+from sqlalchemy import Table, and_, delete, tuple_
+from sqlalchemy.dialects.sqlite import insert
 
 from sqlalchemy.orm import Session
 from sqlite import models
+from sqlite.crud.versions import bump_association_version_for_patients
 
+from utils.tracing import traced
 
+
+@traced
 def get_caretaker_associated_with_patient(
     db_caretaker: models.UserModel, db_patient: models.UserModel, db: Session
 ):
@@ -22,6 +27,7 @@ def get_caretaker_associated_with_patient(
     )
 
 
+@traced
 def try_associate_patient_to_caretaker(
     db_patient: models.UserModel, db_caretaker: models.UserModel, db: Session
 ):
@@ -31,6 +37,7 @@ def try_associate_patient_to_caretaker(
     )
     try:
         db.execute(association)
+        bump_association_version_for_patients(patient_ids=[db_patient.id], db=db)
         db.commit()
         return True
     except Exception as e:
@@ -38,6 +45,7 @@ def try_associate_patient_to_caretaker(
         return False
 
 
+@traced
 def try_disassociate_patient_from_caretaker(
     db_patient: models.UserModel, db_caretaker: models.UserModel, db: Session
 ):
@@ -55,6 +63,7 @@ def try_disassociate_patient_from_caretaker(
                 )
             )
         )
+        bump_association_version_for_patients(patient_ids=[db_patient.id], db=db)
         db.commit()
         return True
     except Exception as e:
@@ -62,6 +71,7 @@ def try_disassociate_patient_from_caretaker(
         return False
 
 
+@traced
 def get_doctor_associated_with_patient(
     db_doctor: models.UserModel, db_patient: models.UserModel, db: Session
 ):
@@ -78,6 +88,7 @@ def get_doctor_associated_with_patient(
     )
 
 
+@traced
 def try_associate_patient_to_doctor(
     db_patient: models.UserModel, db_doctor: models.UserModel, db: Session
 ):
@@ -87,6 +98,7 @@ def try_associate_patient_to_doctor(
     )
     try:
         db.execute(association)
+        bump_association_version_for_patients(patient_ids=[db_patient.id], db=db)
         db.commit()
         return True
     except Exception as e:
@@ -94,6 +106,7 @@ def try_associate_patient_to_doctor(
         return False
 
 
+@traced
 def try_disassociate_patient_from_doctor(
     db_patient: models.UserModel, db_doctor: models.UserModel, db: Session
 ):
@@ -105,8 +118,104 @@ def try_disassociate_patient_from_doctor(
                 & (models.patient_doctor_association_table.c.doctor_id == db_doctor.id)
             )
         )
+        bump_association_version_for_patients(patient_ids=[db_patient.id], db=db)
         db.commit()
         return True
     except Exception as e:
         db.rollback()
         return False
+
+
+def _try_associate_patients_in_bulk(
+    table: Table, column: str, pairs: list[tuple[int, int]], db: Session
+):
+    try:
+        # Pairs that are already associated, or are associated meanwhile, are skipped by
+        # the primary key
+        associated = db.execute(
+            insert(table)
+            .on_conflict_do_nothing()
+            .returning(table.c.patient_id, table.c[column]),
+            [
+                {"patient_id": patient_id, column: user_id}
+                # A pair repeated in the same statement would conflict with itself
+                for patient_id, user_id in dict.fromkeys(pairs)
+            ],
+        ).all()
+        bump_association_version_for_patients(
+            patient_ids={patient_id for patient_id, _ in associated}, db=db
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(associated)
+
+
+def _try_disassociate_patients_in_bulk(
+    table: Table, column: str, pairs: list[tuple[int, int]], db: Session
+):
+    try:
+        disassociated = db.execute(
+            delete(table)
+            .where(
+                # SQLite only searches the primary key for a plain IN, not a row value one
+                table.c.patient_id.in_({patient_id for patient_id, _ in pairs}),
+                tuple_(table.c.patient_id, table.c[column]).in_(pairs),
+            )
+            .returning(table.c.patient_id, table.c[column])
+        ).all()
+        bump_association_version_for_patients(
+            patient_ids={patient_id for patient_id, _ in disassociated}, db=db
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(set(disassociated))
+
+
+@traced
+def try_associate_patients_to_caretakers(pairs: list[tuple[int, int]], db: Session):
+    """Associate many (patient id, caretaker id) pairs, return how many were not already"""
+    return _try_associate_patients_in_bulk(
+        table=models.patient_caretaker_association_table,
+        column="caretaker_id",
+        pairs=pairs,
+        db=db,
+    )
+
+
+@traced
+def try_disassociate_patients_from_caretakers(
+    pairs: list[tuple[int, int]], db: Session
+):
+    """Disassociate many (patient id, caretaker id) pairs, return how many were associated"""
+    return _try_disassociate_patients_in_bulk(
+        table=models.patient_caretaker_association_table,
+        column="caretaker_id",
+        pairs=pairs,
+        db=db,
+    )
+
+
+@traced
+def try_associate_patients_to_doctors(pairs: list[tuple[int, int]], db: Session):
+    """Associate many (patient id, doctor id) pairs, return how many were not already"""
+    return _try_associate_patients_in_bulk(
+        table=models.patient_doctor_association_table,
+        column="doctor_id",
+        pairs=pairs,
+        db=db,
+    )
+
+
+@traced
+def try_disassociate_patients_from_doctors(pairs: list[tuple[int, int]], db: Session):
+    """Disassociate many (patient id, doctor id) pairs, return how many were associated"""
+    return _try_disassociate_patients_in_bulk(
+        table=models.patient_doctor_association_table,
+        column="doctor_id",
+        pairs=pairs,
+        db=db,
+    )
@@ -3,29 +3,30 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 
 from sqlite import models
+from sqlite.crud.filters import associated_ids, filter_and_sort_users
 
 from sqlite.enums import UserRoleEnum
+from sqlite.schemas import UserListFilterClass
+
+from utils.tracing import traced
 
 
 def get_all_caretakers_with_patients(
-    db: Session,
+    db: Session, filters: UserListFilterClass | None = None
 ) -> list[tuple[models.UserModel | None, str | None]]:
     """Get all caretakers with patients from the database"""
-    return (
+    return filter_and_sort_users(
         db.query(
             models.UserModel,
-            func.group_concat(
-                func.distinct(models.patient_caretaker_association_table.c.patient_id)
-            ).label("patient_ids"),
-        )
-        .outerjoin(
-            models.patient_caretaker_association_table,
-            models.patient_caretaker_association_table.c.caretaker_id
-            == models.UserModel.id,
+            associated_ids(
+                models.patient_caretaker_association_table,
+                ids_column="patient_id",
+                user_column="caretaker_id",
+            ),
         )
         .options(joinedload(models.UserModel.additional_details))
-        .filter(models.UserModel.user_role == UserRoleEnum.CARETAKER)
-        .group_by(models.UserModel.id)
+        .filter(models.UserModel.user_role == UserRoleEnum.CARETAKER),
+        filters=filters,
     )
 
 
@@ -58,6 +59,7 @@ def get_all_caretakers_with_patients_for_a_particular_user(
     )
 
 
+@traced
 def get_caretaker_with_patients_by_id(
     user_id: int, db: Session
 ) -> tuple[models.UserModel | None, str | None]:
@@ -1,4 +1,4 @@
-from sqlalchemy import func
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 
@@ -6,6 +6,8 @@ from sqlite import models
 
 from sqlite.enums import UserRoleEnum
 
+from utils.tracing import traced
+
 
 def get_all_caretakers_by_list_of_ids(
     caretaker_ids: list[int], db: Session
@@ -23,6 +25,7 @@ def get_all_caretakers_by_list_of_ids(
     )
 
 
+@traced
 def get_caretaker_by_id(user_id: int, db: Session):
     """Get a single caretaker by id from the database"""
     return (
@@ -38,6 +41,7 @@ def get_caretaker_by_id(user_id: int, db: Session):
     )
 
 
+@traced
 def get_all_caretaker_ids_for_a_particular_patient(user_id: int, db: Session):
     """Get all caretaker ids for a particular patient from the database"""
     return (
@@ -49,3 +53,23 @@ def get_all_caretaker_ids_for_a_particular_patient(user_id: int, db: Session):
         .filter(models.patient_caretaker_association_table.c.patient_id == user_id)
         .first()
     )
+
+
+@traced
+def get_all_caretaker_ids_for_list_of_patients(
+    patient_ids: list[int], db: Session
+) -> dict[int, list[int]]:
+    """Get all caretaker ids for a list of patients from the database, keyed by patient id"""
+    result = {patient_id: [] for patient_id in patient_ids}
+    rows = db.execute(
+        select(
+            models.patient_caretaker_association_table.c.patient_id,
+            models.patient_caretaker_association_table.c.caretaker_id,
+        )
+        .where(models.patient_caretaker_association_table.c.patient_id.in_(patient_ids))
+        .distinct()
+    )
+    for patient_id, caretaker_id in rows:
+        result[patient_id].append(caretaker_id)
+
+    return result
@@ -3,30 +3,32 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 
 from sqlite import models
+from sqlite.crud.filters import associated_ids, filter_and_sort_users
 
 from sqlite.enums import UserRoleEnum
+from sqlite.schemas import UserListFilterClass
+
+from utils.tracing import traced
 
 
 def get_all_doctors_with_patients(
-    db: Session,
+    db: Session, filters: UserListFilterClass | None = None
 ) -> list[tuple[models.UserModel | None, str | None]]:
     """Get all doctors with patients from the database"""
-    return (
+    return filter_and_sort_users(
         db.query(
             models.UserModel,
-            func.group_concat(
-                func.distinct(models.patient_doctor_association_table.c.patient_id)
-            ).label("patient_ids"),
-        )
-        .outerjoin(
-            models.patient_doctor_association_table,
-            models.patient_doctor_association_table.c.doctor_id == models.UserModel.id,
+            associated_ids(
+                models.patient_doctor_association_table,
+                ids_column="patient_id",
+                user_column="doctor_id",
+            ),
         )
         .options(
             joinedload(models.UserModel.additional_details),
         )
-        .filter(models.UserModel.user_role == UserRoleEnum.DOCTOR)
-        .group_by(models.UserModel.id)
+        .filter(models.UserModel.user_role == UserRoleEnum.DOCTOR),
+        filters=filters,
     )
 
 
@@ -58,6 +60,7 @@ def get_all_doctors_with_patients_for_a_particular_user(
     )
 
 
+@traced
 def get_doctor_with_patients_by_id(
     user_id: int, db: Session
 ) -> tuple[models.UserModel | None, str | None]:
@@ -0,0 +1,49 @@
+from sqlalchemy import Label, Table, func, select
+from sqlalchemy.orm import Query
+
+from sqlite import models
+from sqlite.enums import SortOrderEnum, UserSortEnum
+from sqlite.schemas import UserListFilterClass, UserListWithRoleFilterClass
+
+
+def filter_and_sort_users(query: Query, filters: UserListFilterClass | None) -> Query:
+    """Apply the filters and sort order of an admin list to a query over users"""
+    if filters is None:
+        return query
+    M = models.UserModel
+    if isinstance(filters, UserListWithRoleFilterClass) and filters.user_role:
+        query = query.filter(M.user_role == filters.user_role)
+    if filters.gender:
+        query = query.filter(M.gender == filters.gender)
+    if filters.blood_group:
+        # Users are looked up from the blood group index, not each user probed in turn
+        query = query.filter(
+            M.id.in_(
+                select(models.UserAdditionalDetailsModel.user_id).where(
+                    models.UserAdditionalDetailsModel.blood_group == filters.blood_group
+                )
+            )
+        )
+    if filters.created_after:
+        query = query.filter(M.created_at >= filters.created_after)
+    if filters.created_before:
+        query = query.filter(M.created_at < filters.created_before)
+    order_by = [getattr(M, filters.sort_by.value)]
+    if filters.sort_by != UserSortEnum.ID:
+        # Ties are broken by id, so pages do not shift between requests
+        order_by.append(M.id)
+    if filters.sort_order == SortOrderEnum.DESC:
+        order_by = [x.desc() for x in order_by]
+    return query.order_by(*order_by)
+
+
+def associated_ids(table: Table, ids_column: str, user_column: str) -> Label:
+    """Comma separated ids associated with each user of a list, as a correlated subquery"""
+    # Unlike a join grouped by user, only the users of the requested page are aggregated,
+    # so the list can be filtered, sorted and counted through the indexes on users
+    return (
+        select(func.group_concat(table.c[ids_column]))
+        .where(table.c[user_column] == models.UserModel.id)
+        .scalar_subquery()
+        .label(ids_column + "s")
+    )
@@ -3,8 +3,10 @@ from sqlalchemy.orm import Session
 from sqlite.crud.users import get_user_by_email
 
 from utils.password import verify_password
+from utils.tracing import traced
 
 
+@traced
 def authenticate_user(email: str, password: str, db: Session):
     """Authenticate a user, check if their password is correct"""
     user = get_user_by_email(user_email=email, db=db)
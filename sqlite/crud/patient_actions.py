@@ -0,0 +1,147 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from sqlite import models
+
+from sqlite.enums import OutboxStatusEnum
+from sqlite.schemas import PatientActionBaseClass, PatientActionNotification, User
+
+from utils.tracing import traced
+
+
+@traced
+def create_patient_action(
+    patient_action: PatientActionBaseClass, db_patient: User, db: Session
+):
+    """Create a new patient action in the outbox, it is delivered to caretakers later"""
+    db_patient_action = models.PatientActionOutboxModel(
+        **patient_action.__dict__, patient_id=db_patient.id
+    )
+    db.add(db_patient_action)
+    db.commit()
+
+    return db_patient_action
+
+
+@traced
+def fail_abandoned_patient_actions(
+    max_attempts: int, now: datetime, db: Session
+) -> int:
+    """Fail in flight patient actions out of attempts whose lease ran out, return how many
+
+    Their worker died while delivering them, which may be what killed it.
+    """
+    M = models.PatientActionOutboxModel
+    failed = db.execute(
+        update(M)
+        .where(
+            and_(
+                M.status == OutboxStatusEnum.IN_FLIGHT,
+                M.next_attempt_at <= now,
+                M.attempts >= max_attempts,
+            )
+        )
+        .values(
+            status=OutboxStatusEnum.FAILED,
+            last_error=f"Lease ran out on attempt {max_attempts}",
+        )
+    ).rowcount
+    db.commit()
+
+    return failed
+
+
+@traced
+def claim_due_patient_actions(
+    limit: int, now: datetime, lease_until: datetime, max_attempts: int, db: Session
+):
+    """Claim a batch of due patient actions from the outbox for delivery
+
+    Claimed rows are moved to in flight until lease_until, in a single UPDATE ... RETURNING,
+    so concurrent workers never claim the same row, and rows of a crashed worker become
+    due again once their lease runs out, unless they are out of attempts.
+    """
+    M = models.PatientActionOutboxModel
+    due_ids = (
+        select(M.id)
+        .where(
+            and_(
+                or_(
+                    M.status == OutboxStatusEnum.PENDING,
+                    M.status == OutboxStatusEnum.IN_FLIGHT,
+                ),
+                M.next_attempt_at <= now,
+                M.attempts < max_attempts,
+            )
+        )
+        .order_by(M.next_attempt_at)
+        .limit(limit)
+    )
+    claimed = db.execute(
+        update(M)
+        .where(M.id.in_(due_ids))
+        .values(
+            status=OutboxStatusEnum.IN_FLIGHT,
+            attempts=M.attempts + 1,
+            next_attempt_at=lease_until,
+        )
+        .returning(M.id, M.patient_id, M.action, M.attempts, M.created_at)
+    ).all()
+    db.commit()
+
+    return claimed
+
+
+@traced
+def mark_patient_actions_as_delivered(ids: list[int], now: datetime, db: Session):
+    """Mark patient actions in the outbox as delivered"""
+    M = models.PatientActionOutboxModel
+    db.execute(
+        update(M)
+        .where(M.id.in_(ids))
+        .values(status=OutboxStatusEnum.DELIVERED, delivered_at=now, last_error=None)
+    )
+    db.commit()
+
+
+@traced
+def mark_patient_action_for_retry(
+    id: int, next_attempt_at: datetime | None, error: str, db: Session
+):
+    """Schedule a patient action in the outbox for another attempt, or fail it if next_attempt_at is None"""
+    M = models.PatientActionOutboxModel
+    db.execute(
+        update(M)
+        .where(M.id == id)
+        .values(
+            status=(
+                OutboxStatusEnum.FAILED
+                if next_attempt_at is None
+                else OutboxStatusEnum.PENDING
+            ),
+            next_attempt_at=next_attempt_at or M.next_attempt_at,
+            last_error=error,
+        )
+    )
+    db.commit()
+
+
+@traced
+def create_caretaker_notifications(
+    notifications: list[PatientActionNotification], db: Session
+):
+    """Store notifications in the inboxes of their caretakers, skipping ones already stored"""
+    db.execute(
+        insert(models.CaretakerNotificationModel).on_conflict_do_nothing(),
+        [notification.model_dump() for notification in notifications],
+    )
+    db.commit()
+
+
+def get_all_notifications_for_a_particular_caretaker(caretaker_id: int, db: Session):
+    """Get all notifications of a caretaker, newest first"""
+    M = models.CaretakerNotificationModel
+    return db.query(M).filter(M.caretaker_id == caretaker_id).order_by(M.id.desc())
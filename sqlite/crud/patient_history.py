@@ -1,24 +1,50 @@
 from datetime import datetime, date
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, insert
 
 from sqlite import models
 
-from sqlite.schemas import PatientHistoryCreateClass, User
+from sqlite.schemas import PatientHistory, PatientHistoryCreateClass, User
 
+from utils.metrics import readings_ingested_total
+from utils.recent_readings import recent_readings_cache
+from utils.trusted_models import construct_patient_history
+from utils.tracing import traced
 
-def get_last_10_patient_histories_for_particular_user(user_id: int, db: Session):
-    """Get last 10 patient histories for a particular user from the database"""
+
+@traced
+def get_latest_patient_histories_for_particular_user(
+    user_id: int, limit: int, db: Session
+):
+    """Get latest patient histories for a particular user from the database"""
     return (
         db.query(models.PatientHistoryModel)
         .filter(models.PatientHistoryModel.patient_id == user_id)
         .order_by(desc(models.PatientHistoryModel.created_at))
-        .limit(10)
+        .limit(limit)
         .all()
     )
 
 
+@traced
+def get_recent_patient_histories_for_particular_user(
+    user_id: int, db: Session
+) -> list[PatientHistory]:
+    """Get recent patient histories for a particular user, served from memory once warm"""
+    return list(
+        recent_readings_cache.get(
+            patient_id=user_id,
+            load_readings=lambda limit: [
+                construct_patient_history(x)
+                for x in get_latest_patient_histories_for_particular_user(
+                    user_id=user_id, limit=limit, db=db
+                )
+            ],
+        )
+    )
+
+
 def get_patient_histories_based_on_date_range_for_particular_user(
     user_id: int, start_date: date, end_date: date, db: Session
 ):
@@ -36,6 +62,7 @@ def get_patient_histories_based_on_date_range_for_particular_user(
     )
 
 
+@traced
 def create_patient_history(
     patient_history: PatientHistoryCreateClass, db_patient: User, db: Session
 ):
@@ -45,5 +72,76 @@ def create_patient_history(
     )
     db.add(db_patient_history)
     db.commit()
+    readings_ingested_total.inc()
+    if recent_readings_cache.is_tracked(patient_id=db_patient.id):
+        recent_readings_cache.append(
+            patient_id=db_patient.id,
+            reading=construct_patient_history(db_patient_history),
+        )
 
     return db_patient_history
+
+
+@traced
+def create_patient_histories(readings: list[dict], db_patient: User, db: Session):
+    """Create a batch of patient histories in the database, with a single insert
+
+    Returns the created histories as PatientHistory, in the order of readings.
+    """
+    (patient_histories,) = create_patient_histories_for_patients(
+        batches=[(db_patient.id, readings)], db=db
+    )
+    record_ingested_patient_histories(
+        patient_id=db_patient.id, patient_histories=patient_histories
+    )
+
+    return patient_histories
+
+
+@traced
+def create_patient_histories_for_patients(
+    batches: list[tuple[int, list[dict]]], db: Session
+) -> list[list[PatientHistory]]:
+    """Create batches of patient histories of any patients in the database, with a single insert
+
+    batches are (patient_id, readings) pairs. Returns the created histories as
+    PatientHistory, one list per batch, in the order of its readings.
+    """
+    db_patient_histories = db.scalars(
+        insert(models.PatientHistoryModel).returning(
+            models.PatientHistoryModel, sort_by_parameter_order=True
+        ),
+        [
+            {**reading, "patient_id": patient_id}
+            for patient_id, readings in batches
+            for reading in readings
+        ],
+    ).all()
+    # Built before the commit expires the rows, which would reload them one by one
+    patient_histories = [construct_patient_history(x) for x in db_patient_histories]
+    db.commit()
+
+    result, start = [], 0
+    for _, readings in batches:
+        result.append(patient_histories[start : start + len(readings)])
+        start += len(readings)
+    return result
+
+
+def record_ingested_patient_histories(
+    patient_id: int, patient_histories: list[PatientHistory]
+) -> None:
+    """Count newly created histories and append them to the recent readings of the patient"""
+    readings_ingested_total.inc(len(patient_histories))
+    append_recent_patient_histories(
+        patient_id=patient_id, patient_histories=patient_histories
+    )
+
+
+def append_recent_patient_histories(
+    patient_id: int, patient_histories: list[PatientHistory]
+) -> None:
+    """Append newly created histories to the recent readings of the patient, when tracked"""
+    if recent_readings_cache.is_tracked(patient_id=patient_id):
+        for patient_history in patient_histories:
+            recent_readings_cache.append(patient_id=patient_id, reading=patient_history)
@@ -5,38 +5,37 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_
 
 from sqlite import models
+from sqlite.crud.filters import associated_ids, filter_and_sort_users
 
 from sqlite.enums import UserRoleEnum
+from sqlite.schemas import UserListFilterClass
+
+from utils.tracing import traced
 
 
 def get_all_patients_with_caretakers_and_doctors(
-    db: Session,
+    db: Session, filters: UserListFilterClass | None = None
 ) -> list[tuple[models.UserModel | None, str | None]]:
     """Get all patients with caretakers and doctors from the database"""
-    return (
+    return filter_and_sort_users(
         db.query(
             models.UserModel,
-            func.group_concat(
-                func.distinct(models.patient_caretaker_association_table.c.caretaker_id)
-            ).label("caretaker_ids"),
-            func.group_concat(
-                func.distinct(models.patient_doctor_association_table.c.doctor_id)
-            ).label("doctor_ids"),
-        )
-        .outerjoin(
-            models.patient_caretaker_association_table,
-            models.patient_caretaker_association_table.c.patient_id
-            == models.UserModel.id,
-        )
-        .outerjoin(
-            models.patient_doctor_association_table,
-            models.patient_doctor_association_table.c.patient_id == models.UserModel.id,
+            associated_ids(
+                models.patient_caretaker_association_table,
+                ids_column="caretaker_id",
+                user_column="patient_id",
+            ),
+            associated_ids(
+                models.patient_doctor_association_table,
+                ids_column="doctor_id",
+                user_column="patient_id",
+            ),
         )
         .options(
             joinedload(models.UserModel.additional_details),
         )
-        .filter(models.UserModel.user_role == UserRoleEnum.PATIENT)
-        .group_by(models.UserModel.id)
+        .filter(models.UserModel.user_role == UserRoleEnum.PATIENT),
+        filters=filters,
     )
 
     # # Can not use this approach
@@ -157,6 +156,7 @@ def get_all_patients_without_caretakers_and_doctors_for_a_particular_user(
         )
 
 
+@traced
 def get_patient_with_caretakers_and_doctors_by_id(
     user_id: int, db: Session
 ) -> tuple[models.UserModel | None, str | None, str | None]:
@@ -5,6 +5,8 @@ from sqlite import models
 
 from sqlite.enums import UserRoleEnum
 
+from utils.tracing import traced
+
 
 def get_all_patients_by_list_of_ids(
     patient_ids: list[int], db: Session
@@ -22,6 +24,7 @@ def get_all_patients_by_list_of_ids(
     )
 
 
+@traced
 def get_patient_by_id(user_id: int, db: Session):
     """Get a single patient by id from the database"""
     return (
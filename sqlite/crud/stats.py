@@ -4,7 +4,10 @@ from sqlite import models
 
 from sqlite.enums import CombinedRoleEnum, UserRoleEnum
 
+from utils.tracing import traced
 
+
+@traced
 def get_all_stats(db: Session):
     """Get all stats for the dashboard form the database"""
     admin_count = (
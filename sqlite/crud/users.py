@@ -1,25 +1,68 @@
+import re
 from datetime import datetime
 
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session, joinedload, selectinload
 
 from sqlite import models
+from sqlite.crud.filters import filter_and_sort_users
+from sqlite.crud.versions import bump_association_version_for_patients_of_user
+from sqlite.enums import CombinedRoleEnum, UserRoleEnum
 
 from sqlite.schemas import (
     UserCreateClass,
     UserUpdateClass,
     UserPasswordUpdateClass,
+    UserListWithRoleFilterClass,
 )
 
 from utils.password import get_password_hash
+from utils.vital_rules import vital_rules_cache
+from utils.recent_readings import recent_readings_cache
+from utils.tracing import traced
 
+# Values per IN (...) lookup, well under SQLite's limit on bound parameters
+LOOKUP_CHUNK_SIZE = 500
+# bm25 weights of the name, email and phone columns of user_search
+USER_SEARCH_WEIGHTS = (10.0, 5.0, 5.0)
 
-def get_all_users(db: Session):
+
+def get_all_users(db: Session, filters: UserListWithRoleFilterClass | None = None):
     """Get all users from the database"""
-    return db.query(models.UserModel).options(
-        joinedload(models.UserModel.additional_details)
+    return filter_and_sort_users(
+        db.query(models.UserModel).options(
+            joinedload(models.UserModel.additional_details)
+        ),
+        filters=filters,
     )
 
 
+def search_users(search: str, db: Session, user_role: CombinedRoleEnum | None = None):
+    """Search users by the start of the words of their name, email and phone, best first"""
+    # Every word is quoted, so nothing typed is read as FTS5 query syntax
+    match = " ".join(f'"{word}"*' for word in re.findall(r"\w+", search))
+    query = (
+        db.query(models.UserModel)
+        .join(
+            models.user_search_table,
+            models.user_search_table.c.rowid == models.UserModel.id,
+        )
+        .options(joinedload(models.UserModel.additional_details))
+        .filter(
+            models.user_search_table.c.user_search.match(match),
+            models.user_search_table.c.rank.match(
+                f"bm25({', '.join(str(x) for x in USER_SEARCH_WEIGHTS)})"
+            ),
+        )
+        # Sorted by the index itself, so only a page of users is read, not every match
+        .order_by(models.user_search_table.c.rank)
+    )
+    if user_role is not None:
+        query = query.filter(models.UserModel.user_role == user_role)
+    return query
+
+
+@traced
 def get_user_by_id(user_id: int, db: Session):
     """Get a single user by id from the database"""
     return (
@@ -30,6 +73,7 @@ def get_user_by_id(user_id: int, db: Session):
     )
 
 
+@traced
 def get_user_by_email(user_email: str, db: Session):
     """Get a single user by email from the database"""
     return (
@@ -40,6 +84,7 @@ def get_user_by_email(user_email: str, db: Session):
     )
 
 
+@traced
 def get_user_by_phone(user_phone: str, db: Session):
     """Get a single user by phone from the database"""
     return (
@@ -51,6 +96,61 @@ def get_user_by_phone(user_phone: str, db: Session):
     )
 
 
+@traced
+def get_taken_emails(emails: list[str], db: Session) -> set[str]:
+    """Get which of the given emails are already used in the database"""
+    taken = set()
+    for start in range(0, len(emails), LOOKUP_CHUNK_SIZE):
+        taken.update(
+            db.scalars(
+                select(models.UserModel.email).where(
+                    models.UserModel.email.in_(
+                        emails[start : start + LOOKUP_CHUNK_SIZE]
+                    )
+                )
+            )
+        )
+    return taken
+
+
+@traced
+def get_taken_phones(phones: list[str], db: Session) -> set[str]:
+    """Get which of the given phone numbers are already used in the database"""
+    taken = set()
+    for start in range(0, len(phones), LOOKUP_CHUNK_SIZE):
+        taken.update(
+            db.scalars(
+                select(models.UserAdditionalDetailsModel.phone).where(
+                    models.UserAdditionalDetailsModel.phone.in_(
+                        phones[start : start + LOOKUP_CHUNK_SIZE]
+                    )
+                )
+            )
+        )
+    return taken
+
+
+@traced
+def get_user_ids_with_role(
+    user_ids: list[int], user_role: UserRoleEnum, db: Session
+) -> set[int]:
+    """Get which of the given ids are users with the given role"""
+    found = set()
+    for start in range(0, len(user_ids), LOOKUP_CHUNK_SIZE):
+        found.update(
+            db.scalars(
+                select(models.UserModel.id).where(
+                    models.UserModel.id.in_(
+                        user_ids[start : start + LOOKUP_CHUNK_SIZE]
+                    ),
+                    models.UserModel.user_role == user_role,
+                )
+            )
+        )
+    return found
+
+
+@traced
 def get_detailed_user(db_user: models.UserModel, db: Session):
     """Get a detailed single user from the database"""
     return (
@@ -68,6 +168,7 @@ def get_detailed_user(db_user: models.UserModel, db: Session):
     )
 
 
+@traced
 def create_user_with_additional_details(user: UserCreateClass, db: Session):
     """Create a new user, along with it's additional details in the database"""
     user.password = get_password_hash(user.password)
@@ -79,6 +180,35 @@ def create_user_with_additional_details(user: UserCreateClass, db: Session):
     return db_user
 
 
+@traced
+def create_users_with_additional_details(users: list[dict], db: Session) -> list[int]:
+    """Create many users, along with their additional details, in a single transaction
+
+    Every user is a dict of UserModel columns, with its password already hashed, and
+    its additional details under additional_details. Returns their ids, in order.
+    """
+    user_ids = db.scalars(
+        insert(models.UserModel).returning(
+            models.UserModel.id, sort_by_parameter_order=True
+        ),
+        [
+            {key: value for key, value in user.items() if key != "additional_details"}
+            for user in users
+        ],
+    ).all()
+    db.execute(
+        insert(models.UserAdditionalDetailsModel),
+        [
+            {**user["additional_details"], "user_id": user_id}
+            for user, user_id in zip(users, user_ids)
+        ],
+    )
+    db.commit()
+
+    return user_ids
+
+
+@traced
 def update_user(user: UserUpdateClass, db_user: models.UserModel, db: Session):
     """Update a user, along with it's additional details in the database"""
     db_user.update(user)
@@ -86,27 +216,38 @@ def update_user(user: UserUpdateClass, db_user: models.UserModel, db: Session):
     # Need to manually update updated_at
     # Else if only UserAdditionalDetailsModel model is updated, updated_at will not trigger
     db_user.updated_at = datetime.utcnow()
+    # Caretakers and doctors are embedded in their patients
+    bump_association_version_for_patients_of_user(user_id=db_user.id, db=db)
     db.commit()
 
     return db_user
 
 
+@traced
 def update_user_password(
     new_password: UserPasswordUpdateClass, db_user: models.UserModel, db: Session
 ):
     """Update a user's password on the database"""
     new_password.new_password = get_password_hash(password=new_password.new_password)
     db_user.update_password(new_password=new_password.new_password)
+    # updated_at changes, which is embedded in their patients as well
+    bump_association_version_for_patients_of_user(user_id=db_user.id, db=db)
     db.commit()
 
     return db_user
 
 
+@traced
 def delete_user(db_user: models.UserModel, db: Session):
     """Delete a user from the database"""
     # Cascade will handle delete from PatientModel, CaretakerModel or DoctorModel
+    # Associations of a caretaker or doctor go with it, so its patients change too
+    bump_association_version_for_patients_of_user(user_id=db_user.id, db=db)
     db.delete(db_user)
     # UserAssociationDetails is on cascade, it will be deleted automatically
     db.commit()
+    # Vital rules and histories are on cascade as well, make sure no cached copy outlives them
+    vital_rules_cache.invalidate(patient_id=db_user.id)
+    recent_readings_cache.invalidate(patient_id=db_user.id)
 
     return {"detail": "Deleted successfully"}
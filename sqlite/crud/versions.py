@@ -0,0 +1,116 @@
+from typing import Union
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, desc, exists, select, update
+
+from sqlite import models
+
+from sqlite.enums import UserRoleEnum
+
+from utils.tracing import traced
+
+
+def _latest_history(patient_id, column):
+    return (
+        select(column)
+        .where(models.PatientHistoryModel.patient_id == patient_id)
+        .order_by(desc(models.PatientHistoryModel.created_at))
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+@traced
+def get_patient_version(
+    user_id: int,
+    db: Session,
+    accessible_by_user_id: int | None = None,
+    accessible_by_user_role: Union[
+        UserRoleEnum.CARETAKER, UserRoleEnum.DOCTOR, None
+    ] = None,
+):
+    """Get everything a patient payload depends on, in a single indexed lookup
+
+    Returns None if the patient does not exist, or is not associated with the given
+    caretaker / doctor.
+    """
+    query = select(
+        models.UserModel.id,
+        models.UserModel.created_at,
+        models.UserModel.updated_at,
+        models.UserModel.association_version,
+        _latest_history(models.UserModel.id, models.PatientHistoryModel.id).label(
+            "latest_history_id"
+        ),
+        _latest_history(
+            models.UserModel.id, models.PatientHistoryModel.created_at
+        ).label("latest_history_created_at"),
+    ).where(
+        and_(
+            models.UserModel.id == user_id,
+            models.UserModel.user_role == UserRoleEnum.PATIENT,
+        )
+    )
+    if accessible_by_user_role == UserRoleEnum.CARETAKER:
+        query = query.where(
+            exists().where(
+                and_(
+                    models.patient_caretaker_association_table.c.patient_id
+                    == models.UserModel.id,
+                    models.patient_caretaker_association_table.c.caretaker_id
+                    == accessible_by_user_id,
+                )
+            )
+        )
+    elif accessible_by_user_role == UserRoleEnum.DOCTOR:
+        query = query.where(
+            exists().where(
+                and_(
+                    models.patient_doctor_association_table.c.patient_id
+                    == models.UserModel.id,
+                    models.patient_doctor_association_table.c.doctor_id
+                    == accessible_by_user_id,
+                )
+            )
+        )
+    return db.execute(query).first()
+
+
+@traced
+def get_patient_history_version(user_id: int, db: Session):
+    """Get the latest history of a patient, in a single indexed lookup"""
+    return db.execute(
+        select(models.PatientHistoryModel.id, models.PatientHistoryModel.created_at)
+        .where(models.PatientHistoryModel.patient_id == user_id)
+        .order_by(desc(models.PatientHistoryModel.created_at))
+        .limit(1)
+    ).first()
+
+
+@traced
+def bump_association_version_for_patients(patient_ids, db: Session):
+    """Bump association version of patients, the caller is responsible for the commit
+
+    updated_at of the patients is bumped along with it, so Last-Modified moves as well.
+    """
+    db.execute(
+        update(models.UserModel)
+        .where(models.UserModel.id.in_(patient_ids))
+        .values(association_version=models.UserModel.association_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@traced
+def bump_association_version_for_patients_of_user(user_id: int, db: Session):
+    """Bump association version of every patient a caretaker or doctor is associated with"""
+    bump_association_version_for_patients(
+        patient_ids=select(models.patient_caretaker_association_table.c.patient_id)
+        .where(models.patient_caretaker_association_table.c.caretaker_id == user_id)
+        .union(
+            select(models.patient_doctor_association_table.c.patient_id).where(
+                models.patient_doctor_association_table.c.doctor_id == user_id
+            )
+        ),
+        db=db,
+    )
@@ -0,0 +1,107 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+
+from sqlite import models
+
+from sqlite.schemas import VitalRuleCreateClass, VitalRuleUpdateClass
+
+from utils.vital_rules import vital_rules_cache
+from utils.tracing import traced
+
+
+@traced
+def get_all_vital_rules_for_particular_patient(patient_id: int, db: Session):
+    """Get all vital rules for a particular patient from the database"""
+    return (
+        db.query(models.VitalRuleModel)
+        .filter(models.VitalRuleModel.patient_id == patient_id)
+        .order_by(models.VitalRuleModel.id)
+        .all()
+    )
+
+
+@traced
+def get_all_active_vital_rules_for_particular_patient(patient_id: int, db: Session):
+    """Get all active vital rules for a particular patient from the database"""
+    return (
+        db.query(models.VitalRuleModel)
+        .filter(
+            and_(
+                models.VitalRuleModel.patient_id == patient_id,
+                models.VitalRuleModel.is_active == True,
+            )
+        )
+        .all()
+    )
+
+
+@traced
+def get_vital_rule_by_id(rule_id: int, db: Session):
+    """Get a single vital rule by id from the database"""
+    return (
+        db.query(models.VitalRuleModel)
+        .filter(models.VitalRuleModel.id == rule_id)
+        .first()
+    )
+
+
+@traced
+def create_vital_rule(
+    rule: VitalRuleCreateClass, db_creator: models.UserModel, db: Session
+):
+    """Create a new vital rule in the database"""
+    db_rule = models.VitalRuleModel(**rule.__dict__, created_by_id=db_creator.id)
+    db.add(db_rule)
+    db.commit()
+    # Compiled rules for this patient are now stale
+    vital_rules_cache.invalidate(patient_id=db_rule.patient_id)
+
+    return db_rule
+
+
+@traced
+def update_vital_rule(
+    rule: VitalRuleUpdateClass, db_rule: models.VitalRuleModel, db: Session
+):
+    """Update a vital rule in the database"""
+    db_rule.update(rule)
+    db.commit()
+    vital_rules_cache.invalidate(patient_id=db_rule.patient_id)
+
+    return db_rule
+
+
+@traced
+def delete_vital_rule(db_rule: models.VitalRuleModel, db: Session):
+    """Delete a vital rule from the database"""
+    patient_id = db_rule.patient_id
+    db.delete(db_rule)
+    db.commit()
+    vital_rules_cache.invalidate(patient_id=patient_id)
+
+    return {"detail": "Deleted successfully"}
+
+
+def _get_compiled_vital_rules(patient_id: int, db: Session):
+    return vital_rules_cache.get_or_compile(
+        patient_id=patient_id,
+        load_rules=lambda: get_all_active_vital_rules_for_particular_patient(
+            patient_id=patient_id, db=db
+        ),
+    )
+
+
+@traced
+def evaluate_vital_rules(db_patient_history: models.PatientHistoryModel, db: Session):
+    """Evaluate a patient's compiled vital rules against a newly ingested reading"""
+    compiled = _get_compiled_vital_rules(
+        patient_id=db_patient_history.patient_id, db=db
+    )
+    return compiled.evaluate(db_patient_history)
+
+
+@traced
+def evaluate_vital_rules_for_readings(patient_id: int, readings: list, db: Session):
+    """Evaluate a patient's compiled vital rules against a batch of newly ingested readings"""
+    compiled = _get_compiled_vital_rules(patient_id=patient_id, db=db)
+    return [compiled.evaluate(reading) for reading in readings]
@@ -1,10 +1,19 @@
+from time import perf_counter
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from sqlalchemy import event
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///sqlite.db"
+from config import config
+
+from utils.metrics import db_session_checkout_seconds
+from utils.query_stats import before_cursor_execute, after_cursor_execute
+from utils.slow_queries import slow_query_log
+import utils.tracing as tracing
+
+SQLALCHEMY_DATABASE_URL = config.SQLALCHEMY_DATABASE_URL
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
@@ -12,6 +21,16 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 event.listen(engine, 'connect', lambda c, _: c.execute('pragma foreign_keys=on'))
+# Count statements and time spent in them, per request
+event.listen(engine, "before_cursor_execute", before_cursor_execute)
+event.listen(engine, "after_cursor_execute", after_cursor_execute)
+# Log statements slower than SLOW_QUERY_THRESHOLD_MS, with their query plan
+event.listen(engine, "before_cursor_execute", slow_query_log.before_cursor_execute)
+event.listen(engine, "after_cursor_execute", slow_query_log.after_cursor_execute)
+# A span per statement, when the request is traced
+event.listen(engine, "before_cursor_execute", tracing.before_cursor_execute)
+event.listen(engine, "after_cursor_execute", tracing.after_cursor_execute)
+event.listen(engine, "handle_error", tracing.handle_error)
 
 Base = declarative_base()
 
@@ -20,6 +39,10 @@ Base = declarative_base()
 def get_db():
     db = SessionLocal()
     try:
+        # Check out the connection up front, so the wait for the pool is measured
+        start = perf_counter()
+        db.connection()
+        db_session_checkout_seconds.observe(perf_counter() - start)
         yield db
     finally:
         db.close()
@@ -37,3 +37,44 @@ class PatientActionEnum(str, enum.Enum):
     ACTION_2 = "action_2"
     ACTION_3 = "action_3"
     ACTION_4 = "action_4"
+
+
+class VitalSignEnum(str, enum.Enum):
+    SPO2 = "spo2_reading"
+    SYSTOLIC = "systolic_reading"
+    DIASTOLIC = "diastolic_reading"
+    TEMP = "temp_reading"
+    HEARTBEAT = "heartbeat_reading"
+
+
+class VitalRuleOperatorEnum(str, enum.Enum):
+    LESS_THAN = "<"
+    LESS_THAN_OR_EQUAL = "<="
+    GREATER_THAN = ">"
+    GREATER_THAN_OR_EQUAL = ">="
+
+
+class OutboxStatusEnum(str, enum.Enum):
+    PENDING = "pending"
+    IN_FLIGHT = "in_flight"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class UserImportStatusEnum(str, enum.Enum):
+    CREATED = "created"
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+    FAILED = "failed"
+
+
+class UserSortEnum(str, enum.Enum):
+    ID = "id"
+    NAME = "name"
+    EMAIL = "email"
+    CREATED_AT = "created_at"
+
+
+class SortOrderEnum(str, enum.Enum):
+    ASC = "asc"
+    DESC = "desc"
@@ -0,0 +1,81 @@
+"""Create many users in the configured database from a CSV or JSON file
+
+Usage: python -m sqlite.import_users users.csv --report report.json
+
+Same as POST /users/import: a JSON array of users, or CSV with a header row with name,
+email, gender, password and user_role columns, and optionally phone, age and blood_group.
+Every user is created or reported on its own, users that could not be created are
+listed with why, and the exit status is 1 if there were any.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from config import config
+
+from sqlite.database import SessionLocal
+from sqlite.enums import UserImportStatusEnum
+
+from utils.user_import import (
+    CSV_MEDIA_TYPE,
+    UserImportError,
+    import_users,
+    read_users,
+)
+
+MEDIA_TYPES = {"csv": CSV_MEDIA_TYPE, "json": "application/json"}
+
+
+def _log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("file")
+    parser.add_argument(
+        "--format", choices=MEDIA_TYPES, help="Defaults to the extension of the file"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=config.USER_IMPORT_CHUNK_SIZE,
+        help="Users created per transaction",
+    )
+    parser.add_argument("--report", help="Write the report of every row as JSON here")
+    args = parser.parse_args()
+
+    format = args.format or os.path.splitext(args.file)[1].lstrip(".").lower()
+    if format not in MEDIA_TYPES:
+        parser.error("Could not tell the format from the file name, pass --format")
+    with open(args.file, "rb") as f:
+        body = f.read()
+    try:
+        users = read_users(body, media_type=MEDIA_TYPES[format])
+    except UserImportError as e:
+        parser.error(str(e))
+
+    _log(f"importing {len(users):,} users")
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        report = import_users(users=users, db=db, chunk_size=args.chunk_size)
+    _log(f"took {time.perf_counter() - start:.1f}s")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report.model_dump_json(indent=2))
+    for row in report.rows:
+        if row.status != UserImportStatusEnum.CREATED:
+            print(f"row {row.row} ({row.email}): {row.status.value}", end="")
+            print(f": {'; '.join(row.errors)}" if row.errors else "")
+    print(f"created: {report.created_count}")
+    print(f"not created: {report.failed_count}")
+    sys.exit(1 if report.failed_count else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,30 @@ from sqlalchemy import (
     Column,
     Integer,
     Float,
+    Boolean,
     String,
     DateTime,
     ForeignKey,
     Enum,
+    Index,
+    UniqueConstraint,
+    column,
+    table,
 )
 from sqlalchemy.orm import relationship
 
-from sqlite.database import Base, engine
+from sqlite.database import Base
 
-from sqlite.schemas import UserUpdateClass
-from sqlite.enums import CombinedRoleEnum, GenderEnum, PatientBloodGroupEnum
-
-Base.metadata.create_all(bind=engine)
+from sqlite.schemas import UserUpdateClass, VitalRuleUpdateClass
+from sqlite.enums import (
+    CombinedRoleEnum,
+    GenderEnum,
+    PatientBloodGroupEnum,
+    VitalSignEnum,
+    VitalRuleOperatorEnum,
+    PatientActionEnum,
+    OutboxStatusEnum,
+)
 
 
 # ASSOCIATION TABLES
@@ -28,13 +39,19 @@ patient_caretaker_association_table = Table(
         "patient_id",
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
+        primary_key=True,
     ),
     Column(
         "caretaker_id",
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
+        primary_key=True,
+    ),
+    # The primary key serves caretakers of a patient, this one patients of a caretaker
+    Index(
+        "ix_patient_caretaker_association_table_caretaker_id_patient_id",
+        "caretaker_id",
+        "patient_id",
     ),
 )
 
@@ -45,16 +62,48 @@ patient_doctor_association_table = Table(
         "patient_id",
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
-        nullable=False,
+        primary_key=True,
     ),
     Column(
-        "doctor_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        "doctor_id",
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
     ),
+    # The primary key serves doctors of a patient, this one patients of a doctor
+    Index(
+        "ix_patient_doctor_association_table_doctor_id_patient_id",
+        "doctor_id",
+        "patient_id",
+    ),
+)
+
+
+# SEARCH TABLES
+# FTS5 index of users, rowid is the user id. It is created by a migration and kept in
+# sync by triggers on users and user_additional_details, so it is not in the metadata.
+user_search_table = table(
+    "user_search",
+    column("rowid", Integer),
+    # Hidden columns, the one named after the table is for MATCH
+    column("user_search"),
+    column("rank"),
+    column("name", String),
+    column("email", String),
+    column("phone", String),
 )
 
 
 class UserModel(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Admin lists filter by role, then page in name or created_at order
+        Index("ix_users_user_role_name", "user_role", "name"),
+        # Gender matches half of a role, too many rows to look up through the above
+        Index("ix_users_user_role_gender", "user_role", "gender"),
+        Index("ix_users_user_role_created_at", "user_role", "created_at"),
+        Index("ix_users_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -62,6 +111,8 @@ class UserModel(Base):
     password = Column(String, nullable=False)
     gender = Column(Enum(GenderEnum), nullable=False)
     user_role = Column(Enum(CombinedRoleEnum), nullable=False)
+    # Bumped whenever the caretakers / doctors embedded in a patient change
+    association_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Define the one-to-one relationship with UserAdditionalDetailsModel
     additional_details = relationship(
@@ -89,6 +140,14 @@ class UserModel(Base):
 
 class UserAdditionalDetailsModel(Base):
     __tablename__ = "user_additional_details"
+    __table_args__ = (
+        # Admin lists filtered by blood group look up the matching users here
+        Index(
+            "ix_user_additional_details_blood_group_user_id",
+            "blood_group",
+            "user_id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
@@ -109,6 +168,14 @@ class UserAdditionalDetailsModel(Base):
 
 class PatientHistoryModel(Base):
     __tablename__ = "patient_histories"
+    __table_args__ = (
+        # Latest readings and date ranges of a patient are looked up by created_at
+        Index(
+            "ix_patient_histories_patient_id_created_at",
+            "patient_id",
+            "created_at",
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
 
@@ -128,3 +195,113 @@ class PatientHistoryModel(Base):
     created_at = Column(
         DateTime(timezone=True), nullable=False, default=datetime.utcnow
     )
+
+
+class VitalRuleModel(Base):
+    __tablename__ = "vital_rules"
+
+    id = Column(Integer, primary_key=True)
+
+    patient_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    created_by_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+
+    metric = Column(Enum(VitalSignEnum), nullable=False)
+    operator = Column(Enum(VitalRuleOperatorEnum), nullable=False)
+    threshold = Column(Float, nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True)
+
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
+    updated_at = Column(
+        DateTime(timezone=True), nullable=True, onupdate=datetime.utcnow
+    )
+
+    def update(self, rule: VitalRuleUpdateClass, **kwargs):
+        self.metric = rule.metric
+        self.operator = rule.operator
+        self.threshold = rule.threshold
+        self.is_active = rule.is_active
+
+
+class PatientActionOutboxModel(Base):
+    __tablename__ = "patient_action_outbox"
+    __table_args__ = (
+        # Delivery workers claim due rows by status and next_attempt_at
+        Index(
+            "ix_patient_action_outbox_status_next_attempt_at",
+            "status",
+            "next_attempt_at",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    patient_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    action = Column(Enum(PatientActionEnum), nullable=False)
+
+    status = Column(
+        Enum(OutboxStatusEnum), nullable=False, default=OutboxStatusEnum.PENDING
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class CaretakerNotificationModel(Base):
+    __tablename__ = "caretaker_notifications"
+    __table_args__ = (
+        # Delivery is at least once, a retried action must not notify a caretaker twice
+        UniqueConstraint(
+            "outbox_id",
+            "caretaker_id",
+            name="uq_caretaker_notifications_outbox_id_caretaker_id",
+        ),
+        # Caretakers read their notifications newest first
+        Index("ix_caretaker_notifications_caretaker_id_id", "caretaker_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    outbox_id = Column(
+        Integer,
+        ForeignKey("patient_action_outbox.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    patient_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    caretaker_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    action = Column(Enum(PatientActionEnum), nullable=False)
+
+    # When the patient sent the action, not when it was delivered
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    delivered_at = Column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
@@ -1,4 +1,4 @@
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from pydantic import BaseModel, ConfigDict, field_validator
 
 from sqlite.enums import (
@@ -7,6 +7,11 @@ from sqlite.enums import (
     PatientBloodGroupEnum,
     GenderEnum,
     PatientActionEnum,
+    VitalSignEnum,
+    VitalRuleOperatorEnum,
+    UserImportStatusEnum,
+    UserSortEnum,
+    SortOrderEnum,
 )
 
 from utils.date_utils import (
@@ -97,6 +102,68 @@ class UserPasswordUpdateClass(BaseModel):
     new_password: str
 
 
+class UserImportClass(UserCreateClass):
+    additional_details: UserAdditionalDetailsCreateOrUpdateClass = (
+        UserAdditionalDetailsCreateOrUpdateClass()
+    )
+
+
+class UserImportRowResult(BaseModel):
+    # Position of the user in the imported file, starting at 1
+    row: int
+    email: str | None = None
+    status: UserImportStatusEnum
+    user_id: int | None = None
+    errors: list[str] = []
+
+
+class UserImportReport(BaseModel):
+    created_count: int
+    failed_count: int
+    rows: list[UserImportRowResult]
+
+
+# User list filters
+## Note: Query parameters of the admin list endpoints, every one is pushed down to SQL
+class UserListFilterClass(BaseModel):
+    gender: GenderEnum | None = None
+    blood_group: PatientBloodGroupEnum | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    sort_by: UserSortEnum = UserSortEnum.ID
+    sort_order: SortOrderEnum = SortOrderEnum.ASC
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def convert_to_naive_utc(cls, value: datetime | None):
+        # created_at is stored as naive UTC, as are the bounds it is compared with
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class UserListWithRoleFilterClass(UserListFilterClass):
+    user_role: CombinedRoleEnum | None = None
+
+
+# Association
+class CaretakerAssociationClass(BaseModel):
+    patient_id: int
+    caretaker_id: int
+
+
+class DoctorAssociationClass(BaseModel):
+    patient_id: int
+    doctor_id: int
+
+
+class BulkAssociationResponseClass(CommonResponseClass):
+    # Pairs that were (dis)associated by the request
+    changed_count: int
+    # Pairs that already were (dis)associated, or repeated in the request
+    unchanged_count: int
+
+
 # User
 ## Note: Can or can not be an admin
 class User(UserBaseClass):
@@ -167,11 +234,77 @@ class PatientHistory(PatientHistoryBaseClass):
     created_at: datetime
 
 
+# Vital Rule
+class VitalRuleBaseClass(BaseModel):
+    metric: VitalSignEnum
+    operator: VitalRuleOperatorEnum
+    threshold: float
+    is_active: bool = True
+
+    @field_validator("threshold")
+    @classmethod
+    def threshold_validator(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError("must be a positive value")
+        return v
+
+
+class VitalRuleCreateClass(VitalRuleBaseClass):
+    patient_id: int
+
+
+class VitalRuleUpdateClass(VitalRuleBaseClass):
+    pass
+
+
+class VitalRule(VitalRuleBaseClass):
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    id: int
+    patient_id: int
+    created_by_id: int | None = None
+
+    created_at: datetime
+    updated_at: datetime | None = None
+
+
+class VitalAlert(BaseModel):
+    rule_id: int
+    metric: VitalSignEnum
+    operator: VitalRuleOperatorEnum
+    threshold: float
+    value: float
+
+
+class PatientHistoryWithAlerts(PatientHistory):
+    alerts: list[VitalAlert] = []
+
+
 # Patient Action
 class PatientActionBaseClass(BaseModel):
     action: PatientActionEnum
 
 
+class PatientActionNotification(PatientActionBaseClass):
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    outbox_id: int
+    patient_id: int
+    caretaker_id: int
+
+    created_at: datetime
+
+
 # Stats
 class StatsBaseClass(BaseModel):
     admin_count: int
@@ -180,5 +313,93 @@ class StatsBaseClass(BaseModel):
     patient_count: int
 
 
+# Slow queries
+class SlowQuery(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    id: int
+    recorded_at: datetime
+    duration_ms: float
+    route: str | None = None
+    statement: str
+    parameters: list | dict | None = None
+    executemany: bool
+    plan: list[str] | None = None
+
+
+# Event loop
+class EventLoopBlock(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    detected_at: datetime
+    blocked_ms: float
+    route: str | None = None
+    stack: list[str]
+
+
+# Profiles
+class Profile(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    id: str
+    created_at: datetime
+    mode: str
+    method: str
+    path: str
+    route: str
+    status_code: int
+    duration_ms: float
+    size: int
+
+
+# Memory
+class MemorySnapshot(BaseModel):
+    model_config = ConfigDict(
+        json_encoders={
+            datetime: convert_datetime_to_iso_8601_with_z_suffix,
+        },
+    )
+
+    id: int
+    created_at: datetime
+    traced_bytes: int
+    frames: int
+
+
+class MemoryAllocation(BaseModel):
+    file: str
+    line: int
+    size: int
+    count: int
+    size_diff: int | None = None
+    count_diff: int | None = None
+
+
+class MemoryStatus(BaseModel):
+    pid: int
+    rss_bytes: int | None = None
+    tracing: bool
+    traceback_limit: int
+    traced_bytes: int
+    traced_peak_bytes: int
+    instances_by_model: dict[str, int]
+    sessions: int
+    session_identity_map_size: int
+    pool_checked_out: int | None = None
+    snapshots: list[MemorySnapshot]
+
+
 Token.model_rebuild()
 Patient.model_rebuild()
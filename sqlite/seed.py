@@ -0,0 +1,340 @@
+"""Populate the configured database with synthetic users, associations and vitals
+
+Usage: python -m sqlite.seed --patients 10000 --readings-per-patient 10000
+
+Targets SQLALCHEMY_DATABASE_URL, which should already be migrated (alembic upgrade head).
+Everything is written through bulk Core statements on a single connection, with
+journaling and fsync turned off, so interrupting a run leaves the database unusable.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    case,
+    cast,
+    func,
+    inspect,
+    literal,
+    select,
+)
+
+from sqlite import models
+from sqlite.database import engine
+from sqlite.enums import CombinedRoleEnum, GenderEnum, PatientBloodGroupEnum
+
+from utils.password import get_password_hash
+
+FIRST_NAMES = (
+    "Aisha", "Ali", "Amelia", "Ayesha", "Bilal", "Chen", "Daniel", "Elena", "Fatima",
+    "Hamza", "Hana", "Ibrahim", "James", "Javier", "Lucas", "Maria", "Mei", "Noah",
+    "Omar", "Priya", "Ravi", "Sara", "Sofia", "Usman", "Yusuf", "Zainab",
+)  # fmt: skip
+LAST_NAMES = (
+    "Ahmed", "Ali", "Brown", "Chen", "Garcia", "Hassan", "Iqbal", "Johnson", "Khan",
+    "Kim", "Lopez", "Malik", "Nguyen", "Patel", "Qureshi", "Rossi", "Shah", "Silva",
+    "Smith", "Tanaka", "Williams",
+)  # fmt: skip
+# Rough population frequencies
+BLOOD_GROUPS = {
+    PatientBloodGroupEnum.O_POSITIVE: 37,
+    PatientBloodGroupEnum.A_POSITIVE: 28,
+    PatientBloodGroupEnum.B_POSITIVE: 20,
+    PatientBloodGroupEnum.AB_POSITIOVE: 5,
+    PatientBloodGroupEnum.O_NEGATIVE: 4,
+    PatientBloodGroupEnum.A_NEGATIVE: 3,
+    PatientBloodGroupEnum.B_NEGATIVE: 2,
+    PatientBloodGroupEnum.AB_NEGATIVE: 1,
+}
+
+USER_CHUNK_SIZE = 50_000
+READINGS_PER_STATEMENT = 5_000_000
+
+_baselines = Table(
+    "seed_baselines",
+    MetaData(),
+    Column("patient_id", Integer, primary_key=True),
+    Column("spo2", Float),
+    Column("systolic", Float),
+    Column("diastolic", Float),
+    Column("temp", Float),
+    Column("heartbeat", Float),
+    # Seconds into the interval, so patients do not all report on the same second
+    Column("phase", Integer),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def insert_users(
+    connection,
+    role: CombinedRoleEnum,
+    count: int,
+    password_hash: str,
+    rng: random.Random,
+) -> list[int]:
+    """Bulk insert users of a role with their additional details, return their ids"""
+    first_id = (
+        connection.execute(select(func.max(models.UserModel.id))).scalar() or 0
+    ) + 1
+    ids = list(range(first_id, first_id + count))
+    now = datetime.utcnow()
+    for start in range(0, count, USER_CHUNK_SIZE):
+        chunk = ids[start : start + USER_CHUNK_SIZE]
+        users, details = [], []
+        for user_id in chunk:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            users.append(
+                {
+                    "id": user_id,
+                    "name": f"{first} {last}",
+                    "email": f"{first}.{last}.{user_id}@example.com".lower(),
+                    "password": password_hash,
+                    "gender": rng.choice((GenderEnum.MALE, GenderEnum.FEMALE)),
+                    "user_role": role,
+                    "created_at": now,
+                }
+            )
+            details.append(
+                {
+                    "user_id": user_id,
+                    "phone": f"+1555{user_id:07d}",
+                    "age": (
+                        rng.randint(18, 95)
+                        if role == CombinedRoleEnum.PATIENT
+                        else rng.randint(24, 68)
+                    ),
+                    "blood_group": rng.choices(
+                        list(BLOOD_GROUPS), weights=list(BLOOD_GROUPS.values())
+                    )[0],
+                }
+            )
+        connection.execute(models.UserModel.__table__.insert(), users)
+        connection.execute(
+            models.UserAdditionalDetailsModel.__table__.insert(), details
+        )
+    return ids
+
+
+def insert_associations(
+    connection, table: Table, column: str, patient_ids, staff_ids, per_patient, rng
+):
+    """Bulk insert associations, each patient with per_patient distinct staff members"""
+    per_patient = min(per_patient, len(staff_ids))
+    for start in range(0, len(patient_ids), USER_CHUNK_SIZE):
+        connection.execute(
+            table.insert(),
+            [
+                {"patient_id": patient_id, column: staff_id}
+                for patient_id in patient_ids[start : start + USER_CHUNK_SIZE]
+                for staff_id in rng.sample(staff_ids, per_patient)
+            ],
+        )
+
+
+def _noise(scale: float):
+    """Triangular noise in [-scale, scale], computed by SQLite for every row"""
+    uniform = lambda: (func.abs(func.random()) % 2001 - 1000) / 2000.0
+    return (uniform() + uniform()) * scale
+
+
+def insert_readings(
+    connection,
+    patient_ids: list[int],
+    readings_per_patient: int,
+    interval: timedelta,
+    rng: random.Random,
+) -> int:
+    """Insert a vitals time series for every patient, generated inside SQLite
+
+    Every patient has their own baseline, a day / night cycle and noise on top of it, with
+    the odd desaturation episode. Readings end now, interval apart. Rows are produced by
+    INSERT .. SELECT over a recursive step counter, no Python runs per row.
+    """
+    _baselines.create(connection)
+    connection.execute(
+        _baselines.insert(),
+        [
+            {
+                "patient_id": patient_id,
+                "spo2": rng.uniform(95.0, 98.5),
+                "systolic": rng.gauss(122, 10),
+                "diastolic": rng.gauss(79, 6),
+                "temp": rng.uniform(36.4, 37.1),
+                "heartbeat": rng.uniform(62, 88),
+                "phase": rng.randrange(max(int(interval.total_seconds()), 1)),
+            }
+            for patient_id in patient_ids
+        ],
+    )
+
+    seconds = max(int(interval.total_seconds()), 1)
+    first_at = int(time.time()) - readings_per_patient * seconds
+    steps_per_statement = max(READINGS_PER_STATEMENT // len(patient_ids), 1)
+    inserted = 0
+    for start in range(0, readings_per_patient, steps_per_statement):
+        end = min(start + steps_per_statement, readings_per_patient)
+        steps = select(literal(start).label("n")).cte("steps", recursive=True)
+        steps = steps.union_all(select(steps.c.n + 1).where(steps.c.n + 1 < end))
+
+        at = literal(first_at) + steps.c.n * seconds + _baselines.c.phase
+        # 0 at noon up to 1 at midnight, UTC is as good as any zone for synthetic data
+        night = func.abs(at % 86400 - 43200) / 43200.0
+        dip = case((func.abs(func.random()) % 5000 == 0, -7.0), else_=0.0)
+        query = select(
+            _baselines.c.patient_id,
+            func.round(
+                func.min(100.0, _baselines.c.spo2 - night + _noise(0.8) + dip), 1
+            ),
+            cast(_baselines.c.systolic - 10 * night + _noise(6), Integer),
+            cast(_baselines.c.diastolic - 6 * night + _noise(4), Integer),
+            func.round(_baselines.c.temp - 0.4 * night + _noise(0.15), 2),
+            func.round(_baselines.c.heartbeat - 8 * night + _noise(5), 0),
+            func.strftime("%Y-%m-%d %H:%M:%S.000000", at, "unixepoch"),
+        ).select_from(steps.join(_baselines, literal(True)))
+
+        table = models.PatientHistoryModel.__table__
+        connection.execute(
+            table.insert().from_select(
+                [
+                    table.c.patient_id,
+                    table.c.spo2_reading,
+                    table.c.systolic_reading,
+                    table.c.diastolic_reading,
+                    table.c.temp_reading,
+                    table.c.heartbeat_reading,
+                    table.c.created_at,
+                ],
+                query,
+            )
+        )
+        connection.commit()
+        inserted += (end - start) * len(patient_ids)
+        _log(f"readings: {inserted:,}")
+
+    _baselines.drop(connection)
+    return inserted
+
+
+def seed(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    # Hashed once, bcrypt per user would dominate everything else
+    password_hash = get_password_hash(args.password)
+    table = models.PatientHistoryModel.__table__
+
+    with engine.connect() as connection:
+        for pragma in (
+            "foreign_keys=OFF",
+            "journal_mode=OFF",
+            "synchronous=OFF",
+            "temp_store=MEMORY",
+            "cache_size=-262144",
+            "locking_mode=EXCLUSIVE",
+        ):
+            connection.exec_driver_sql(f"PRAGMA {pragma}")
+
+        timings = {}
+        started = time.perf_counter()
+        ids = {
+            role: insert_users(connection, role, count, password_hash, rng)
+            for role, count in (
+                (CombinedRoleEnum.ADMIN, args.admins),
+                (CombinedRoleEnum.DOCTOR, args.doctors),
+                (CombinedRoleEnum.CARETAKER, args.caretakers),
+                (CombinedRoleEnum.PATIENT, args.patients),
+            )
+        }
+        patient_ids = ids[CombinedRoleEnum.PATIENT]
+        if ids[CombinedRoleEnum.DOCTOR]:
+            insert_associations(
+                connection,
+                models.patient_doctor_association_table,
+                "doctor_id",
+                patient_ids,
+                ids[CombinedRoleEnum.DOCTOR],
+                args.doctors_per_patient,
+                rng,
+            )
+        if ids[CombinedRoleEnum.CARETAKER]:
+            insert_associations(
+                connection,
+                models.patient_caretaker_association_table,
+                "caretaker_id",
+                patient_ids,
+                ids[CombinedRoleEnum.CARETAKER],
+                args.caretakers_per_patient,
+                rng,
+            )
+        connection.commit()
+        timings["users_seconds"] = time.perf_counter() - started
+        _log(f"users: {sum(map(len, ids.values())):,}")
+
+        # Appending to an index row by row is far slower than building it once at the end
+        existing = {x["name"] for x in inspect(connection).get_indexes(table.name)}
+        deferred = [x for x in table.indexes if x.name in existing]
+        for index in deferred:
+            index.drop(connection)
+        connection.commit()
+
+        started = time.perf_counter()
+        readings = 0
+        if patient_ids and args.readings_per_patient:
+            readings = insert_readings(
+                connection,
+                patient_ids,
+                args.readings_per_patient,
+                timedelta(seconds=args.interval_seconds),
+                rng,
+            )
+        timings["readings_seconds"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for index in deferred:
+            index.create(connection)
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.commit()
+        timings["indexes_seconds"] = time.perf_counter() - started
+
+    return {
+        "users": {role.value: len(x) for role, x in ids.items()},
+        "readings": readings,
+        **timings,
+        "readings_per_second": readings / max(timings["readings_seconds"], 1e-9),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--caretakers", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--doctors-per-patient", type=int, default=1)
+    parser.add_argument("--caretakers-per-patient", type=int, default=2)
+    parser.add_argument("--readings-per-patient", type=int, default=1000)
+    parser.add_argument("--interval-seconds", type=int, default=60)
+    parser.add_argument(
+        "--password", default="password", help="Password of every seeded user"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    for key, value in seed(args).items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import configure_mappers
+
+from config import config
+
+from sqlite import models
+from sqlite.database import engine
+
+from utils.file_locks import import_fcntl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_schema_problems() -> list[str]:
+    """Tables and columns of the models that are missing from the database"""
+    with engine.connect() as connection:
+        inspector = inspect(connection)
+        existing = set(inspector.get_table_names())
+        problems = []
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in existing:
+                problems.append(f"table {table.name} is missing")
+                continue
+            columns = {x["name"] for x in inspector.get_columns(table.name)}
+            problems.extend(
+                f"column {table.name}.{x.name} is missing"
+                for x in table.columns
+                if x.name not in columns
+            )
+    return problems
+
+
+def upgrade_database() -> None:
+    """Run the alembic migrations up to head, once even when every worker calls it
+
+    Workers booting together wait on a lock file next to the database, the first one
+    migrates and the others find nothing left to do.
+    """
+    # Imported here, alembic is slow to import and most boots do not need it
+    from alembic import command
+    from alembic.config import Config
+
+    # No config file, alembic.ini's logging setup would disable the app's loggers
+    alembic_config = Config()
+    alembic_config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+
+    database = engine.url.database
+    if not database or database == ":memory:":
+        command.upgrade(alembic_config, "head")
+        return
+    fcntl = import_fcntl("DATABASE_STARTUP=upgrade")
+    with open(f"{database}.migrations.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            command.upgrade(alembic_config, "head")
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def warm_up() -> None:
+    """Do the work the first requests would otherwise pay for"""
+    # Mappers are configured lazily, on the first query otherwise
+    configure_mappers()
+    # Open the pooled connections, with their pragmas, before requests need them
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    connections = [engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+
+def prepare_database() -> None:
+    """Migrate or check the schema as configured by DATABASE_STARTUP, then warm up
+
+    Runs once per worker from the app's lifespan, before the first request is served.
+    """
+    if config.DATABASE_STARTUP == "upgrade":
+        upgrade_database()
+    if config.DATABASE_STARTUP in ("upgrade", "check"):
+        problems = get_schema_problems()
+        if problems:
+            raise RuntimeError(
+                "Database schema is out of date, run alembic upgrade head: "
+                + ", ".join(problems)
+            )
+    warm_up()
@@ -16,9 +16,25 @@ from sqlite.enums import UserRoleEnum, CombinedRoleEnum
 
 import sqlite.crud.users as users
 
+from utils.tracing import traced, set_request_attributes
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+def get_user_by_access_token(token: str, db: Session):
+    """Get the user an access token was issued to, None if the token is not valid"""
+    try:
+        payload = jwt.decode(token, secret.SECRET_KEY, algorithms=[secret.ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None:
+            return None
+        token_data = TokenData(email=email)
+    except JWTError:
+        return None
+    return users.get_user_by_email(user_email=token_data.email, db=db)
+
+
+@traced("auth")
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)
 ):
@@ -28,17 +44,10 @@ async def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, secret.SECRET_KEY, algorithms=[secret.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    user = users.get_user_by_email(user_email=token_data.email, db=db)
+    user = get_user_by_access_token(token=token, db=db)
     if user is None:
         raise credentials_exception
+    set_request_attributes(enduser_id=user.id, enduser_role=user.user_role.value)
     return user
 
 
@@ -73,3 +82,25 @@ async def user_should_be_patient(
         status_code=400,
         detail="You do not have the necessary permission to access this route",
     )
+
+
+async def user_should_be_doctor(
+    current_user: Annotated[UserModel, Depends(get_current_user)]
+):
+    if current_user.user_role == UserRoleEnum.DOCTOR:
+        return current_user
+    raise HTTPException(
+        status_code=400,
+        detail="You do not have the necessary permission to access this route",
+    )
+
+
+async def user_should_be_caretaker(
+    current_user: Annotated[UserModel, Depends(get_current_user)]
+):
+    if current_user.user_role == UserRoleEnum.CARETAKER:
+        return current_user
+    raise HTTPException(
+        status_code=400,
+        detail="You do not have the necessary permission to access this route",
+    )
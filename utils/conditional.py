@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+
+class ResourceVersion:
+    """Cheap version of a resource, used to answer conditional requests"""
+
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, *tokens, last_modified: datetime) -> None:
+        self.etag = '"' + "-".join(str(x) for x in tokens) + '"'
+        # Timestamps are stored as naive UTC, HTTP dates have second precision
+        self.last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+    def set_headers(self, response: Response) -> None:
+        """Attach validators to a response, clients have to revalidate before reuse"""
+        response.headers["ETag"] = self.etag
+        response.headers["Last-Modified"] = format_datetime(
+            self.last_modified, usegmt=True
+        )
+        response.headers["Cache-Control"] = "no-cache"
+
+    def is_not_modified(self, request: Request) -> bool:
+        """Check If-None-Match, or If-Modified-Since when no If-None-Match was sent"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = [x.strip().removeprefix("W/") for x in if_none_match.split(",")]
+            return "*" in etags or self.etag in etags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def not_modified_response(self, request: Request) -> Response | None:
+        """A 304 response if the client already has this version, None otherwise"""
+        if not self.is_not_modified(request):
+            return None
+        response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        self.set_headers(response)
+        return response
+
+
+def _to_microseconds(dt: datetime) -> int:
+    return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+
+def get_patient_resource_version(version) -> ResourceVersion:
+    """Build a resource version out of a row of crud.versions.get_patient_version"""
+    return ResourceVersion(
+        version.id,
+        version.association_version,
+        _to_microseconds(version.updated_at or version.created_at),
+        version.latest_history_id or 0,
+        last_modified=max(
+            x
+            for x in (
+                version.created_at,
+                version.updated_at,
+                version.latest_history_created_at,
+            )
+            if x is not None
+        ),
+    )
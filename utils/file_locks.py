@@ -0,0 +1,48 @@
+import os
+from itertools import count
+from threading import Lock
+
+_worker_slot: tuple[int, object] | None = None
+_worker_slot_lock = Lock()
+
+
+def import_fcntl(setting: str):
+    """Import fcntl for the file locks of a setting, with a clear error where it is missing
+
+    Only the modes taking file locks import it, so the app still runs on Windows with the
+    default settings.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise RuntimeError(
+            f"{setting} is only supported on POSIX systems, it relies on fcntl file locks"
+        ) from None
+    return fcntl
+
+
+def worker_slot(directory: str) -> int:
+    """Lowest slot number that no other live worker of the node holds, kept for life
+
+    Slots are lock files in directory, released when their worker exits, so a restarted
+    or recycled worker takes over the slot of the one it replaces.
+    """
+    global _worker_slot
+    with _worker_slot_lock:
+        if _worker_slot is not None:
+            return _worker_slot[0]
+        try:
+            import fcntl
+        except ImportError:
+            # Only a single worker runs where there are no file locks
+            return 0
+        os.makedirs(directory, exist_ok=True)
+        for slot in count():
+            lock_file = open(os.path.join(directory, f"{slot}.lock"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            _worker_slot = (slot, lock_file)
+            return slot
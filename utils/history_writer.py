@@ -0,0 +1,406 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+from functools import partial
+from typing import Callable
+
+from fastapi import HTTPException
+from sqlalchemy import Connection
+from sqlalchemy.orm import Session
+
+from config import config
+
+from sqlite.database import SessionLocal, engine
+import sqlite.crud.patient_history as crud
+
+from sqlite.schemas import PatientHistory, User
+
+from utils.file_locks import import_fcntl
+from utils.metrics import history_writer_batch_rows
+from utils.recent_readings import recent_readings_cache
+
+logger = logging.getLogger(__name__)
+
+# Messages are JSON, each prefixed with its length
+HEADER = struct.Struct("!I")
+# Seconds between attempts to lead or follow, while the writer is being elected
+RETRY_INTERVAL = 0.1
+
+
+class HistoryWriterError(Exception):
+    """The writer failed to create the patient histories"""
+
+
+class HistoryWriterUnavailable(HistoryWriterError):
+    """No writer could be reached in time, the histories may or may not be created"""
+
+
+def _encode(message: dict) -> bytes:
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+async def _read(reader: asyncio.StreamReader) -> dict:
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return json.loads(await reader.readexactly(size))
+
+
+def _dump_histories(patient_histories: list[PatientHistory]) -> list[list]:
+    return [
+        [
+            x.id,
+            x.created_at.isoformat(),
+            x.spo2_reading,
+            x.systolic_reading,
+            x.diastolic_reading,
+            x.temp_reading,
+            x.heartbeat_reading,
+        ]
+        for x in patient_histories
+    ]
+
+
+def _load_histories(rows: list[list]) -> list[PatientHistory]:
+    # Rows were built by the writer from our own database, they are trusted
+    return [
+        PatientHistory.model_construct(
+            id=id,
+            created_at=datetime.fromisoformat(created_at),
+            spo2_reading=spo2_reading,
+            systolic_reading=systolic_reading,
+            diastolic_reading=diastolic_reading,
+            temp_reading=temp_reading,
+            heartbeat_reading=heartbeat_reading,
+        )
+        for (
+            id,
+            created_at,
+            spo2_reading,
+            systolic_reading,
+            diastolic_reading,
+            temp_reading,
+            heartbeat_reading,
+        ) in rows
+    ]
+
+
+class HistoryWriter:
+    """Single writer of patient histories for every worker on a node
+
+    SQLite takes one writer at a time, so workers writing histories concurrently end up
+    waiting on, and timing out on, the database lock. Instead, the workers elect one of
+    them with a lock file. The leader listens on a Unix socket and writes every history
+    of the node from a single thread, committing whatever queued up while the previous
+    transaction ran in one go. The other workers send it their writes and keep reading
+    from the database themselves, which WAL mode lets them do while the leader writes.
+
+    Unless recent readings are shared by the workers, the leader also forwards the
+    histories it created to every worker, which append them to their own. When the
+    leader goes away, the lock is released with its process and the remaining workers
+    elect a new one. Writes in flight at that moment fail with HistoryWriterUnavailable,
+    they may have been committed already.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = config.HISTORY_WRITER == "socket",
+        path: str = config.HISTORY_WRITER_SOCKET,
+        session_factory: Callable[..., Session] = SessionLocal,
+        max_batch_size: int = config.HISTORY_WRITER_MAX_BATCH_SIZE,
+        timeout: float = config.HISTORY_WRITER_TIMEOUT_SECONDS,
+    ) -> None:
+        self.enabled = enabled
+        # Fails right away where the leader's lock file can not be taken
+        self._fcntl = import_fcntl("HISTORY_WRITER=socket") if enabled else None
+        self.path = path or f"{engine.url.database}.writer.sock"
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.is_leader = False
+
+        self._task: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+        self._lock_file = None
+        # Leader, its own database connection, writes waiting for the next transaction
+        # and connected followers
+        self._db_connection: Connection | None = None
+        self._queue: asyncio.Queue | None = None
+        self._followers: set[asyncio.StreamWriter] = set()
+        # Follower, connection to the leader and writes waiting for its answer
+        self._connection: asyncio.StreamWriter | None = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+
+    def start(self) -> None:
+        """Lead or follow on the running event loop, no-op unless enabled"""
+        if not self.enabled or self._task:
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="history-writer")
+
+    async def stop(self) -> None:
+        """Stop leading or following, another worker takes over as leader"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def write(
+        self, patient_id: int, readings: list[dict]
+    ) -> list[PatientHistory]:
+        """Create histories of a patient through the writer, in the order of readings"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            raise HistoryWriterUnavailable("No history writer was elected in time")
+
+        future = asyncio.get_running_loop().create_future()
+        request_id = None
+        if self.is_leader:
+            self._queue.put_nowait((patient_id, readings, None, future))
+        else:
+            self._next_id += 1
+            request_id = self._next_id
+            self._pending[request_id] = future
+            self._connection.write(
+                _encode(
+                    {"id": request_id, "patient_id": patient_id, "readings": readings}
+                )
+            )
+        try:
+            patient_histories = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise HistoryWriterUnavailable("The history writer did not answer in time")
+        finally:
+            if request_id is not None:
+                self._pending.pop(request_id, None)
+
+        crud.record_ingested_patient_histories(
+            patient_id=patient_id, patient_histories=patient_histories
+        )
+        return patient_histories
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._acquire_lock():
+                    await self._lead()
+                else:
+                    await self._follow()
+            except asyncio.CancelledError:
+                raise
+            except OSError:
+                # The leader is not listening yet, or just went away
+                pass
+            except Exception:
+                logger.exception("History writer failed")
+            await asyncio.sleep(RETRY_INTERVAL)
+
+    def _acquire_lock(self) -> bool:
+        lock_file = open(f"{self.path}.lock", "w")
+        try:
+            self._fcntl.flock(lock_file, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_lock(self) -> None:
+        self._fcntl.flock(self._lock_file, self._fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def _connect(self) -> Connection:
+        # Held while leading, requests waiting on the writer may hold every pooled one
+        connection = engine.connect()
+        # Persistent in the database file, lets the followers read while the leader writes
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        connection.commit()
+        return connection
+
+    async def _lead(self) -> None:
+        server = None
+        writer_task = None
+        try:
+            self._db_connection = await asyncio.to_thread(self._connect)
+            # Left behind by a leader that died, the lock proves nobody listens on it
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._queue = asyncio.Queue()
+            server = await asyncio.start_unix_server(self._serve, path=self.path)
+            writer_task = asyncio.create_task(self._write_batches())
+            self.is_leader = True
+            # Readings written while nobody led may be missing from the rings
+            recent_readings_cache.clear()
+            self._ready.set()
+            logger.info("Leading as the history writer on %s", self.path)
+            await writer_task
+        finally:
+            self._ready.clear()
+            self.is_leader = False
+            if writer_task is not None:
+                writer_task.cancel()
+            if server is not None:
+                server.close()
+                for follower in self._followers:
+                    follower.close()
+                self._followers.clear()
+                os.unlink(self.path)
+            while self._queue is not None and not self._queue.empty():
+                *_, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(
+                        HistoryWriterUnavailable("The history writer stopped")
+                    )
+            if self._db_connection is not None:
+                self._db_connection.close()
+                self._db_connection = None
+            self._release_lock()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._followers.add(writer)
+        try:
+            while True:
+                message = await _read(reader)
+                future = asyncio.get_running_loop().create_future()
+                future.add_done_callback(partial(self._answer, writer, message["id"]))
+                self._queue.put_nowait(
+                    (message["patient_id"], message["readings"], writer, future)
+                )
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._followers.discard(writer)
+            writer.close()
+
+    def _answer(
+        self, writer: asyncio.StreamWriter, request_id: int, future: asyncio.Future
+    ) -> None:
+        if writer.is_closing():
+            return
+        if future.exception() is not None:
+            message = {"id": request_id, "error": repr(future.exception())}
+        else:
+            message = {"id": request_id, "histories": _dump_histories(future.result())}
+        writer.write(_encode(message))
+
+    async def _write_batches(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0][1])
+            while rows < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                rows += len(batch[-1][1])
+            try:
+                results = await asyncio.to_thread(
+                    self._write, [(x[0], x[1]) for x in batch]
+                )
+            except Exception:
+                # Write them one by one, so a bad write only fails itself
+                for item in batch:
+                    await self._write_one(item)
+                continue
+            history_writer_batch_rows.observe(rows)
+            for item, patient_histories in zip(batch, results):
+                self._done(item, patient_histories)
+
+    async def _write_one(self, item: tuple) -> None:
+        try:
+            (patient_histories,) = await asyncio.to_thread(
+                self._write, [(item[0], item[1])]
+            )
+        except Exception as error:
+            logger.exception("Writing patient histories failed")
+            if not item[3].done():
+                item[3].set_exception(HistoryWriterError(repr(error)))
+            return
+        history_writer_batch_rows.observe(len(item[1]))
+        self._done(item, patient_histories)
+
+    def _write(self, batches: list[tuple[int, list[dict]]]):
+        with self.session_factory(bind=self._db_connection) as db:
+            return crud.create_patient_histories_for_patients(batches=batches, db=db)
+
+    def _done(self, item: tuple, patient_histories: list[PatientHistory]) -> None:
+        patient_id, _, origin, future = item
+        if not future.done():
+            future.set_result(patient_histories)
+        if recent_readings_cache.shared:
+            # The worker that asked appends them for every worker
+            return
+        # The worker that asked records the histories itself, tell the others
+        message = None
+        for follower in self._followers:
+            if follower is not origin and not follower.is_closing():
+                message = message or _encode(
+                    {
+                        "patient_id": patient_id,
+                        "histories": _dump_histories(patient_histories),
+                    }
+                )
+                follower.write(message)
+        if origin is not None:
+            crud.append_recent_patient_histories(
+                patient_id=patient_id, patient_histories=patient_histories
+            )
+
+    async def _follow(self) -> None:
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        self._connection = writer
+        if not recent_readings_cache.shared:
+            # Readings written before we followed are missing from the rings
+            recent_readings_cache.clear()
+        self._ready.set()
+        logger.info("Following the history writer on %s", self.path)
+        try:
+            while True:
+                message = await _read(reader)
+                if "id" not in message:
+                    crud.append_recent_patient_histories(
+                        patient_id=message["patient_id"],
+                        patient_histories=_load_histories(message["histories"]),
+                    )
+                    continue
+                future = self._pending.pop(message["id"], None)
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(HistoryWriterError(message["error"]))
+                else:
+                    future.set_result(_load_histories(message["histories"]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning("Lost the history writer on %s, electing another", self.path)
+        finally:
+            self._ready.clear()
+            self._connection = None
+            writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(
+                        HistoryWriterUnavailable("Lost the history writer")
+                    )
+            self._pending.clear()
+
+
+history_writer = HistoryWriter()
+
+
+async def write_patient_histories(
+    readings: list[dict], db_patient: User, db: Session
+) -> list[PatientHistory]:
+    """Create patient histories through the history writer when enabled, directly otherwise"""
+    if not history_writer.enabled:
+        return crud.create_patient_histories(
+            readings=readings, db_patient=db_patient, db=db
+        )
+    try:
+        return await history_writer.write(patient_id=db_patient.id, readings=readings)
+    except HistoryWriterUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
@@ -0,0 +1,153 @@
+import math
+import struct
+import zlib
+
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+
+from config import config
+
+from sqlite.schemas import PatientHistoryCreateClass
+
+# Compact ingest format for monitors, one fixed size little-endian record per reading:
+#   float32 spo2_reading, uint16 systolic_reading, uint16 diastolic_reading,
+#   float32 temp_reading, float32 heartbeat_reading
+# A body is one or more records back to back, a single reading is a batch of one.
+# float32 values are rounded to FLOAT_DECIMALS once decoded, so a reading is stored as
+# it was measured (36.6, not 36.599998474121094), the same as when sent as JSON.
+BINARY_READINGS_MEDIA_TYPE = "application/vnd.health-mon.readings"
+READING_STRUCT = struct.Struct("<fHHff")
+READING_FIELDS = (
+    "spo2_reading",
+    "systolic_reading",
+    "diastolic_reading",
+    "temp_reading",
+    "heartbeat_reading",
+)
+_FLOAT_FIELDS = frozenset(("spo2_reading", "temp_reading", "heartbeat_reading"))
+# Beyond the precision of any monitor, well within that of float32 for vital signs
+FLOAT_DECIMALS = 2
+
+_readings_adapter = TypeAdapter(list[PatientHistoryCreateClass])
+
+
+def _payload_too_large(detail: str):
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail
+    )
+
+
+def decompress_gzip(body: bytes, max_size: int) -> bytes:
+    """Decompress a gzip body, refusing anything that inflates past max_size"""
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        decompressed = decompressor.decompress(body, max_size)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+    if decompressor.unconsumed_tail:
+        raise _payload_too_large("Decompressed body is too large")
+    if not decompressor.eof:
+        raise HTTPException(status_code=400, detail="Truncated gzip body")
+    return decompressed
+
+
+class GzipRequest(Request):
+    """Request whose body is transparently decompressed when sent with Content-Encoding: gzip"""
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            chunks = []
+            size = 0
+            async for chunk in self.stream():
+                size += len(chunk)
+                if size > config.INGEST_MAX_BODY_BYTES:
+                    raise _payload_too_large("Request body is too large")
+                chunks.append(chunk)
+            body = b"".join(chunks)
+            if self.headers.get("content-encoding", "").lower() == "gzip":
+                body = decompress_gzip(body, max_size=config.INGEST_MAX_BODY_BYTES)
+            self._body = body
+        return self._body
+
+
+class GzipRoute(APIRoute):
+    """Route class accepting gzip compressed request bodies"""
+
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            return await original_route_handler(
+                GzipRequest(request.scope, request.receive)
+            )
+
+        return route_handler
+
+
+def _check_batch_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="No readings were sent")
+    if count > config.INGEST_MAX_BATCH_SIZE:
+        raise _payload_too_large(
+            f"At most {config.INGEST_MAX_BATCH_SIZE} readings can be sent at once"
+        )
+
+
+def decode_binary_readings(body: bytes) -> list[dict]:
+    """Decode binary reading records, validating every column at once"""
+    if len(body) % READING_STRUCT.size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Body should be a multiple of {READING_STRUCT.size} bytes",
+        )
+    _check_batch_size(len(body) // READING_STRUCT.size)
+
+    rows = list(READING_STRUCT.iter_unpack(body))
+    # Rounded before validating, a value that rounds to 0 is not positive as stored
+    columns = [
+        (
+            [round(v, FLOAT_DECIMALS) for v in column]
+            if field in _FLOAT_FIELDS
+            else column
+        )
+        for field, column in zip(READING_FIELDS, zip(*rows))
+    ]
+    # One pass of min / isfinite per column instead of a validator call per value
+    for field, column in zip(READING_FIELDS, columns):
+        finite = field not in _FLOAT_FIELDS or all(map(math.isfinite, column))
+        if not finite or min(column) <= 0:
+            index = next(
+                i for i, v in enumerate(column) if not (math.isfinite(v) and v > 0)
+            )
+            raise HTTPException(
+                status_code=400,
+                detail=f"Reading {index}: {field} must be a positive value",
+            )
+    return [dict(zip(READING_FIELDS, row)) for row in zip(*columns)]
+
+
+def decode_json_readings(body: bytes) -> list[dict]:
+    """Decode a JSON array of readings with the same validation as a single reading"""
+    try:
+        readings = _readings_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+        )
+    _check_batch_size(len(readings))
+    return [reading.__dict__ for reading in readings]
+
+
+async def decode_readings(request: Request) -> list[dict]:
+    """Decode readings from a request, according to its Content-Type"""
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == BINARY_READINGS_MEDIA_TYPE:
+        return decode_binary_readings(await request.body())
+    if media_type in ("", "application/json"):
+        return decode_json_readings(await request.body())
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Content-Type should be application/json or {BINARY_READINGS_MEDIA_TYPE}",
+    )
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import defaultdict
+from contextlib import suppress
+from typing import Callable
+
+from sqlalchemy.engine import make_url
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def shared_cache_directory() -> str:
+    """Directory of the files shared by the workers of a node, next to the database"""
+    if config.SHARED_CACHE_DIRECTORY:
+        return config.SHARED_CACHE_DIRECTORY
+    return f"{make_url(config.SQLALCHEMY_DATABASE_URL).database}.cache"
+
+
+class InvalidationBus:
+    """Tell the other workers of the node to drop an entry from their own caches
+
+    Every worker binds a Unix datagram socket named after its pid in a shared directory.
+    Publishing sends a datagram to every other socket in there, and removes the sockets of
+    workers that are gone along the way. Delivery is best effort, a worker that is not
+    reading fast enough misses the invalidation, which is logged.
+    """
+
+    def __init__(
+        self, enabled: bool = config.SHARED_CACHE, directory: str | None = None
+    ) -> None:
+        self.enabled = enabled
+        self.directory = os.path.join(
+            directory or shared_cache_directory(), "invalidations"
+        )
+        self._handlers: dict[str, list[Callable[[int], None]]] = defaultdict(list)
+        self._socket: socket.socket | None = None
+        self._path: str | None = None
+        self._sender: socket.socket | None = None
+
+    def subscribe(self, cache: str, handler: Callable[[int], None]) -> None:
+        """Call handler with the key of every invalidation of cache from other workers"""
+        self._handlers[cache].append(handler)
+
+    def start(self) -> None:
+        """Receive invalidations on the running event loop, no-op unless enabled"""
+        if not self.enabled or self._socket is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.sock")
+        # Left behind by a worker that died with the same pid
+        with suppress(FileNotFoundError):
+            os.unlink(path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(path)
+        self._path = path
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._receive)
+
+    def stop(self) -> None:
+        if self._socket is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        with suppress(FileNotFoundError):
+            os.unlink(self._path)
+        self._path = None
+
+    def publish(self, cache: str, key: int) -> None:
+        """Send an invalidation of key in cache to every other worker, no-op unless enabled"""
+        if not self.enabled:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)
+        message = json.dumps([cache, key]).encode("utf-8")
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if path == self._path:
+                continue
+            try:
+                self._sender.sendto(message, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Nobody is bound to it anymore
+                with suppress(FileNotFoundError):
+                    os.unlink(path)
+            except BlockingIOError:
+                logger.warning(
+                    "Dropped invalidation of %s %s for %s, its queue is full",
+                    cache,
+                    key,
+                    name,
+                )
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                message = self._socket.recv(4096)
+            except BlockingIOError:
+                return
+            cache, key = json.loads(message)
+            for handler in self._handlers[cache]:
+                try:
+                    handler(key)
+                except Exception:
+                    logger.exception("Invalidating %s %s failed", cache, key)
+
+
+invalidation_bus = InvalidationBus()
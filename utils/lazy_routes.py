@@ -0,0 +1,104 @@
+import importlib
+from threading import Lock
+
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRouter
+from fastapi_pagination import add_pagination
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+
+class LazyRouter(BaseRoute):
+    """Stand in for the APIRouter of a module, imported on the first request under prefix
+
+    The module and its routes are only built when a request needs them, so admin routes
+    stay off a worker's boot. Once loaded, matching is delegated to the router's routes,
+    so they behave exactly as if they had been included up front.
+    """
+
+    def __init__(self, prefix: str, module: str) -> None:
+        self.prefix = prefix
+        self.module = module
+        self._router: APIRouter | None = None
+        self._lock = Lock()
+
+    @property
+    def router(self) -> APIRouter:
+        if self._router is None:
+            with self._lock:
+                if self._router is None:
+                    router = importlib.import_module(self.module).router
+                    # Routes added after add_pagination(app) ran need it on their own
+                    add_pagination(router)
+                    self._router = router
+        return self._router
+
+    @property
+    def routes(self) -> list[BaseRoute]:
+        return self.router.routes
+
+    def matches(self, scope):
+        path = scope.get("path", "")
+        if self._router is None and not (
+            path == self.prefix or path.startswith(self.prefix + "/")
+        ):
+            return Match.NONE, {}
+        partial = None
+        for route in self.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return match, {**child_scope, "route": route}
+            if match == Match.PARTIAL and partial is None:
+                partial = {**child_scope, "route": route}
+        if partial is not None:
+            return Match.PARTIAL, partial
+        return Match.NONE, {}
+
+    async def handle(self, scope, receive, send):
+        await scope["route"].handle(scope, receive, send)
+
+    def url_path_for(self, name: str, /, **path_params):
+        for route in self.routes:
+            try:
+                return route.url_path_for(name, **path_params)
+            except NoMatchFound:
+                pass
+        raise NoMatchFound(name, path_params)
+
+
+def include_lazy_router(app: FastAPI, prefix: str, module: str) -> None:
+    app.router.routes.append(LazyRouter(prefix=prefix, module=module))
+
+
+def expanded_routes(routes: list[BaseRoute]) -> list[BaseRoute]:
+    """Routes with every lazy router replaced by its routes, loading them"""
+    return [
+        x
+        for route in routes
+        for x in (route.routes if isinstance(route, LazyRouter) else [route])
+    ]
+
+
+def use_openapi_with_lazy_routes(app: FastAPI) -> None:
+    """Generate the OpenAPI schema of app with the routes of its lazy routers as well"""
+
+    def openapi():
+        if not app.openapi_schema:
+            app.openapi_schema = get_openapi(
+                title=app.title,
+                version=app.version,
+                openapi_version=app.openapi_version,
+                summary=app.summary,
+                description=app.description,
+                terms_of_service=app.terms_of_service,
+                contact=app.contact,
+                license_info=app.license_info,
+                routes=expanded_routes(app.routes),
+                webhooks=app.webhooks.routes,
+                tags=app.openapi_tags,
+                servers=app.servers,
+                separate_input_output_schemas=app.separate_input_output_schemas,
+            )
+        return app.openapi_schema
+
+    app.openapi = openapi
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from weakref import WeakKeyDictionary
+
+from config import config
+
+from utils.metrics import (
+    UNMATCHED_ROUTE,
+    event_loop_lag_seconds,
+    event_loop_blocks_total,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """Measure how late the event loop runs a task that sleeps on a fixed interval
+
+    The lag is exported as the event_loop_lag_seconds histogram. With capture on, a
+    watchdog thread also takes the stack of the loop thread whenever the loop has not
+    come back for longer than blocking_threshold, and attributes it to the route of the
+    request the loop was running at the time.
+    """
+
+    def __init__(
+        self,
+        interval: float = config.EVENT_LOOP_MONITOR_INTERVAL_SECONDS,
+        capture_blocking: bool = config.EVENT_LOOP_BLOCKING_CAPTURE,
+        blocking_threshold: float = config.EVENT_LOOP_BLOCKING_THRESHOLD_MS / 1000,
+        max_blocks: int = 100,
+    ) -> None:
+        self.interval = interval
+        self.capture_blocking = capture_blocking
+        self.blocking_threshold = blocking_threshold
+
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # Last time the loop ran the monitor task, read by the watchdog thread
+        self._heartbeat = time.monotonic()
+        # Request scope of every task handling a request, filled by the middleware
+        self._task_scopes: WeakKeyDictionary = WeakKeyDictionary()
+        self._blocks: deque[dict] = deque(maxlen=max_blocks)
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start measuring on the running event loop"""
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        if self.capture_blocking:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="event-loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            event_loop_lag_seconds.observe(max(now - expected, 0.0))
+
+    def _watch(self) -> None:
+        captured_for = None
+        while not self._stopped.wait(self.blocking_threshold / 4):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for > self.blocking_threshold and captured_for != heartbeat:
+                # Once per stall, the loop has not run the monitor since heartbeat
+                captured_for = heartbeat
+                self._capture(blocked_for)
+
+    def _capture(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.format_stack(frame)
+        # Only reads the loop's current task, the loop itself is not touched
+        task = asyncio.current_task(self._loop)
+        scope = self._task_scopes.get(task) if task is not None else None
+        if scope is None:
+            route = None
+        else:
+            route = getattr(scope.get("route"), "path_format", UNMATCHED_ROUTE)
+        event_loop_blocks_total.inc(route=route or "<no request>")
+        logger.warning(
+            "Event loop blocked for over %.0f ms on %s:\n%s",
+            blocked_for * 1000,
+            route or "<no request>",
+            "".join(stack),
+        )
+        with self._lock:
+            self._blocks.append(
+                {
+                    "detected_at": datetime.utcnow(),
+                    "blocked_ms": blocked_for * 1000,
+                    "route": route,
+                    "stack": stack,
+                }
+            )
+
+    def blocks(self) -> list[dict]:
+        """Captured blocking stacks, the most recent first"""
+        with self._lock:
+            return list(reversed(self._blocks))
+
+    def track(self, scope: dict) -> None:
+        """Attribute the current task to a request, so stalls can name its route"""
+        if self.capture_blocking:
+            self._task_scopes[asyncio.current_task()] = scope
+
+
+class EventLoopMonitorMiddleware:
+    """ASGI middleware telling the event loop monitor which request each task handles"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            event_loop_monitor.track(scope)
+        await self.app(scope, receive, send)
+
+
+event_loop_monitor = EventLoopMonitor()
@@ -0,0 +1,134 @@
+import gc
+import os
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from sqlite.database import Base, engine
+
+# Snapshots hold every traced allocation, a handful is plenty to diff
+MAX_SNAPSHOTS = 10
+
+
+class SnapshotStore:
+    """tracemalloc snapshots by id, the oldest dropped past MAX_SNAPSHOTS"""
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS) -> None:
+        self.max_snapshots = max_snapshots
+        self._snapshots: OrderedDict[int, dict] = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def take(self) -> dict:
+        """Take a snapshot of the traced allocations, tracemalloc should be tracing"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            # Allocations of tracemalloc itself are noise
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        with self._lock:
+            entry = {
+                "id": self._next_id,
+                "created_at": datetime.utcnow(),
+                "traced_bytes": sum(x.size for x in snapshot.traces),
+                "frames": snapshot.traceback_limit,
+                "snapshot": snapshot,
+            }
+            self._next_id += 1
+            self._snapshots[entry["id"]] = entry
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return entry
+
+    def get(self, snapshot_id: int) -> dict | None:
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return list(self._snapshots.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshot_store = SnapshotStore()
+
+
+def _stat(stat, diff: bool) -> dict:
+    frame = stat.traceback[0]
+    result = {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "size": stat.size,
+        "count": stat.count,
+    }
+    if diff:
+        result["size_diff"] = stat.size_diff
+        result["count_diff"] = stat.count_diff
+    return result
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, group_by: str, limit: int):
+    """Largest allocations of a snapshot, grouped by file and line or by file"""
+    stats = snapshot.statistics(group_by)
+    return [_stat(x, diff=False) for x in stats[:limit]]
+
+
+def diff_allocations(
+    old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, group_by: str, limit: int
+):
+    """Allocations that grew the most from old to new, grouped like top_allocations"""
+    stats = new.compare_to(old, group_by)
+    return [_stat(x, diff=True) for x in stats[:limit]]
+
+
+def _rss_bytes() -> int | None:
+    """Resident set size of the process, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def live_objects() -> dict:
+    """Live ORM instances by model, and live sessions with their identity maps
+
+    Walks every object tracked by the garbage collector, so it is slow on a big heap.
+    """
+    models = {x.class_: x.class_.__name__ for x in Base.registry.mappers}
+    instances = Counter({name: 0 for name in models.values()})
+    sessions = 0
+    identity_map_size = 0
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in models:
+            instances[models[cls]] += 1
+        elif isinstance(obj, Session):
+            sessions += 1
+            identity_map_size += len(obj.identity_map)
+    return {
+        "instances_by_model": dict(instances),
+        "sessions": sessions,
+        "session_identity_map_size": identity_map_size,
+    }
+
+
+def memory_status() -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    pool = engine.pool
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": _rss_bytes(),
+        "tracing": tracemalloc.is_tracing(),
+        "traceback_limit": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        **live_objects(),
+        "pool_checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "snapshots": snapshot_store.list(),
+    }
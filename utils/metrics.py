@@ -0,0 +1,246 @@
+import os
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Iterable
+
+from utils.file_locks import worker_slot
+from utils.invalidation import shared_cache_directory
+
+# Prometheus' own defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    labels = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return f"{{{labels}}}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A metric family, one value per combination of label values"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[x]) for x in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self, const_labels: Iterable[tuple[str, str]] = ()) -> str:
+        const_labels = list(const_labels)
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            for suffix, labels, value in self._samples():
+                labels = const_labels + list(labels)
+                lines.append(
+                    f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield "", zip(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Counted in the first bucket it fits, made cumulative when rendered
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        for key, (counts, total) in self._values.items():
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for le, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", labels + [("le", _format_value(le))], cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format
+
+        Metrics are kept per process, every sample is labelled with the worker it comes
+        from so scrapes answered by different workers are not mistaken for resets. Workers
+        are numbered by slot rather than pid, a restarted worker continues the same series.
+        """
+        directory = os.path.join(shared_cache_directory(), "workers")
+        const_labels = [("worker", str(worker_slot(directory)))]
+        return "\n".join(x.render(const_labels) for x in self._metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests handled, by route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency, by route template.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being handled right now.")
+)
+db_session_checkout_seconds = registry.register(
+    Histogram(
+        "db_session_checkout_seconds",
+        "Time taken to get a pooled database connection for a request session.",
+        buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
+    )
+)
+db_queries_per_request = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed per HTTP request, by route template.",
+        ("method", "route"),
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+)
+event_loop_lag_seconds = registry.register(
+    Histogram(
+        "event_loop_lag_seconds",
+        "How late the event loop woke up a task sleeping on a fixed interval.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    )
+)
+event_loop_blocks_total = registry.register(
+    Counter(
+        "event_loop_blocks_total",
+        "Event loop stalls over the blocking threshold, by the route that held the loop.",
+        ("route",),
+    )
+)
+readings_ingested_total = registry.register(
+    Counter("readings_ingested_total", "Patient history readings ingested.")
+)
+history_writer_batch_rows = registry.register(
+    Histogram(
+        "history_writer_batch_rows",
+        "Patient history rows committed per transaction by the single history writer.",
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    )
+)
+logins_total = registry.register(
+    Counter("logins_total", "Access token requests, by result.", ("result",))
+)
+cache_requests_total = registry.register(
+    Counter(
+        "cache_requests_total",
+        "In-memory cache lookups, by cache and result.",
+        ("cache", "result"),
+    )
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latencies and in-flight requests
+
+    Requests are labelled with the template of the route they matched, such as
+    /patients/{user_id}, so the number of label values stays bounded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = perf_counter() - start
+            http_requests_in_flight.dec()
+            # Set by the router on the same scope once a route matched
+            route = getattr(scope.get("route"), "path_format", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests_total.inc(method=method, route=route, status=status_code)
+            http_request_duration_seconds.observe(duration, method=method, route=route)
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Protocol
+
+from sqlalchemy.orm import Session
+
+from config import config
+
+from sqlite.database import SessionLocal
+import sqlite.crud.patient_actions as crud
+from sqlite.crud.caretakers.non_detailed import (
+    get_all_caretaker_ids_for_list_of_patients,
+)
+
+from sqlite.schemas import PatientActionNotification
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationTransport(Protocol):
+    async def send(self, notifications: list[PatientActionNotification]) -> None:
+        """Deliver the notifications of a batch of actions, raise on failure"""
+        ...
+
+
+class DatabaseTransport:
+    """Store delivered notifications in the inbox of every caretaker, in the database
+
+    Caretakers read them from GET /current/notifications. Being committed before the actions
+    are acknowledged, they survive restarts and are seen by every worker. A batch is stored
+    in a single transaction. Notifications of a retried action that were already stored
+    are skipped.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        self.session_factory = session_factory
+
+    async def send(self, notifications: list[PatientActionNotification]) -> None:
+        if notifications:
+            await asyncio.to_thread(self._store, notifications)
+
+    def _store(self, notifications: list[PatientActionNotification]) -> None:
+        with self.session_factory() as db:
+            crud.create_caretaker_notifications(notifications=notifications, db=db)
+
+
+class InProcessTransport:
+    """Keep delivered notifications in memory, one bounded inbox per caretaker
+
+    Nothing reads the inboxes but the caller, use it in tests and benchmarks only.
+    """
+
+    def __init__(self, inbox_size: int = 100) -> None:
+        self.inboxes: dict[int, deque[PatientActionNotification]] = defaultdict(
+            lambda: deque(maxlen=inbox_size)
+        )
+        self.sent_count = 0
+
+    async def send(self, notifications: list[PatientActionNotification]) -> None:
+        for notification in notifications:
+            self.inboxes[notification.caretaker_id].append(notification)
+        self.sent_count += len(notifications)
+
+
+class OutboxDispatcher:
+    """Async workers that fan patient actions out of the outbox to every associated caretaker
+
+    Each worker claims a batch of due actions, loads the caretakers of the whole batch in
+    one query, sends the notifications of the batch at once and acknowledges it. A failed
+    batch is retried with exponential backoff until max_attempts, then marked as failed, as
+    are actions whose worker died on their last attempt. Delivery is at least once, a
+    retried action is sent to all of its caretakers again.
+    """
+
+    def __init__(
+        self,
+        transport: NotificationTransport,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = config.OUTBOX_WORKERS,
+        batch_size: int = config.OUTBOX_BATCH_SIZE,
+        max_attempts: int = config.OUTBOX_MAX_ATTEMPTS,
+        poll_interval: float = config.OUTBOX_POLL_INTERVAL_SECONDS,
+        backoff: float = 1.0,
+        lease: float = 60.0,
+    ) -> None:
+        self.transport = transport
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.lease = lease
+
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._started_at: float | None = None
+        self.delivered_count = 0
+        self.notified_count = 0
+        self.retried_count = 0
+        self.failed_count = 0
+
+    def start(self) -> None:
+        """Start the delivery workers on the running event loop"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._started_at = time.perf_counter()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"outbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the delivery workers, in flight rows are picked up again after their lease"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake the workers up, call after an action was committed to the outbox"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Delivery counters and throughput since the workers were started"""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "delivered": self.delivered_count,
+            "notifications": self.notified_count,
+            "retried": self.retried_count,
+            "failed": self.failed_count,
+            "elapsed_seconds": elapsed,
+            "delivered_per_second": self.delivered_count / elapsed if elapsed else 0.0,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            # Clear before claiming, so a notify during the batch is not lost
+            self._wakeup.clear()
+            try:
+                claimed = await self.deliver_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox delivery batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                # Outbox is drained, sleep until notified or the next poll
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def deliver_batch(self) -> int:
+        """Claim and deliver a single batch of due actions, return how many were claimed"""
+        now = datetime.utcnow()
+        claimed, caretaker_ids = await asyncio.to_thread(self._claim, now)
+        if not claimed:
+            return 0
+
+        notifications = [
+            PatientActionNotification(
+                outbox_id=action.id,
+                patient_id=action.patient_id,
+                caretaker_id=caretaker_id,
+                action=action.action,
+                created_at=action.created_at,
+            )
+            for action in claimed
+            for caretaker_id in caretaker_ids[action.patient_id]
+        ]
+        try:
+            # One call, and one write transaction for the database, per batch
+            await self.transport.send(notifications)
+        except Exception as e:
+            delivered, retries = [], [(action, e) for action in claimed]
+        else:
+            delivered, retries = [action.id for action in claimed], []
+            self.notified_count += len(notifications)
+        failed = await asyncio.to_thread(self._acknowledge, delivered, retries)
+        self.delivered_count += len(delivered)
+        self.retried_count += len(retries) - failed
+        self.failed_count += failed
+
+        return len(claimed)
+
+    def _claim(self, now: datetime):
+        with self.session_factory() as db:
+            abandoned = crud.fail_abandoned_patient_actions(
+                max_attempts=self.max_attempts, now=now, db=db
+            )
+            if abandoned:
+                self.failed_count += abandoned
+                logger.error(
+                    "Giving up on %s patient actions whose lease ran out after %s attempts",
+                    abandoned,
+                    self.max_attempts,
+                )
+            claimed = crud.claim_due_patient_actions(
+                limit=self.batch_size,
+                now=now,
+                lease_until=now + timedelta(seconds=self.lease),
+                max_attempts=self.max_attempts,
+                db=db,
+            )
+            if not claimed:
+                return claimed, {}
+            caretaker_ids = get_all_caretaker_ids_for_list_of_patients(
+                patient_ids=list({action.patient_id for action in claimed}), db=db
+            )
+        return claimed, caretaker_ids
+
+    def _acknowledge(self, delivered: list[int], retries: list[tuple]) -> int:
+        now = datetime.utcnow()
+        failed = 0
+        with self.session_factory() as db:
+            if delivered:
+                crud.mark_patient_actions_as_delivered(ids=delivered, now=now, db=db)
+            for action, error in retries:
+                if action.attempts >= self.max_attempts:
+                    next_attempt_at = None
+                    failed += 1
+                    logger.error(
+                        "Giving up on patient action %s after %s attempts: %r",
+                        action.id,
+                        action.attempts,
+                        error,
+                    )
+                else:
+                    next_attempt_at = now + timedelta(
+                        seconds=self.backoff * 2 ** (action.attempts - 1)
+                    )
+                crud.mark_patient_action_for_retry(
+                    id=action.id,
+                    next_attempt_at=next_attempt_at,
+                    error=repr(error),
+                    db=db,
+                )
+        return failed
+
+
+outbox_dispatcher = OutboxDispatcher(transport=DatabaseTransport())
@@ -1,8 +1,17 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
 from passlib.context import CryptContext
 
+from config import config
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify if the provided plain and hashed password strings match"""
@@ -12,3 +21,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> bool:
     """Generate a hash for the provided password string"""
     return pwd_context.hash(password)
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=config.PASSWORD_HASH_WORKERS,
+                # Forking a worker with threads running can deadlock the child
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    """Generate hashes for many password strings at once, on a pool of processes"""
+    if len(passwords) <= 1 or config.PASSWORD_HASH_WORKERS == 1:
+        return [get_password_hash(password) for password in passwords]
+    pool = _get_hash_pool()
+    chunksize = max(1, len(passwords) // (config.PASSWORD_HASH_WORKERS * 4))
+    return list(pool.map(get_password_hash, passwords, chunksize=chunksize))
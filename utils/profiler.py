@@ -0,0 +1,224 @@
+import asyncio
+import cProfile
+import marshal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from fastapi.responses import JSONResponse
+
+from config import config
+
+from sqlite.database import SessionLocal
+from sqlite.enums import CombinedRoleEnum
+
+from utils.auth import get_user_by_access_token
+from utils.metrics import UNMATCHED_ROUTE
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAMETER = "profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+CPROFILE, SAMPLE = "cprofile", "sample"
+# Media type and file extension of the stored profile of each mode
+FORMATS = {
+    CPROFILE: ("application/octet-stream", "pstats"),
+    SAMPLE: ("text/plain; charset=utf-8", "collapsed"),
+}
+
+
+class ProfileStore:
+    """The most recent profiles, oldest dropped first"""
+
+    def __init__(self, max_profiles: int) -> None:
+        self.max_profiles = max_profiles
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict) -> None:
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> dict | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict]:
+        """Stored profiles, the most recent first"""
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+
+profile_store = ProfileStore(max_profiles=config.PROFILER_MAX_PROFILES)
+
+
+def _pstats(profile: cProfile.Profile) -> bytes:
+    """The profile in the format pstats.Stats loads and Profile.dump_stats writes"""
+    profile.create_stats()
+    return marshal.dumps(profile.stats)
+
+
+class StackSampler:
+    """Sample the stack of a thread on an interval, in collapsed stack format
+
+    Every line is the frames of a stack from the outermost, separated by ;, then the
+    number of samples it was seen in, the input flamegraph.pl and speedscope expect.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> bytes:
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.samples.items()
+        ).encode("utf-8")
+
+
+def _requested_mode(scope) -> str | None:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER.lower().encode():
+            return value.decode("latin-1").strip().lower()
+    values = parse_qs(scope["query_string"].decode("latin-1")).get(
+        PROFILE_QUERY_PARAMETER
+    )
+    return values[0].strip().lower() if values else None
+
+
+def _is_admin(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            with SessionLocal() as db:
+                user = get_user_by_access_token(token=token, db=db)
+            return user is not None and user.user_role == CombinedRoleEnum.ADMIN
+    return False
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling single requests on demand, for admins only
+
+    A request with X-Profile: cprofile|sample, or ?profile=cprofile|sample, from an admin
+    runs under cProfile or a stack sampler. The profile is stored, its id is sent back in
+    X-Profile-Id and it can be downloaded from /profiles/{profile_id}.
+
+    Both profile the event loop thread, which is where async def routes run their sync
+    database work. Anything else the loop runs meanwhile shows up too, so profile on a
+    quiet worker. One request is profiled at a time.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = _requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if mode not in FORMATS:
+            response = JSONResponse(
+                {"detail": f"Profile should be one of {', '.join(FORMATS)}"}, 400
+            )
+            await response(scope, receive, send)
+            return
+        if not await asyncio.to_thread(_is_admin, scope):
+            response = JSONResponse(
+                {"detail": "Only admins can profile requests"}, status_code=403
+            )
+            await response(scope, receive, send)
+            return
+        if self._busy:
+            response = JSONResponse(
+                {"detail": "Another request is being profiled"}, status_code=409
+            )
+            await response(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER.lower().encode(), profile_id.encode()),
+                ]
+            await send(message)
+
+        self._busy = True
+        start = time.perf_counter()
+        if mode == CPROFILE:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(
+                thread_id=threading.get_ident(),
+                interval=config.PROFILER_SAMPLE_INTERVAL_MS / 1000,
+            )
+            profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            if mode == CPROFILE:
+                profiler.disable()
+                data = _pstats(profiler)
+            else:
+                profiler.stop()
+                data = profiler.collapsed()
+            self._busy = False
+            profile_store.add(
+                {
+                    "id": profile_id,
+                    "created_at": datetime.utcnow(),
+                    "mode": mode,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(
+                        scope.get("route"), "path_format", UNMATCHED_ROUTE
+                    ),
+                    "status_code": status_code,
+                    "duration_ms": (time.perf_counter() - start) * 1000,
+                    "size": len(data),
+                    "data": data,
+                }
+            )
@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from config import config
+
+from utils.metrics import UNMATCHED_ROUTE, db_queries_per_request
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+
+class QueryStats:
+    """Number of SQL statements executed and the time spent in them"""
+
+    def __init__(
+        self, keep_statements: bool = False, scope: dict | None = None
+    ) -> None:
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: list[str] | None = [] if keep_statements else None
+        self._lock = Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if self.statements is not None:
+                self.statements.append(statement)
+
+
+# Stats of the request being handled, shared with the threadpool through the context
+_request_stats: ContextVar[QueryStats | None] = ContextVar(
+    "request_query_stats", default=None
+)
+# Explicit captures, they see statements from every thread
+_captures: list[QueryStats] = []
+_captures_lock = Lock()
+
+
+def current_route() -> str | None:
+    """Route template of the request being handled, None outside of a request"""
+    stats = _request_stats.get()
+    if stats is None or stats.scope is None:
+        return None
+    # Set by the router on the same scope once a route matched
+    return getattr(stats.scope.get("route"), "path_format", UNMATCHED_ROUTE)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = perf_counter() - conn.info["query_start"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(statement, seconds)
+
+
+@contextmanager
+def capture_queries():
+    """Capture every statement executed while the block runs, whichever thread runs it"""
+    stats = QueryStats(keep_statements=True)
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """Fail with the executed statements when the block runs more than max_queries
+
+    with assert_max_queries(5):
+        client.get("/patients", headers=admin)
+    """
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(f"  {x}" for x in stats.statements)
+        raise AssertionError(
+            f"Expected at most {max_queries} queries, {stats.count} were executed:\n"
+            f"{statements}"
+        )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware counting the SQL statements each request executes
+
+    Counts are recorded as a histogram per route. With DEBUG on, they are also sent back
+    in X-DB-Query-Count / X-DB-Query-Time-Ms and Server-Timing response headers.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope=scope)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and config.DEBUG:
+                milliseconds = f"{stats.seconds * 1000:.2f}"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(), milliseconds.encode()),
+                    (
+                        b"server-timing",
+                        f'db;dur={milliseconds};desc="{stats.count} queries"'.encode(),
+                    ),
+                ]
+            await send(message)
+
+        token = _request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            route = current_route()
+            _request_stats.reset(token)
+            db_queries_per_request.observe(
+                stats.count, method=scope["method"], route=route
+            )
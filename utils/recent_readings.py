@@ -0,0 +1,146 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable, Sequence
+
+from config import config
+
+from utils.invalidation import shared_cache_directory
+from utils.metrics import cache_requests_total
+from utils.shared_readings import SharedRecentReadingsCache
+
+
+class PatientReadingsRing:
+    """Fixed size ring buffer of the most recent readings of a single patient
+
+    Readings are kept in a preallocated list that is overwritten in place, along with a
+    newest first snapshot that is rebuilt on write, so reads never copy or reorder.
+    """
+
+    __slots__ = ("_items", "_next", "_size", "_snapshot")
+
+    def __init__(self, capacity: int) -> None:
+        self._items: list = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._snapshot: tuple = ()
+
+    def append(self, reading) -> None:
+        capacity = len(self._items)
+        self._items[self._next] = reading
+        self._next = (self._next + 1) % capacity
+        self._size = min(self._size + 1, capacity)
+        # Newest first, walking backwards from the last write
+        self._snapshot = tuple(
+            self._items[(self._next - 1 - i) % capacity] for i in range(self._size)
+        )
+
+    def latest(self) -> tuple:
+        return self._snapshot
+
+
+class RecentReadingsCache:
+    """Recent readings of every active patient, kept in memory
+
+    A patient's ring is warmed lazily from the database on first read and kept current by
+    appending every reading ingested afterwards. At most max_patients rings are kept, the
+    patient that was read least recently is evicted first.
+    """
+
+    # Readings are kept per worker
+    shared = False
+
+    def __init__(
+        self,
+        capacity: int = config.RECENT_READINGS_PER_PATIENT,
+        max_patients: int = config.RECENT_READINGS_MAX_PATIENTS,
+    ) -> None:
+        self.capacity = capacity
+        self.max_patients = max_patients
+        self._rings: OrderedDict[int, PatientReadingsRing] = OrderedDict()
+        # Patients being warmed, flagged if a reading is ingested in the meantime
+        self._warming: dict[int, bool] = {}
+        self._lock = Lock()
+
+    def get(
+        self, patient_id: int, load_readings: Callable[[int], Sequence]
+    ) -> Sequence:
+        """Get recent readings of a patient, newest first
+
+        load_readings(limit) is only called on a miss and must return the latest readings
+        from the database, newest first.
+        """
+        with self._lock:
+            ring = self._rings.get(patient_id)
+            if ring is not None:
+                self._rings.move_to_end(patient_id)
+                cache_requests_total.inc(cache="recent_readings", result="hit")
+                return ring.latest()
+            cache_requests_total.inc(cache="recent_readings", result="miss")
+            # Only one caller warms a patient, others read through
+            warming = patient_id not in self._warming
+            if warming:
+                self._warming[patient_id] = False
+
+        try:
+            readings = load_readings(self.capacity)
+        except Exception:
+            if warming:
+                # Let the next read warm the patient again
+                with self._lock:
+                    self._warming.pop(patient_id, None)
+            raise
+        if not warming:
+            return readings
+
+        ring = PatientReadingsRing(capacity=self.capacity)
+        for reading in reversed(readings):
+            ring.append(reading)
+        with self._lock:
+            # A reading was ingested while loading, it may be missing from the result
+            if self._warming.pop(patient_id):
+                return readings
+            self._rings[patient_id] = ring
+            while len(self._rings) > self.max_patients:
+                self._rings.popitem(last=False)
+        return ring.latest()
+
+    def is_tracked(self, patient_id: int) -> bool:
+        """Whether readings of this patient are kept, or are being warmed"""
+        return patient_id in self._rings or patient_id in self._warming
+
+    def append(self, patient_id: int, reading) -> None:
+        """Append a newly ingested reading of a patient, no-op for untracked patients"""
+        with self._lock:
+            ring = self._rings.get(patient_id)
+            if ring is not None:
+                ring.append(reading)
+            elif patient_id in self._warming:
+                self._warming[patient_id] = True
+
+    def invalidate(self, patient_id: int) -> None:
+        """Drop recent readings of a patient, they are warmed again on next read"""
+        with self._lock:
+            self._rings.pop(patient_id, None)
+            if patient_id in self._warming:
+                self._warming[patient_id] = True
+
+    def clear(self) -> None:
+        """Drop recent readings of every patient, they are warmed again on next read"""
+        with self._lock:
+            self._rings.clear()
+            for patient_id in self._warming:
+                self._warming[patient_id] = True
+
+
+def _create_recent_readings_cache():
+    if config.SHARED_CACHE:
+        return SharedRecentReadingsCache(
+            path=os.path.join(shared_cache_directory(), "recent_readings"),
+            capacity=config.RECENT_READINGS_PER_PATIENT,
+            max_patients=config.RECENT_READINGS_MAX_PATIENTS,
+        )
+    return RecentReadingsCache()
+
+
+recent_readings_cache = _create_recent_readings_cache()
@@ -1,5 +1,27 @@
+import os
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
 from sqlite.schemas import CommonResponseClass
 
+from utils.tracing import start_span
+
+
+# Admin views of in-memory state only show the worker process that answered the request
+WORKER_HEADER = "X-Worker-Pid"
+
+
+def worker_headers() -> dict[str, str]:
+    """Headers naming the worker process that answered, for responses built by hand"""
+    return {WORKER_HEADER: str(os.getpid())}
+
+
+async def label_worker(response: Response):
+    """Dependency naming the worker process that answered in a response header"""
+    response.headers.update(worker_headers())
+
 
 def common_responses():
     return {
@@ -8,3 +30,16 @@ def common_responses():
         403: {"model": CommonResponseClass},
         404: {"model": CommonResponseClass},
     }
+
+
+class PydanticJSONResponse(JSONResponse):
+    """JSON response rendered straight from a pydantic model by pydantic-core
+
+    Returning it skips FastAPI's response_model validation and jsonable_encoder pass.
+    Datetimes still go through the json_encoders of the models, so the output is the same.
+    Keep response_model on the route, it still documents the schema.
+    """
+
+    def render(self, content: BaseModel) -> bytes:
+        with start_span("serialize"):
+            return content.model_dump_json().encode("utf-8")
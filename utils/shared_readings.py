@@ -0,0 +1,345 @@
+import mmap
+import os
+import random
+import struct
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Lock, RLock
+from typing import Callable, Sequence
+
+from sqlite.schemas import PatientHistory
+
+from utils.file_locks import import_fcntl
+from utils.metrics import cache_requests_total
+
+# File header, padded to DATA_OFFSET: magic, slots, readings per slot
+FILE_HEADER = struct.Struct("<4sII")
+MAGIC = b"HMR1"
+DATA_OFFSET = 64
+# Slot header: a sequence number that is odd while the slot is being written, then
+# patient_id, state, count, next, padding, warm token, warm started at, warmed at
+SEQUENCE = struct.Struct("<Q")
+FIELDS = struct.Struct("<qIIIIQdd")
+SLOT_HEADER_SIZE = SEQUENCE.size + FIELDS.size
+# id, created_at in microseconds since the epoch, spo2, systolic, diastolic, temp, heartbeat
+READING = struct.Struct("<qqdiidd")
+EPOCH = datetime(1970, 1, 1)
+
+EMPTY, WARMING, READY, STALE = range(4)
+# Slots a patient can be kept in, starting from the one its id hashes to
+WINDOW = 8
+# Seconds after which a warm is considered abandoned, by a worker that died
+WARM_TIMEOUT = 30.0
+# Attempts at a consistent read of a slot that is being written, before giving up
+READ_ATTEMPTS = 100
+
+
+def _encode_created_at(created_at: datetime) -> int:
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def _decode_reading(buffer: bytes, offset: int) -> PatientHistory:
+    (
+        id,
+        created_at,
+        spo2_reading,
+        systolic_reading,
+        diastolic_reading,
+        temp_reading,
+        heartbeat_reading,
+    ) = READING.unpack_from(buffer, offset)
+    # Written from rows of our own database, they are trusted
+    return PatientHistory.model_construct(
+        spo2_reading=spo2_reading,
+        systolic_reading=systolic_reading,
+        diastolic_reading=diastolic_reading,
+        temp_reading=temp_reading,
+        heartbeat_reading=heartbeat_reading,
+        id=id,
+        created_at=EPOCH + timedelta(microseconds=created_at),
+    )
+
+
+class SharedRecentReadingsCache:
+    """Recent readings of every active patient, shared by the workers of a node
+
+    Works like RecentReadingsCache, but the rings live in a memory mapped file, so a
+    reading appended by one worker is served by all of them. The file is a fixed size
+    hash table of max_patients slots, a patient is kept in one of the WINDOW slots from
+    the one its id hashes to, evicting the one that was warmed the longest ago.
+
+    Writers lock the slot they change with a record lock, and bump its sequence number
+    to odd while writing and back to even when done. Readers take no lock, they copy a
+    slot and retry when its sequence number was odd or changed meanwhile. Each worker
+    keeps the readings it decoded last per slot, until the sequence number changes.
+
+    The first worker to open the file starts it afresh, it may be out of date otherwise.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, capacity: int, max_patients: int) -> None:
+        # Fails right away where the file and its slots can not be locked
+        self._fcntl = import_fcntl("SHARED_CACHE=true")
+        self.path = path
+        self.capacity = capacity
+        self.max_patients = max_patients
+        self.slot_size = SLOT_HEADER_SIZE + capacity * READING.size
+        self.size = DATA_OFFSET + max_patients * self.slot_size
+
+        self._fd: int | None = None
+        self._map: mmap.mmap | None = None
+        self._open_lock = Lock()
+        # Record locks are per process, they do not keep threads of a worker apart
+        self._write_lock = RLock()
+        # Slot index to (sequence, patient_id, readings) as decoded last
+        self._decoded: dict[int, tuple[int, int, tuple]] = {}
+
+    @property
+    def mm(self) -> mmap.mmap:
+        if self._map is None:
+            with self._open_lock:
+                if self._map is None:
+                    self._map = self._open()
+        return self._map
+
+    def _open(self) -> mmap.mmap:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        header = FILE_HEADER.pack(MAGIC, self.max_patients, self.capacity)
+        try:
+            self._fcntl.flock(fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+            # No other worker has it open, whatever it holds may be out of date
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, header, 0)
+        except BlockingIOError:
+            pass
+        # Held as long as the worker runs, so workers opening it later keep it
+        self._fcntl.flock(fd, self._fcntl.LOCK_SH)
+        if os.pread(fd, FILE_HEADER.size, 0) != header:
+            os.close(fd)
+            raise RuntimeError(
+                f"{self.path} is in use by workers with another "
+                "RECENT_READINGS_PER_PATIENT or RECENT_READINGS_MAX_PATIENTS"
+            )
+        self._fd = fd
+        return mmap.mmap(fd, self.size)
+
+    def _offset(self, index: int) -> int:
+        return DATA_OFFSET + index * self.slot_size
+
+    def _window(self, patient_id: int) -> list[int]:
+        start = (patient_id * 2654435761) % self.max_patients
+        return [(start + i) % self.max_patients for i in range(WINDOW)]
+
+    def _read(self, index: int, size: int) -> bytes | None:
+        """Consistent copy of the first size bytes of a slot, None if it kept changing"""
+        mm = self.mm
+        offset = self._offset(index)
+        for _ in range(READ_ATTEMPTS):
+            (sequence,) = SEQUENCE.unpack_from(mm, offset)
+            if not sequence & 1:
+                data = mm[offset : offset + size]
+                if SEQUENCE.unpack_from(mm, offset)[0] == sequence:
+                    return data
+            time.sleep(0)
+        return None
+
+    def _find(self, patient_id: int) -> tuple[int, int, tuple] | None:
+        """Slot index, sequence and fields of the slot holding patient_id, if any"""
+        for index in self._window(patient_id):
+            data = self._read(index, SLOT_HEADER_SIZE)
+            if data is None:
+                continue
+            fields = FIELDS.unpack_from(data, SEQUENCE.size)
+            if fields[0] == patient_id and fields[1] != EMPTY:
+                return index, SEQUENCE.unpack_from(data)[0], fields
+        return None
+
+    @contextmanager
+    def _locked(self, offset: int, length: int):
+        # Opened on first use, which sets _fd
+        self.mm
+        with self._write_lock:
+            self._fcntl.lockf(
+                self._fd, self._fcntl.LOCK_EX, length, offset, os.SEEK_SET
+            )
+            try:
+                yield
+            finally:
+                self._fcntl.lockf(
+                    self._fd, self._fcntl.LOCK_UN, length, offset, os.SEEK_SET
+                )
+
+    @contextmanager
+    def _writing(self, index: int):
+        """Lock a slot and mark it as being written, yields its fields to change"""
+        mm = self.mm
+        offset = self._offset(index)
+        with self._locked(offset, self.slot_size):
+            (sequence,) = SEQUENCE.unpack_from(mm, offset)
+            if sequence & 1:
+                # A worker died while writing it, drop what it left
+                sequence += 1
+                FIELDS.pack_into(mm, offset + SEQUENCE.size, 0, EMPTY, 0, 0, 0, 0, 0, 0)
+            SEQUENCE.pack_into(mm, offset, sequence + 1)
+            fields = list(FIELDS.unpack_from(mm, offset + SEQUENCE.size))
+            try:
+                yield fields
+            finally:
+                FIELDS.pack_into(mm, offset + SEQUENCE.size, *fields)
+                SEQUENCE.pack_into(mm, offset, sequence + 2)
+
+    def _decode(self, index: int, sequence: int, patient_id: int) -> tuple | None:
+        decoded = self._decoded.get(index)
+        if decoded is not None and decoded[:2] == (sequence, patient_id):
+            return decoded[2]
+        data = self._read(index, self.slot_size)
+        if data is None or SEQUENCE.unpack_from(data)[0] != sequence:
+            return None
+        _, _, count, next, *_ = FIELDS.unpack_from(data, SEQUENCE.size)
+        # Newest first, walking backwards from the last write
+        readings = tuple(
+            _decode_reading(
+                data,
+                SLOT_HEADER_SIZE + ((next - 1 - i) % self.capacity) * READING.size,
+            )
+            for i in range(count)
+        )
+        self._decoded[index] = (sequence, patient_id, readings)
+        return readings
+
+    def get(
+        self, patient_id: int, load_readings: Callable[[int], Sequence]
+    ) -> Sequence:
+        """Get recent readings of a patient, newest first
+
+        load_readings(limit) is only called on a miss and must return the latest readings
+        from the database, newest first.
+        """
+        found = self._find(patient_id)
+        if found is not None and found[2][1] == READY:
+            readings = self._decode(found[0], found[1], patient_id)
+            if readings is not None:
+                cache_requests_total.inc(cache="recent_readings", result="hit")
+                return readings
+        cache_requests_total.inc(cache="recent_readings", result="miss")
+
+        # Only one worker warms a patient, others read through
+        claimed = self._claim(patient_id)
+        readings = load_readings(self.capacity)
+        if claimed is not None:
+            self._install(patient_id, *claimed, readings)
+        return readings
+
+    def _claim(self, patient_id: int) -> tuple[int, int] | None:
+        """Take a slot to warm patient_id in, return its index and the warm token"""
+        now = time.time()
+        # Claims and evictions are taken one at a time, on the file header
+        with self._locked(0, DATA_OFFSET):
+            candidates = []
+            for index in self._window(patient_id):
+                data = self._read(index, SLOT_HEADER_SIZE)
+                if data is None:
+                    continue
+                owner, state, _, _, _, _, warm_started, warmed_at = FIELDS.unpack_from(
+                    data, SEQUENCE.size
+                )
+                warming = (
+                    state in (WARMING, STALE) and now - warm_started < WARM_TIMEOUT
+                )
+                if owner == patient_id and state != EMPTY:
+                    if state == READY or warming:
+                        return None
+                    # Abandoned while warming, take it over
+                    candidates = [(-1.0, index)]
+                    break
+                if warming:
+                    continue
+                candidates.append((-1.0 if state == EMPTY else warmed_at, index))
+            if not candidates:
+                return None
+            _, index = min(candidates)
+            token = random.getrandbits(63)
+            with self._writing(index) as fields:
+                fields[:] = [patient_id, WARMING, 0, 0, 0, token, now, 0.0]
+        return index, token
+
+    def _install(
+        self, patient_id: int, index: int, token: int, readings: Sequence
+    ) -> None:
+        mm = self.mm
+        items = self._offset(index) + SLOT_HEADER_SIZE
+        with self._writing(index) as fields:
+            if fields[0] != patient_id or fields[5] != token:
+                # Evicted or taken over meanwhile
+                return
+            if fields[1] != WARMING:
+                # A reading was ingested while loading, it may be missing from readings
+                fields[:] = [0, EMPTY, 0, 0, 0, 0, 0.0, 0.0]
+                return
+            readings = readings[: self.capacity]
+            for i, reading in enumerate(reversed(readings)):
+                self._pack_reading(mm, items + i * READING.size, reading)
+            count = len(readings)
+            fields[1:5] = [READY, count, count % self.capacity, 0]
+            fields[7] = time.time()
+
+    def _pack_reading(self, mm: mmap.mmap, offset: int, reading) -> None:
+        READING.pack_into(
+            mm,
+            offset,
+            reading.id,
+            _encode_created_at(reading.created_at),
+            reading.spo2_reading,
+            reading.systolic_reading,
+            reading.diastolic_reading,
+            reading.temp_reading,
+            reading.heartbeat_reading,
+        )
+
+    def is_tracked(self, patient_id: int) -> bool:
+        """Whether readings of this patient are kept, or are being warmed"""
+        return self._find(patient_id) is not None
+
+    def append(self, patient_id: int, reading) -> None:
+        """Append a newly ingested reading of a patient, no-op for untracked patients"""
+        found = self._find(patient_id)
+        if found is None:
+            return
+        index = found[0]
+        items = self._offset(index) + SLOT_HEADER_SIZE
+        with self._writing(index) as fields:
+            owner, state, count, next = fields[:4]
+            if owner != patient_id:
+                return
+            if state == WARMING:
+                fields[1] = STALE
+            elif state == READY:
+                self._pack_reading(self.mm, items + next * READING.size, reading)
+                fields[2] = min(count + 1, self.capacity)
+                fields[3] = (next + 1) % self.capacity
+
+    def invalidate(self, patient_id: int) -> None:
+        """Drop recent readings of a patient, they are warmed again on next read"""
+        found = self._find(patient_id)
+        if found is not None:
+            with self._writing(found[0]) as fields:
+                self._drop(fields, patient_id)
+
+    def clear(self) -> None:
+        """Drop recent readings of every patient, they are warmed again on next read"""
+        for index in range(self.max_patients):
+            with self._writing(index) as fields:
+                self._drop(fields, fields[0])
+
+    def _drop(self, fields: list, patient_id: int) -> None:
+        if fields[0] != patient_id or fields[1] == EMPTY:
+            return
+        if fields[1] == WARMING:
+            # The worker warming it finds out on install
+            fields[1] = STALE
+        elif fields[1] == READY:
+            fields[:] = [0, EMPTY, 0, 0, 0, 0, 0.0, 0.0]
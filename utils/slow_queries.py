@@ -0,0 +1,120 @@
+import logging
+import re
+from collections import deque
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+
+from config import config
+
+from utils.query_stats import current_route
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "<redacted>"
+# Modular crypt format hashes, such as bcrypt's $2b$12$...
+_PASSWORD_HASH = re.compile(r"^\$[0-9a-z]{1,4}\$[^$\s]*\$[./A-Za-z0-9]{20,}$")
+# Statements EXPLAIN QUERY PLAN has something to say about
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+# Parameter sets kept from an executemany, a bulk insert can carry thousands
+MAX_PARAMETER_SETS = 5
+
+
+def redact(parameters):
+    """Replace password hashes in statement parameters, whatever their shape"""
+    if isinstance(parameters, str):
+        return REDACTED if _PASSWORD_HASH.match(parameters) else parameters
+    if isinstance(parameters, dict):
+        return {k: redact(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(x) for x in parameters]
+    if isinstance(parameters, (bytes, memoryview)):
+        return f"<{len(parameters)} bytes>"
+    return parameters
+
+
+def explain_query_plan(cursor, statement: str, parameters) -> list[str] | None:
+    """EXPLAIN QUERY PLAN of a statement as indented lines, None when SQLite cannot"""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        # A fresh DBAPI cursor on the same connection, bypassing the engine's events
+        rows = (
+            cursor.connection.cursor()
+            .execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            .fetchall()
+        )
+    except Exception:
+        return None
+    # Rows are (id, parent, notused, detail), children right after their parent
+    depths = {0: -1}
+    lines = []
+    for row_id, parent, _, detail in rows:
+        depths[row_id] = depths.get(parent, -1) + 1
+        lines.append(f"{'  ' * depths[row_id]}{detail}")
+    return lines
+
+
+class SlowQueryLog:
+    """Statements slower than a threshold, the most recent kept in a bounded ring
+
+    Listens to the engine's cursor events. Each slow statement is logged and recorded with
+    its redacted parameters, duration, originating route and query plan.
+    """
+
+    def __init__(self, threshold_ms: float, size: int) -> None:
+        self.threshold = threshold_ms / 1000
+        self._entries: deque[dict] = deque(maxlen=size)
+        self._lock = Lock()
+        self._next_id = 1
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("slow_query_start", []).append(perf_counter())
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        seconds = perf_counter() - conn.info["slow_query_start"].pop()
+        if seconds < self.threshold:
+            return
+        if executemany:
+            explain_parameters = parameters[0] if parameters else ()
+            parameters = list(parameters[:MAX_PARAMETER_SETS])
+        else:
+            explain_parameters = parameters
+        entry = {
+            "recorded_at": datetime.utcnow(),
+            "duration_ms": seconds * 1000,
+            "route": current_route(),
+            "statement": statement,
+            "parameters": redact(parameters),
+            "executemany": executemany,
+            "plan": explain_query_plan(cursor, statement, explain_parameters),
+        }
+        logger.warning(
+            "Slow query, %.1f ms on %s: %s\n%s",
+            entry["duration_ms"],
+            entry["route"] or "<no request>",
+            statement,
+            "\n".join(entry["plan"] or []),
+        )
+        with self._lock:
+            entry["id"] = self._next_id
+            self._next_id += 1
+            self._entries.append(entry)
+
+    def entries(self) -> list[dict]:
+        """Recorded slow queries, the most recent first"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=config.SLOW_QUERY_THRESHOLD_MS, size=config.SLOW_QUERY_LOG_SIZE
+)
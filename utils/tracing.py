@@ -0,0 +1,337 @@
+import json
+import random
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from threading import Lock
+from time import time_ns
+
+from config import config
+
+from utils.metrics import UNMATCHED_ROUTE
+
+SERVICE_NAME = "health-mon-api"
+# Span kinds and status codes, as numbered by OTLP
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+STATUS_CODE_UNSET, STATUS_CODE_OK, STATUS_CODE_ERROR = 0, 1, 2
+# db.statement is cut to this many characters, select lists of joined models are long
+MAX_STATEMENT_LENGTH = 2048
+
+
+class Span:
+    """A timed operation within a trace, with OpenTelemetry's identifiers and fields"""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "root",
+        "attributes",
+        "status_code",
+        "status_message",
+        "start_time",
+        "end_time",
+        "_finished",
+        "_lock",
+    )
+
+    def __init__(
+        self, name: str, kind: int, parent: "Span | None", attributes: dict
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.span_id = f"{random.getrandbits(64):016x}"
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            self.parent_span_id = None
+            self.root = self
+            # Spans of the whole trace, exported together once the root span ends
+            self._finished: list[Span] = []
+            self._lock = Lock()
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_span_id = parent.span_id
+            self.root = parent.root
+        self.attributes = attributes
+        self.status_code = STATUS_CODE_UNSET
+        self.status_message = None
+        self.start_time = time_ns()
+        self.end_time = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exception: BaseException) -> None:
+        self.status_code = STATUS_CODE_ERROR
+        self.status_message = f"{type(exception).__name__}: {exception}"
+
+    def end(self) -> None:
+        self.end_time = time_ns()
+        root = self.root
+        with root._lock:
+            root._finished.append(self)
+        if root is self:
+            exporter.export(self._finished)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # 64 bit integers are strings in OTLP JSON
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_json(traces: list[list[Span]]) -> dict:
+    """Traces as an OTLP/JSON ExportTraceServiceRequest, as collectors accept it"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [x.to_otlp() for spans in traces for x in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class NoopSpanExporter:
+    def export(self, spans: list[Span]) -> None:
+        pass
+
+    def traces(self) -> list[list[Span]]:
+        return []
+
+
+class InMemorySpanExporter:
+    """Keep the spans of the most recent traces"""
+
+    def __init__(self, max_traces: int) -> None:
+        self._traces: deque[list[Span]] = deque(maxlen=max_traces)
+        self._lock = Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        with self._lock:
+            self._traces.append(spans)
+
+    def traces(self) -> list[list[Span]]:
+        """Recorded traces, the most recent first"""
+        with self._lock:
+            return list(reversed(self._traces))
+
+
+class FileSpanExporter(InMemorySpanExporter):
+    """Append every trace to a file as a line of OTLP/JSON, and keep the recent ones
+
+    The file can be read by the OpenTelemetry collector's otlpjsonfile receiver.
+    """
+
+    def __init__(self, path: str, max_traces: int) -> None:
+        super().__init__(max_traces)
+        self.path = path
+        self._file_lock = Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        super().export(spans)
+        line = json.dumps(to_otlp_json([spans]), separators=(",", ":"))
+        with self._file_lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+def _create_exporter():
+    if config.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter(max_traces=config.TRACING_MAX_TRACES)
+    if config.TRACING_EXPORTER == "file":
+        return FileSpanExporter(
+            path=config.TRACING_FILE, max_traces=config.TRACING_MAX_TRACES
+        )
+    return NoopSpanExporter()
+
+
+exporter = _create_exporter()
+enabled = not isinstance(exporter, NoopSpanExporter)
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Run the block in a child span of the current one
+
+    Outside of a traced request nothing is recorded and None is yielded, background work
+    such as the outbox dispatcher does not start traces of its own.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(name, kind, parent, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def traced(name=None):
+    """Decorate a function to run it in a span named after it, sync or async
+
+    Used bare, @traced, or with the span name, @traced("auth"). Not for functions returning
+    a query that is run later, by paginate say, the span would end before its SQL runs.
+    """
+    if callable(name):
+        return traced()(name)
+
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with start_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def set_request_attributes(**attributes) -> None:
+    """Set attributes on the span of the request being handled, if it is traced
+
+    Keyword names use _ where OpenTelemetry uses ., enduser_role becomes enduser.role.
+    """
+    span = _current_span.get()
+    if span is not None:
+        for key, value in attributes.items():
+            span.root.set_attribute(key.replace("_", "."), value)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = Span(
+        statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL",
+        SPAN_KIND_CLIENT,
+        parent,
+        {
+            "db.system": "sqlite",
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    if executemany:
+        span.set_attribute("db.executemany.count", len(parameters))
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None:
+        return
+    conn.info["trace_spans"].pop().end()
+
+
+def handle_error(exception_context):
+    spans = exception_context.connection.info.get("trace_spans")
+    if spans and exception_context.execution_context is not None:
+        span = spans.pop()
+        span.set_error(exception_context.original_exception)
+        span.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware running each request in a root span
+
+    The span is named after the method and the route template, children are added by
+    traced functions and by every SQL statement executed while handling the request.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled:
+            await self.app(scope, receive, send)
+            return
+
+        span = Span(
+            scope["method"],
+            SPAN_KIND_SERVER,
+            None,
+            {"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status_code = STATUS_CODE_ERROR
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            # Set by the router on the same scope once a route matched
+            route = getattr(scope.get("route"), "path_format", UNMATCHED_ROUTE)
+            span.name = f"{scope['method']} {route}"
+            span.set_attribute("http.route", route)
+            span.end()
@@ -0,0 +1,90 @@
+from typing import Iterable
+
+from sqlite import models
+
+from sqlite.enums import UserRoleEnum
+from sqlite.schemas import (
+    UserAdditionalDetails,
+    UserWhoIsNotAnAdminBaseClass,
+    CaretakerOrDoctor,
+    Patient,
+    PatientHistory,
+)
+
+# Rows read back from our own database were validated on the way in, so response models
+# are built from them with model_construct, skipping validators such as email_validator,
+# age_validator and value_validator. Never use these on data that came from a request.
+
+
+def construct_user_additional_details(
+    db_additional_details: models.UserAdditionalDetailsModel,
+) -> UserAdditionalDetails:
+    """Build UserAdditionalDetails from a trusted row, without validation"""
+    return UserAdditionalDetails.model_construct(
+        phone=db_additional_details.phone,
+        age=db_additional_details.age,
+        blood_group=db_additional_details.blood_group,
+    )
+
+
+def _user_fields(db_user: models.UserModel) -> dict:
+    return {
+        "name": db_user.name,
+        "email": db_user.email,
+        "gender": db_user.gender,
+        "id": db_user.id,
+        "additional_details": construct_user_additional_details(
+            db_user.additional_details
+        ),
+        # Stored as CombinedRoleEnum, non admin models expect UserRoleEnum
+        "user_role": UserRoleEnum(db_user.user_role),
+        "created_at": db_user.created_at,
+        "updated_at": db_user.updated_at,
+    }
+
+
+def construct_user_who_is_not_an_admin(
+    db_user: models.UserModel,
+) -> UserWhoIsNotAnAdminBaseClass:
+    """Build UserWhoIsNotAnAdminBaseClass from a trusted row, without validation"""
+    return UserWhoIsNotAnAdminBaseClass.model_construct(**_user_fields(db_user))
+
+
+def construct_patient_history(
+    db_patient_history: models.PatientHistoryModel,
+) -> PatientHistory:
+    """Build PatientHistory from a trusted row, without validation"""
+    return PatientHistory.model_construct(
+        spo2_reading=db_patient_history.spo2_reading,
+        systolic_reading=db_patient_history.systolic_reading,
+        diastolic_reading=db_patient_history.diastolic_reading,
+        temp_reading=db_patient_history.temp_reading,
+        heartbeat_reading=db_patient_history.heartbeat_reading,
+        id=db_patient_history.id,
+        created_at=db_patient_history.created_at,
+    )
+
+
+def construct_patient(
+    db_patient: models.UserModel,
+    db_caretakers: Iterable[models.UserModel],
+    db_doctors: Iterable[models.UserModel],
+    history: Iterable[PatientHistory],
+) -> Patient:
+    """Build Patient from trusted rows and already built histories, without validation"""
+    return Patient.model_construct(
+        **_user_fields(db_patient),
+        caretakers=[construct_user_who_is_not_an_admin(x) for x in db_caretakers],
+        doctors=[construct_user_who_is_not_an_admin(x) for x in db_doctors],
+        history=list(history),
+    )
+
+
+def construct_caretaker_or_doctor(
+    db_user: models.UserModel, db_patients: Iterable[models.UserModel]
+) -> CaretakerOrDoctor:
+    """Build CaretakerOrDoctor from trusted rows, without validation"""
+    return CaretakerOrDoctor.model_construct(
+        **_user_fields(db_user),
+        patients=[construct_user_who_is_not_an_admin(x) for x in db_patients],
+    )
@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import config
+
+import sqlite.crud.users as crud
+
+from sqlite.enums import UserImportStatusEnum
+from sqlite.schemas import UserImportClass, UserImportReport, UserImportRowResult
+
+from utils.password import get_password_hashes
+
+CSV_MEDIA_TYPE = "text/csv"
+REQUIRED_CSV_COLUMNS = ("name", "email", "gender", "password", "user_role")
+# CSV columns that go into additional_details, empty cells are left to their defaults
+ADDITIONAL_DETAILS_CSV_COLUMNS = ("phone", "age", "blood_group")
+
+
+class UserImportError(ValueError):
+    """The file can not be read as a list of users"""
+
+
+def read_csv_users(text: str) -> list[dict]:
+    """Read users from CSV with a header row, shaped like UserImportClass"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [x for x in REQUIRED_CSV_COLUMNS if x not in (reader.fieldnames or ())]
+    if missing:
+        raise UserImportError(f"CSV is missing columns: {', '.join(missing)}")
+    try:
+        records = list(reader)
+    except csv.Error as e:
+        raise UserImportError(f"Invalid CSV: {e}")
+    return [
+        {
+            **{
+                key: value
+                for key, value in record.items()
+                # Cells past the header are under None
+                if key is not None and key not in ADDITIONAL_DETAILS_CSV_COLUMNS
+            },
+            "additional_details": {
+                key: record[key]
+                for key in ADDITIONAL_DETAILS_CSV_COLUMNS
+                if record.get(key)
+            },
+        }
+        for record in records
+    ]
+
+
+def read_json_users(body: bytes) -> list:
+    """Read users from a JSON array, each shaped like UserImportClass"""
+    try:
+        users = json.loads(body)
+    except ValueError as e:
+        raise UserImportError(f"Invalid JSON: {e}")
+    if not isinstance(users, list):
+        raise UserImportError("JSON should be an array of users")
+    return users
+
+
+def read_users(body: bytes, media_type: str) -> list:
+    """Read users to import from a CSV or JSON file"""
+    if media_type == CSV_MEDIA_TYPE:
+        try:
+            # Spreadsheet exports often start with a byte order mark
+            users = read_csv_users(body.decode("utf-8-sig"))
+        except UnicodeDecodeError:
+            raise UserImportError("CSV should be encoded in UTF-8")
+    else:
+        users = read_json_users(body)
+    if not users:
+        raise UserImportError("No users were sent")
+    if len(users) > config.USER_IMPORT_MAX_ROWS:
+        raise UserImportError(
+            f"At most {config.USER_IMPORT_MAX_ROWS} users can be imported at once"
+        )
+    return users
+
+
+def _format_error(error: dict) -> str:
+    if not error["loc"]:
+        return error["msg"]
+    return f"{'.'.join(str(x) for x in error['loc'])}: {error['msg']}"
+
+
+def import_users(
+    users: list, db: Session, chunk_size: int = config.USER_IMPORT_CHUNK_SIZE
+) -> UserImportReport:
+    """Validate and create many users, return what happened to each of them
+
+    Emails and phone numbers are checked against the file and the database as sets, the
+    passwords of the users that pass are hashed on a pool of processes, and the users
+    are created chunk_size at a time, each chunk in its own transaction.
+    """
+    results: list[UserImportRowResult | None] = [None] * len(users)
+    accepted: list[tuple[int, UserImportClass]] = []
+    rows_by_email: dict[str, int] = {}
+    rows_by_phone: dict[str, int] = {}
+    for i, row in enumerate(users):
+        try:
+            user = UserImportClass.model_validate(row)
+        except ValidationError as e:
+            email = row.get("email") if isinstance(row, dict) else None
+            results[i] = UserImportRowResult(
+                row=i + 1,
+                email=email if isinstance(email, str) else None,
+                status=UserImportStatusEnum.INVALID,
+                errors=[_format_error(x) for x in e.errors()],
+            )
+            continue
+        errors = []
+        phone = user.additional_details.phone
+        if user.email in rows_by_email:
+            errors.append(f"email: Also on row {rows_by_email[user.email] + 1}")
+        if phone and phone in rows_by_phone:
+            errors.append(f"phone: Also on row {rows_by_phone[phone] + 1}")
+        if errors:
+            results[i] = UserImportRowResult(
+                row=i + 1,
+                email=user.email,
+                status=UserImportStatusEnum.DUPLICATE,
+                errors=errors,
+            )
+            continue
+        rows_by_email[user.email] = i
+        if phone:
+            rows_by_phone[phone] = i
+        accepted.append((i, user))
+
+    taken_emails = crud.get_taken_emails(emails=list(rows_by_email), db=db)
+    taken_phones = crud.get_taken_phones(phones=list(rows_by_phone), db=db)
+    remaining = []
+    for i, user in accepted:
+        errors = []
+        if user.email in taken_emails:
+            errors.append("email: User already exists")
+        if user.additional_details.phone in taken_phones:
+            errors.append("phone: This phone number is already in use")
+        if errors:
+            results[i] = UserImportRowResult(
+                row=i + 1,
+                email=user.email,
+                status=UserImportStatusEnum.DUPLICATE,
+                errors=errors,
+            )
+        else:
+            remaining.append((i, user))
+
+    password_hashes = get_password_hashes([user.password for _, user in remaining])
+    for start in range(0, len(remaining), chunk_size):
+        chunk = remaining[start : start + chunk_size]
+        try:
+            user_ids = crud.create_users_with_additional_details(
+                users=[
+                    {
+                        "name": user.name,
+                        "email": user.email,
+                        "password": password_hash,
+                        "gender": user.gender,
+                        "user_role": user.user_role,
+                        "additional_details": user.additional_details.model_dump(),
+                    }
+                    for (_, user), password_hash in zip(
+                        chunk, password_hashes[start : start + chunk_size]
+                    )
+                ],
+                db=db,
+            )
+        except IntegrityError:
+            # Another request took one of the emails or phones since they were checked
+            db.rollback()
+            for i, user in chunk:
+                results[i] = UserImportRowResult(
+                    row=i + 1,
+                    email=user.email,
+                    status=UserImportStatusEnum.FAILED,
+                    errors=["Conflicted with a change made meanwhile, import it again"],
+                )
+            continue
+        for (i, user), user_id in zip(chunk, user_ids):
+            results[i] = UserImportRowResult(
+                row=i + 1,
+                email=user.email,
+                status=UserImportStatusEnum.CREATED,
+                user_id=user_id,
+            )
+
+    created_count = sum(x.status == UserImportStatusEnum.CREATED for x in results)
+    return UserImportReport(
+        created_count=created_count,
+        failed_count=len(results) - created_count,
+        rows=results,
+    )
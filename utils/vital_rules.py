@@ -0,0 +1,139 @@
+from bisect import bisect_left, bisect_right
+from threading import Lock
+from typing import Callable, Iterable
+
+from sqlite.enums import VitalRuleOperatorEnum
+from sqlite.schemas import VitalAlert
+
+from utils.invalidation import invalidation_bus
+from utils.metrics import cache_requests_total
+
+LOW_OPERATORS = (
+    VitalRuleOperatorEnum.LESS_THAN,
+    VitalRuleOperatorEnum.LESS_THAN_OR_EQUAL,
+)
+INCLUSIVE_OPERATORS = (
+    VitalRuleOperatorEnum.LESS_THAN_OR_EQUAL,
+    VitalRuleOperatorEnum.GREATER_THAN_OR_EQUAL,
+)
+
+
+class CompiledVitalRules:
+    """Active vital rules of a single patient, compiled for evaluation on ingest
+
+    Rules are grouped per metric into a low side (< / <=) and a high side (> / >=), each
+    sorted by threshold. A reading is checked against the tightest bound of each side
+    only, so a reading that breaches nothing costs at most two comparisons per metric
+    no matter how many rules the patient has. Only a breaching reading bisects into the
+    sorted thresholds to find which rules fired.
+    """
+
+    __slots__ = ("_checks",)
+
+    def __init__(self, rules: Iterable) -> None:
+        grouped: dict[str, tuple[list, list]] = {}
+        for rule in rules:
+            low, high = grouped.setdefault(rule.metric.value, ([], []))
+            side = low if rule.operator in LOW_OPERATORS else high
+            side.append(
+                (
+                    rule.threshold,
+                    rule.operator in INCLUSIVE_OPERATORS,
+                    rule.id,
+                    rule.operator,
+                )
+            )
+
+        checks = []
+        for metric, (low, high) in grouped.items():
+            low.sort()
+            high.sort()
+            checks.append(
+                (
+                    metric,
+                    # Alert if the value is under the highest low threshold
+                    low[-1][0] if low else float("-inf"),
+                    [x[0] for x in low],
+                    low,
+                    # Alert if the value is above the lowest high threshold
+                    high[0][0] if high else float("inf"),
+                    [x[0] for x in high],
+                    high,
+                )
+            )
+        self._checks = tuple(checks)
+
+    def evaluate(self, reading) -> list[VitalAlert]:
+        """Evaluate a reading, return an alert for every rule that it breaches"""
+        alerts = []
+        for metric, low_max, low_t, low, high_min, high_t, high in self._checks:
+            value = getattr(reading, metric)
+            if value <= low_max:
+                # Every threshold above the value fired, equal ones only if inclusive
+                start = bisect_left(low_t, value)
+                end = bisect_right(low_t, value)
+                fired = [x for x in low[start:end] if x[1]] + low[end:]
+                alerts.extend(_alerts(metric=metric, fired=fired, value=value))
+            if value >= high_min:
+                # Every threshold below the value fired, equal ones only if inclusive
+                start = bisect_left(high_t, value)
+                end = bisect_right(high_t, value)
+                fired = high[:start] + [x for x in high[start:end] if x[1]]
+                alerts.extend(_alerts(metric=metric, fired=fired, value=value))
+        return alerts
+
+
+def _alerts(metric: str, fired: list[tuple], value: float) -> list[VitalAlert]:
+    return [
+        VitalAlert(
+            rule_id=rule_id,
+            metric=metric,
+            operator=operator,
+            threshold=threshold,
+            value=value,
+        )
+        for threshold, _, rule_id, operator in fired
+    ]
+
+
+class VitalRulesCache:
+    """Process wide cache of compiled vital rules, keyed by patient id"""
+
+    def __init__(self) -> None:
+        self._compiled: dict[int, CompiledVitalRules] = {}
+        self._generations: dict[int, int] = {}
+        self._lock = Lock()
+
+    def get_or_compile(
+        self, patient_id: int, load_rules: Callable[[], Iterable]
+    ) -> CompiledVitalRules:
+        """Get compiled rules for a patient, loading and compiling them on a miss"""
+        compiled = self._compiled.get(patient_id)
+        if compiled is not None:
+            cache_requests_total.inc(cache="vital_rules", result="hit")
+            return compiled
+        cache_requests_total.inc(cache="vital_rules", result="miss")
+
+        generation = self._generations.get(patient_id, 0)
+        compiled = CompiledVitalRules(rules=load_rules())
+        with self._lock:
+            # Do not cache rules that were changed while they were being loaded
+            if self._generations.get(patient_id, 0) == generation:
+                self._compiled[patient_id] = compiled
+        return compiled
+
+    def invalidate(self, patient_id: int) -> None:
+        """Drop compiled rules for a patient in every worker, call after changing them"""
+        self.discard(patient_id)
+        invalidation_bus.publish("vital_rules", patient_id)
+
+    def discard(self, patient_id: int) -> None:
+        """Drop compiled rules for a patient, they are recompiled on next evaluation"""
+        with self._lock:
+            self._generations[patient_id] = self._generations.get(patient_id, 0) + 1
+            self._compiled.pop(patient_id, None)
+
+
+vital_rules_cache = VitalRulesCache()
+# Rules changed by other workers
+invalidation_bus.subscribe("vital_rules", vital_rules_cache.discard)